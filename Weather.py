@@ -4,21 +4,32 @@
 # license="MIT"
 # description="A weather application with multi-location support using Tkinter and open-meteo API"
 
-import requests
 import time
+STARTUP_BEGIN = time.perf_counter()  # Taken before the other imports so --timing can include them
+
 import threading
 import logging
 import json
-import tkinter as tk
-from tkinter import messagebox, scrolledtext
 from datetime import datetime
 import os
 import sys
-import subprocess
-from pathlib import Path
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
-from weather_cache import WeatherCache
+from weather_startup import StartupTimer, LazyModule, preload
+from weather_cache import WeatherCache, CACHE_DB_FILE, CACHE_STALE_MINUTES, NEARBY_RADIUS_KM
+from weather_prefetch import PrefetchScheduler
+from weather_ui import UIDispatcher
+from weather_record import WeatherRecord, records_from_api
+from weather_locations import LocationManager, CONFIG_FILE
+from weather_listview import VirtualListView
+from weather_gazetteer import load_gazetteer
+from weather_geocode import Geocoder, GeocodeCache, GeocodePipeline, GEOCODE_CACHE_FILE, NOMINATIM_HOST
+import weather_metrics
+
+# Slow imports wait until first use, or for the warm-up thread started after the first paint
+# (imported by name only: keep Weather.spec's hiddenimports in step with these)
+weather_api = LazyModule("weather_api")        # requests, urllib3, certifi
+weather_engine = LazyModule("weather_engine")  # asyncio
+weather_update = LazyModule("weather_update")
+PRELOAD_MODULES = ("weather_engine", "weather_api", "weather_update", "numpy", "geopy.geocoders")
 
 # Configure logging
 logging.basicConfig(
@@ -30,7 +41,6 @@ logger = logging.getLogger(__name__)
 # Constants
 GITHUB_REPO = "Rog294super/Weather-App"
 VERSION = "1.2.0"
-CONFIG_FILE = "weather_locations.json"
 
 # Map waarin het script of de .exe zich bevindt
 if getattr(sys, 'frozen', False):
@@ -38,142 +48,31 @@ if getattr(sys, 'frozen', False):
 else:
     script_dir = os.path.dirname(os.path.abspath(__file__))
 
+DIAGNOSTICS_REFRESH_MS = 1000
+METRICS_DUMP_FILE = "weather_metrics.json"
+STARTUP_TIMING_FILE = "startup_timing.json"  # --timing output when there is no console (windowed build)
+FIRST_PAINT_TIMEOUT_MS = 2000  # Finish starting up even if the window is never exposed (e.g. minimized)
+
+# --timing prints a per-phase startup breakdown and exits; --timing=json prints it as JSON
+TIMING_MODE = next((arg.partition("=")[2] or "text" for arg in sys.argv[1:] if arg.startswith("--timing")), None)
+startup = StartupTimer(STARTUP_BEGIN)
+
 CONFIG_PATH = os.path.join(script_dir, CONFIG_FILE)
+CACHE_DB_PATH = os.path.join(script_dir, CACHE_DB_FILE)
+GEOCODE_CACHE_PATH = os.path.join(script_dir, GEOCODE_CACHE_FILE)
 
-# Weather code descriptions
-WEATHER_CODES = {
-    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
-    45: "Foggy", 48: "Depositing rime fog",
-    51: "Light drizzle", 53: "Moderate drizzle", 55: "Dense drizzle",
-    61: "Slight rain", 63: "Moderate rain", 65: "Heavy rain",
-    71: "Slight snow", 73: "Moderate snow", 75: "Heavy snow", 77: "Snow grains",
-    80: "Slight rain showers", 81: "Moderate rain showers", 82: "Violent rain showers",
-    85: "Slight snow showers", 86: "Heavy snow showers",
-    95: "Thunderstorm", 96: "Thunderstorm with slight hail", 99: "Thunderstorm with heavy hail"
-}
-
-
-class LocationManager:
-    """Manages saved locations"""
-    
-    def __init__(self, config_path):
-        self.config_path = config_path
-        self.locations = self.load_locations()
-    
-    def load_locations(self):
-        """Load saved locations from config file"""
-        try:
-            if os.path.exists(self.config_path):
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return data.get('locations', [])
-            return []
-        except Exception as e:
-            logger.error(f"Error loading locations: {e}")
-            return []
-    
-    def save_locations(self):
-        """Save locations to config file"""
-        try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump({'locations': self.locations}, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Error saving locations: {e}")
-    
-    def add_location(self, name, lat, lon, address, local_name=None):
-        """Add a new location"""
-        location = {
-            'name': name,
-            'local_name': local_name or name,
-            'lat': lat,
-            'lon': lon,
-            'address': address,
-            'added': datetime.now().isoformat()
-        }
-        # Check if location already exists
-        for loc in self.locations:
-            if loc['name'] == name:
-                return False
-        self.locations.append(location)
-        self.save_locations()
-        return True
-    
-    def remove_location(self, name):
-        """Remove a location"""
-        self.locations = [loc for loc in self.locations if loc['name'] != name]
-        self.save_locations()
-    
-    def get_locations(self):
-        """Get all locations"""
-        return self.locations
-
-
-class UpdateManager:
-    """Manages application updates from GitHub releases"""
-    
-    def __init__(self, current_version, github_repo):
-        self.current_version = current_version
-        self.github_repo = github_repo
-        self.script_dir = script_dir
-        
-    def check_for_updates(self):
-        """Check if a new version is available"""
-        try:
-            url = f"https://api.github.com/repos/{self.github_repo}/releases/latest"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code != 200:
-                logger.warning(f"Failed to check for updates: HTTP {response.status_code}")
-                return None
-            
-            data = response.json()
-            latest_version = data.get("tag_name", "").lstrip("v")
-            
-            if not latest_version:
-                return None
-            
-            if latest_version > self.current_version:
-                return {
-                    "version": latest_version,
-                    "url": data.get("html_url"),
-                    "notes": data.get("body", "No release notes available"),
-                    "assets": data.get("assets", [])
-                }
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error checking for updates: {e}")
-            return None
-    
-    def download_and_install_update(self, update_info, progress_callback=None):
-        """Download and install the update using the updater.exe"""
-        try:
-            exe_asset = None
-            for asset in update_info["assets"]:
-                if asset["name"].lower() == "weather.exe":
-                    exe_asset = asset
-                    break
-            
-            if not exe_asset:
-                raise Exception("No executable found in release assets")
-            
-            download_url = exe_asset["browser_download_url"]
-            exe_path = Path(self.script_dir) / "Weather.exe"
-            updater_path = Path(self.script_dir) / "updater.exe"
-            
-            if not updater_path.exists():
-                raise Exception("Updater not found. Please reinstall the application.")
-            
-            if progress_callback:
-                progress_callback("Starting update process...")
-            
-            subprocess.Popen([str(updater_path), download_url, str(exe_path)], cwd=self.script_dir)
-            time.sleep(1)
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error installing update: {e}")
-            raise
+# Headless modes run without a display, so they must return before tkinter is imported
+if __name__ == "__main__" and "--batch" in sys.argv[1:]:
+    import weather_batch
+    sys.exit(weather_batch.main(sys.argv[1:], script_dir, f"weather_app_v{VERSION}"))
+if __name__ == "__main__" and "--serve" in sys.argv[1:]:
+    import weather_server
+    sys.exit(weather_server.main(sys.argv[1:], script_dir, f"weather_app_v{VERSION}"))
+
+import tkinter as tk
+from tkinter import messagebox, scrolledtext, filedialog
+
+startup.mark("imports")
 
 
 class WeatherAppGUI:
@@ -181,13 +80,15 @@ class WeatherAppGUI:
         self.root = root
         self.root.title(f"Weather Application v{VERSION}")
         
-        # Initialize managers
-        self.location_manager = LocationManager(CONFIG_PATH)
-        self.update_manager = UpdateManager(VERSION, GITHUB_REPO)
-        self.weather_cache = WeatherCache(15)  # 15 minute cache
-        
-        # Initialize geocoder (lazy loading - only when needed)
-        self.geolocator = None
+        # Managers and background subsystems are built after the first paint (see _finish_startup)
+        self.location_manager = None
+        self.weather_cache = None
+        self.geocoder = None
+        self.geocode_pipeline = None
+        self.fetch_engine = None
+        self.prefetcher = None
+        self._update_manager = None
+        self.started = False
         
         # Memory management - track active threads
         self.active_threads = []
@@ -218,12 +119,108 @@ class WeatherAppGUI:
         self.accent_color = "#4a90e2"
         self.success_color = "#28a745"
 
+        # Widget updates from worker threads go through this queue, drained on the main loop
+        self.ui = UIDispatcher(self.root)
+        self.diagnostics_window = None
+        
         # Create GUI
         self.create_gui()
+        self.ui.start()
+        startup.mark("gui build")
+        
+        # Finish starting up once the window has been drawn
+        self.weather_text.bind('<Expose>', self._on_first_expose)
+        self.root.after(FIRST_PAINT_TIMEOUT_MS, self._finish_startup)
+
+    def _on_first_expose(self, event):
+        """Run _finish_startup after the redraw the first Expose schedules"""
+        self.weather_text.unbind('<Expose>')
+        self.root.after_idle(self._finish_startup)
+
+    def _ensure_started(self):
+        """Finish starting up now if a control is used before the first paint did it"""
+        if not self.started:
+            self._finish_startup()
+
+    def _finish_startup(self):
+        """Load saved data and start the background subsystems, once the window is visible"""
+        if self.started:
+            return
+        self.started = True
+        startup.mark("first paint")
+        
+        # Warm up the slow imports off the main thread so the first click does not wait for them
+        preload(PRELOAD_MODULES, on_done=self._on_preloaded)
+        
+        self.location_manager = LocationManager(CONFIG_PATH)
+        # 15 minute cache, kept on disk; expired entries stay showable while they refresh
+        self.weather_cache = WeatherCache(15, persist_path=CACHE_DB_PATH,
+                                          stale_minutes=CACHE_STALE_MINUTES)
+        
+        # Initialize geocoder (Nominatim is lazy loaded, lookups are cached on disk)
+        self.geocoder = Geocoder(f"weather_app_v{VERSION}",
+                                 cache=GeocodeCache(persist_path=GEOCODE_CACHE_PATH))
+        # Uncached names queue here and go out at Nominatim's rate; a typed search goes first
+        self.geocode_pipeline = GeocodePipeline(self.geocoder).start()
+        # Names in the offline gazetteer (if one is installed) skip Nominatim once it is open
+        self._start_thread(self._load_gazetteer)
+        self.refresh_locations_list()
+        startup.mark("config load")
+        
+        # Location fetches run on one asyncio loop; a new click cancels the one it replaces
+        self.fetch_engine = weather_engine.FetchEngine().start()
+        
+        # Saved locations are refreshed in the background shortly before they expire
+        self.prefetcher = PrefetchScheduler(
+            self.weather_cache, self._prefetch_locations, self.location_manager.get_locations
+        ).start()
+        
+        # Live state of this window's components, read whenever metrics are collected
+        weather_metrics.gauge("weather_cache_entries", "Entries in the in-memory weather cache",
+                              func=lambda: len(self.weather_cache))
+        weather_metrics.gauge("weather_cache_memory_bytes", "Approximate size of the in-memory weather cache",
+                              func=lambda: self.weather_cache.memory_bytes)
+        weather_metrics.gauge("weather_fetch_jobs_in_flight", "Fetch jobs running on the engine loop",
+                              func=lambda: self.fetch_engine.get_stats()['in_flight'])
+        weather_metrics.gauge("weather_ui_updates_pending", "Widget updates waiting for the next UI tick",
+                              func=lambda: self.ui.get_stats()['pending'])
+        startup.mark("subsystems")
         
         # Check for updates on startup (delayed to not slow down startup)
         self.root.after(3000, lambda: self._start_thread(self.check_updates_startup))
 
+    def _on_preloaded(self, seconds):
+        """Called on the warm-up thread once the slow imports are done"""
+        startup.mark("warm-up imports", {name: s * 1000 for name, s in seconds.items()})
+        if TIMING_MODE:
+            self.ui.call(self._report_timing)
+
+    def _report_timing(self):
+        """Print the startup breakdown for --timing (or save it, without a console) and exit"""
+        try:
+            text = json.dumps(startup.to_dict()) if TIMING_MODE == "json" else startup.report()
+            stream = sys.stdout or sys.__stderr__
+            if stream is not None:
+                print(text, file=stream)
+                stream.flush()
+            else:
+                # The windowed build has no stdout or stderr
+                path = os.path.join(script_dir, STARTUP_TIMING_FILE)
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(startup.to_dict(), f, indent=2)
+                logger.info(f"Startup timing written to {path}")
+        except Exception as e:
+            logger.error(f"Could not report startup timing: {e}")
+        finally:
+            self.on_closing()
+
+    @property
+    def update_manager(self):
+        """UpdateManager, built on first use so startup does not load the HTTP stack"""
+        if self._update_manager is None:
+            self._update_manager = weather_update.UpdateManager(VERSION, GITHUB_REPO, script_dir)
+        return self._update_manager
+
     def create_gui(self):
         """Create the main GUI elements"""
         # Main container with two panes
@@ -270,6 +267,30 @@ class WeatherAppGUI:
         )
         self.update_button.pack(side=tk.RIGHT)
         
+        # Diagnostics button
+        diagnostics_btn = tk.Button(
+            header_frame, text="📊", bg="#3a3a3a", fg=self.fg_color,
+            font=("Arial", 10), command=self.show_diagnostics,
+            cursor="hand2", relief=tk.FLAT, width=3
+        )
+        diagnostics_btn.pack(side=tk.RIGHT, padx=(0, 5))
+        
+        # Type-to-filter box over the saved locations
+        filter_frame = tk.Frame(parent, bg=self.bg_color)
+        filter_frame.pack(fill=tk.X, padx=10, pady=(0, 5))
+        
+        tk.Label(filter_frame, text="🔍", bg=self.bg_color, fg=self.fg_color,
+                 font=("Arial", 10)).pack(side=tk.LEFT)
+        
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', lambda *args: self.location_list.set_filter(self.filter_var.get()))
+        filter_entry = tk.Entry(filter_frame, textvariable=self.filter_var, font=("Arial", 10),
+                                bg="#1e1e1e", fg=self.fg_color, insertbackground=self.fg_color,
+                                relief=tk.FLAT)
+        filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        filter_entry.bind('<Escape>', lambda e: self.filter_var.set(""))
+        filter_entry.bind('<FocusIn>', lambda e: self.location_list.prepare_filter())
+        
         # Locations list
         list_frame = tk.Frame(parent, bg=self.bg_color)
         list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
@@ -278,18 +299,18 @@ class WeatherAppGUI:
         scrollbar = tk.Scrollbar(list_frame)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Listbox for locations
+        # Listbox for locations; it only ever holds the visible rows, the view scrolls it
         self.locations_listbox = tk.Listbox(
             list_frame, bg="#1e1e1e", fg=self.fg_color,
             font=("Arial", 11), selectmode=tk.SINGLE,
-            yscrollcommand=scrollbar.set, relief=tk.FLAT,
+            relief=tk.FLAT, exportselection=False,
             highlightthickness=0, selectbackground=self.accent_color
         )
         self.locations_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.config(command=self.locations_listbox.yview)
         
-        # Bind selection event
-        self.locations_listbox.bind('<<ListboxSelect>>', self.on_location_select)
+        # Rows are keyed by location name, so selection survives filtering and edits
+        self.location_list = VirtualListView(self.locations_listbox, scrollbar,
+                                             on_select=self.on_location_select)
         
         # Buttons under list of locations
         # Buttons frame
@@ -303,6 +324,14 @@ class WeatherAppGUI:
         )
         remove_btn.pack(fill=tk.X, pady=(0, 5))
         
+        # Refresh all saved locations in one batch
+        self.refresh_all_btn = tk.Button(
+            btn_frame, text="🔃 Refresh All", bg=self.accent_color, fg=self.fg_color,
+            font=("Arial", 9), command=self.refresh_all_locations,
+            cursor="hand2", relief=tk.FLAT
+        )
+        self.refresh_all_btn.pack(fill=tk.X, pady=(0, 5))
+        
         # Clear cache button
         clear_cache_btn = tk.Button(
             btn_frame, text="🔄 Clear Cache", bg="#6c757d", fg=self.fg_color,
@@ -310,9 +339,6 @@ class WeatherAppGUI:
             cursor="hand2", relief=tk.FLAT
         )
         clear_cache_btn.pack(fill=tk.X)
-        
-        # Load saved locations
-        self.refresh_locations_list()
 
     def create_weather_panel(self, parent):
         """Create the weather display panel"""
@@ -389,61 +415,135 @@ class WeatherAppGUI:
 
     def update_cache_indicator(self):
         """Update the cache statistics display"""
-        stats = self.weather_cache.get_stats()
-        self.cache_label.config(text=f"📦 Cache: {stats['entries']}")
+        entries, memory_bytes = self.weather_cache.summary()
+        size_mb = memory_bytes / (1024 * 1024)
+        self.cache_label.config(text=f"📦 Cache: {entries} ({size_mb:.1f} MB)")
 
     def clear_cache(self):
         """Clear the weather cache"""
+        self._ensure_started()
         count = self.weather_cache.clear()
         self.update_cache_indicator()
         messagebox.showinfo("Cache Cleared", f"Cleared {count} cached entries.\nNext requests will fetch fresh data.")
 
-    def refresh_locations_list(self):
-        """Refresh the locations listbox"""
-        self.locations_listbox.delete(0, tk.END)
-        locations = self.location_manager.get_locations()
-        for loc in locations:
-            display_name = f"{loc['local_name']}"
-            if loc['local_name'] != loc['name']:
-                display_name += f" ({loc['name']})"
-            self.locations_listbox.insert(tk.END, display_name)
-
-    def on_location_select(self, event):
-        """Handle location selection"""
-        selection = self.locations_listbox.curselection()
-        if not selection:
+    def refresh_all_locations(self):
+        """Refresh weather for every saved location using batched requests"""
+        self._ensure_started()
+        locations = list(self.location_manager.get_locations())
+        if not locations:
+            messagebox.showinfo("No Locations", "There are no saved locations to refresh.")
             return
         
-        idx = selection[0]
-        locations = self.location_manager.get_locations()
-        if idx >= len(locations):
+        self.refresh_all_btn.config(state=tk.DISABLED)
+        self._start_thread(self._refresh_all_thread, (locations,))
+
+    def _refresh_locations(self, locations):
+        """Batch fetch saved locations and fill the cache in one pass"""
+        results = weather_api.fetch_weather_batch(
+            [(loc['lat'], loc['lon']) for loc in locations]
+        )
+        # Forecasts of all locations are aggregated together in one vectorized pass
+        records = records_from_api(
+            results, [(loc['local_name'], loc['address'], loc['name']) for loc in locations]
+        )
+        self.weather_cache.set_many(
+            (loc['lat'], loc['lon'], record) for loc, record in zip(locations, records)
+        )
+        self.ui.post("cache_label", self.update_cache_indicator)
+
+    def _prefetch_locations(self, locations):
+        """Refresh locations for the prefetcher through the fetch engine (called on its thread)"""
+        errors = []
+        future = self.fetch_engine.submit("prefetch", self._prefetch_job, locations, on_error=errors.append)
+        weather_engine.wait_result(future)
+        if errors:
+            raise errors[0]
+
+    async def _prefetch_job(self, locations):
+        """Fetch each location under the Open-Meteo host limit, sharing requests already in flight"""
+        results = await self.fetch_engine.map_blocking(
+            weather_api.OPEN_METEO_HOST, self._prefetch_location, locations
+        )
+        self.ui.post("cache_label", self.update_cache_indicator)
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            raise failed[0]
+
+    def _prefetch_location(self, location):
+        """Fetch and cache one location (blocking; runs on the engine's executor)"""
+        self._fetch_record(location['lat'], location['lon'],
+                           (location['local_name'], location['address'], location['name']))
+
+    def _refresh_all_thread(self, locations):
+        """Refresh all saved locations and report the result"""
+        try:
+            start = time.perf_counter()
+            self._refresh_locations(locations)
+            elapsed = time.perf_counter() - start
+            logger.info(f"Refreshed {len(locations)} locations in {elapsed:.2f}s")
+            self.ui.call(messagebox.showinfo,
+                         "Refresh Complete", f"Refreshed {len(locations)} locations in {elapsed:.1f}s.")
+        except Exception as e:
+            logger.error(f"Error refreshing all locations: {e}")
+            self.ui.call(messagebox.showerror,
+                         "Refresh Failed", f"Failed to refresh locations:\n{str(e)}")
+        finally:
+            self.ui.post("refresh_all_btn", lambda: self.refresh_all_btn.config(state=tk.NORMAL))
+
+    @staticmethod
+    def location_label(loc):
+        """Text of a saved location in the list"""
+        display_name = f"{loc['local_name']}"
+        if loc['local_name'] != loc['name']:
+            display_name += f" ({loc['name']})"
+        return display_name
+
+    def refresh_locations_list(self):
+        """Load every saved location into the locations list"""
+        self.location_list.set_items(
+            (loc['name'], self.location_label(loc)) for loc in self.location_manager.get_locations()
+        )
+
+    def on_location_select(self, name):
+        """Handle location selection"""
+        self._ensure_started()
+        location = self.location_manager.get_location(name)
+        if location is None:
             return
         
-        location = locations[idx]
         self.city_entry.delete(0, tk.END)
         self.city_entry.insert(0, location['name'])
         
-        # Fetch weather for this location
-        self._start_thread(self.fetch_weather_for_saved_location, (location,))
+        # Fetch weather for this location (replaces any fetch still in flight)
+        self.fetch_engine.submit("display", self.fetch_weather_for_saved_location, location)
 
-    def fetch_weather_for_saved_location(self, location):
+    async def fetch_weather_for_saved_location(self, location):
         """Fetch weather for a saved location"""
         try:
-            # Check cache first
-            cached = self.weather_cache.get(location['lat'], location['lon'])
+            # Keep this location fresh in the background for a while
+            self.prefetcher.mark_viewed(location['lat'], location['lon'])
+            
+            # Check cache first (a stale entry is shown right away and refreshed behind it)
+            cached = await self._cached(location['lat'], location['lon'])
             
             if cached:
                 # Use cached data - instant!
+                fresh = self.weather_cache.is_fresh(cached)
+                self.prefetcher.record_request('fresh' if fresh else 'stale')
                 self._display_cached_weather(location, cached)
+                if not fresh:
+                    self._revalidate(location['lat'], location['lon'],
+                                     (location['local_name'], location['address'], location['name']))
                 return
             
-            # Not in cache - fetch new
-            self.weather_text.config(state=tk.NORMAL)
-            self.weather_text.delete(1.0, tk.END)
-            self.weather_text.insert(tk.END, f"⏳ Loading weather for {location['local_name']}...\n")
-            self.weather_text.config(state=tk.DISABLED)
+            # Not in cache - fetch new (and cache it, off the loop)
+            self.prefetcher.record_request('waited')
+            self.show_text(f"⏳ Loading weather for {location['local_name']}...\n")
             
-            weather_data = self.fetch_weather_data(location['lat'], location['lon'])
+            record = await self.fetch_engine.run_blocking(
+                weather_api.OPEN_METEO_HOST, self._fetch_record, location['lat'], location['lon'],
+                (location['local_name'], location['address'], location['name'])
+            )
             
             # Store current location
             self.current_location_data = {
@@ -454,17 +554,8 @@ class WeatherAppGUI:
                 'address': location['address']
             }
             
-            formatted = self.format_weather_data(weather_data, location['local_name'], 
-                                                 location['address'], location['name'])
-            
-            # Cache it
-            self.weather_cache.set(location['lat'], location['lon'], weather_data, formatted)
-            self.root.after(0, self.update_cache_indicator)
-            
-            self.weather_text.config(state=tk.NORMAL)
-            self.weather_text.delete(1.0, tk.END)
-            self.weather_text.insert(tk.END, formatted)
-            self.weather_text.config(state=tk.DISABLED)
+            self.ui.post("cache_label", self.update_cache_indicator)
+            self.show_report(record)
             
         except Exception as e:
             logger.error(f"Error fetching saved location weather: {e}")
@@ -480,26 +571,72 @@ class WeatherAppGUI:
             'address': location['address']
         }
         
-        age = datetime.now() - cached_data['timestamp']
+        self.show_report(cached_data, self._cache_info(cached_data))
+        self.ui.post("cache_label", self.update_cache_indicator)
+
+    def _cache_info(self, cached_data):
+        """Footer line describing the age of a cached report"""
+        age = datetime.now() - cached_data.timestamp
         age_min = int(age.total_seconds() / 60)
-        next_update = 15 - age_min
-        
-        formatted = cached_data['formatted']
-        cache_info = f"\n💾 Cached ({age_min} min old) • Fresh in {next_update} min\n"
-        
-        self.weather_text.config(state=tk.NORMAL)
-        self.weather_text.delete(1.0, tk.END)
-        self.weather_text.insert(tk.END, formatted + cache_info)
-        self.weather_text.config(state=tk.DISABLED)
+        if self.weather_cache.is_fresh(cached_data):
+            return f"\n💾 Cached ({age_min} min old) • Fresh in {15 - age_min} min\n"
+        return f"\n💾 Cached ({age_min} min old) • Refreshing in background...\n"
+
+    async def _cached(self, lat, lon, radius_km=0):
+        """Cache lookup for the engine loop: memory first, the disk tier on the executor"""
+        cached = self.weather_cache.get(lat, lon, allow_stale=True, radius_km=radius_km, memory_only=True)
+        if cached is None and self.weather_cache.store:
+            cached = await self.fetch_engine.loop.run_in_executor(
+                self.fetch_engine.executor, self._load_cached, lat, lon, radius_km
+            )
+        return cached
+
+    def _load_cached(self, lat, lon, radius_km):
+        """Full cache lookup including the disk tier (blocking; runs on the engine's executor)"""
+        return self.weather_cache.get(lat, lon, allow_stale=True, radius_km=radius_km)
+
+    def _fetch_record(self, lat, lon, labels):
+        """Fetch, build and cache a record (blocking; runs on the engine's executor)"""
+        weather_data = self.fetch_weather_data(lat, lon)
+        record = WeatherRecord.from_api(weather_data, *labels)
+        self.weather_cache.set(lat, lon, record)
+        return record
+
+    def _revalidate(self, lat, lon, labels):
+        """Refresh a stale entry in the background, repainting if it is still on screen"""
+        slot = f"revalidate:{self.weather_cache.get_cache_key(lat, lon)}"
+        if not self.fetch_engine.is_pending(slot):
+            self.fetch_engine.submit(slot, self._revalidate_job, lat, lon, labels)
+
+    async def _revalidate_job(self, lat, lon, labels):
+        """Fetch fresh data for a stale cache entry"""
+        record = await self.fetch_engine.run_blocking(
+            weather_api.OPEN_METEO_HOST, self._fetch_record, lat, lon, labels
+        )
+        self.ui.post("cache_label", self.update_cache_indicator)
         
-        self.root.after(0, self.update_cache_indicator)
+        # Only repaint if the user is still looking at this location
+        current = self.current_location_data
+        still_shown = current and (current['lat'], current['lon']) == (lat, lon)
+        if still_shown and not self.fetch_engine.is_pending("display"):
+            self.show_report(record)
 
     def save_current_location(self):
         """Save the currently displayed location"""
+        self._ensure_started()
         if not self.current_location_data:
             messagebox.showwarning("No Location", "Please fetch weather for a location first.")
             return
         
+        # Another spelling of a place already in the list resolves to the same coordinates
+        existing = self.location_manager.find_by_coordinates(
+            self.current_location_data['lat'], self.current_location_data['lon']
+        )
+        if existing is not None:
+            messagebox.showinfo("Already Saved",
+                                f"This location is already in your list as '{existing['local_name']}'.")
+            return
+        
         success = self.location_manager.add_location(
             self.current_location_data['name'],
             self.current_location_data['lat'],
@@ -509,174 +646,60 @@ class WeatherAppGUI:
         )
         
         if success:
-            self.refresh_locations_list()
+            location = self.location_manager.get_location(self.current_location_data['name'])
+            self.location_list.add(location['name'], self.location_label(location))
             messagebox.showinfo("Success", f"Location '{self.current_location_data['local_name']}' saved!")
         else:
             messagebox.showinfo("Already Saved", "This location is already in your list.")
 
     def remove_selected_location(self):
         """Remove the selected location"""
-        selection = self.locations_listbox.curselection()
-        if not selection:
+        self._ensure_started()
+        location = self.location_manager.get_location(self.location_list.selected_id)
+        if location is None:
             messagebox.showwarning("No Selection", "Please select a location to remove.")
             return
         
-        idx = selection[0]
-        locations = self.location_manager.get_locations()
-        if idx >= len(locations):
-            return
-        
-        location = locations[idx]
         result = messagebox.askyesno("Confirm", f"Remove '{location['local_name']}'?")
         
         if result:
             self.location_manager.remove_location(location['name'])
-            self.refresh_locations_list()
+            self.location_list.remove(location['name'])
+
+    def _load_gazetteer(self):
+        """Open the offline gazetteer, building its index the first time"""
+        self.geocoder.gazetteer = load_gazetteer(script_dir)
 
     def get_coordinates(self, location_name):
         """Get coordinates and location names in multiple languages"""
-        # Lazy initialize geocoder
-        if not self.geolocator:
-            try:
-                self.geolocator = Nominatim(user_agent=f"weather_app_v{VERSION}")
-            except Exception as e:
-                raise RuntimeError(f"Geocoding service not available: {e}")
-        
-        try:
-            logger.info(f"Geocoding location: {location_name}")
-            location = self.geolocator.geocode(location_name, timeout=10, language='en')
-            
-            if location:
-                # Try to get local name
-                try:
-                    local_location = self.geolocator.geocode(location_name, timeout=10, 
-                                                            language='local', addressdetails=True)
-                    local_name = local_location.address if local_location else location.address
-                except:
-                    local_name = location.address
-                
-                logger.info(f"Found: {location.latitude}, {location.longitude}")
-                return location.latitude, location.longitude, location.address, local_name
-            else:
-                raise ValueError(f"Could not find location: {location_name}")
-                
-        except GeocoderTimedOut:
-            raise RuntimeError("Geocoding service timed out. Please try again.")
-        except GeocoderServiceError as e:
-            raise RuntimeError(f"Geocoding service error: {e}")
-        except Exception as e:
-            raise RuntimeError(f"Failed to get coordinates: {e}")
+        return self.geocode_pipeline.lookup(location_name)
 
     def fetch_weather_data(self, lat, lon):
-        """Fetch weather data from Open-Meteo API"""
-        try:
-            url = (
-                f"https://api.open-meteo.com/v1/forecast"
-                f"?latitude={lat}&longitude={lon}"
-                f"&current=temperature_2m,relative_humidity_2m,apparent_temperature,"
-                f"precipitation,rain,weather_code,cloud_cover,"
-                f"wind_speed_10m,wind_direction_10m"
-                f"&timezone=auto"
-            )
-            
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.Timeout:
-            raise RuntimeError("Weather API request timed out.")
-        except requests.exceptions.ConnectionError:
-            raise RuntimeError("Failed to connect to weather service.")
-        except Exception as e:
-            raise RuntimeError(f"Failed to fetch weather data: {e}")
-
-    def format_weather_data(self, weather_data, location_name, address_en, address_local=None):
-        """Format weather data for display with proper alignment"""
-        try:
-            current = weather_data.get('current', {})
-            
-            temp = current.get('temperature_2m', 'N/A')
-            feels_like = current.get('apparent_temperature', 'N/A')
-            humidity = current.get('relative_humidity_2m', 'N/A')
-            weather_code = current.get('weather_code', 0)
-            weather_desc = WEATHER_CODES.get(weather_code, "Unknown")
-            wind_speed = current.get('wind_speed_10m', 'N/A')
-            wind_direction = current.get('wind_direction_10m', 'N/A')
-            precipitation = current.get('precipitation', 0)
-            cloud_cover = current.get('cloud_cover', 'N/A')
-            
-            weather_icon = self.get_weather_icon(weather_code)
-            
-            # Format with proper alignment
-            output = "=" * 64 + "\n"
-            output += f"  WEATHER REPORT: {location_name.upper()}\n"
-            output += "=" * 64 + "\n\n"
-            
-            # Show both language versions if different
-            if address_local and address_local != address_en:
-                output += f"📍 Location (Local): {address_local}\n"
-                output += f"📍 Location (EN):    {address_en}\n"
-            else:
-                output += f"📍 Location: {address_en}\n"
-            
-            output += f"🕐 Time:     {current.get('time', 'N/A')}\n\n"
-            output += "─" * 64 + "\n"
-            output += "  CURRENT CONDITIONS\n"
-            output += "─" * 64 + "\n\n"
-            output += f"{weather_icon}  {weather_desc}\n\n"
-            
-            # Aligned data - no emojis on data lines for perfect alignment
-            output += f"Temperature:        {str(temp):>6}°C\n"
-            output += f"Feels Like:         {str(feels_like):>6}°C\n"
-            output += f"Humidity:           {str(humidity):>6}%\n"
-            output += f"Wind Speed:         {str(wind_speed):>6} km/h\n"
-            output += f"Wind Direction:     {str(wind_direction):>6}°\n"
-            output += f"Precipitation:      {str(precipitation):>6} mm\n"
-            output += f"Cloud Cover:        {str(cloud_cover):>6}%\n"
-            output += "\n" + "=" * 64 + "\n"
-            
-            return output
-            
-        except Exception as e:
-            logger.error(f"Error formatting weather data: {e}")
-            return f"Error formatting weather data: {e}"
-
-    def get_weather_icon(self, code):
-        """Get emoji icon for weather code"""
-        icons = {
-            0: "☀️", 1: "🌤️", 2: "🌤️", 3: "☁️",
-            45: "🌫️", 48: "🌫️",
-            51: "🌧️", 53: "🌧️", 55: "🌧️",
-            61: "🌧️", 63: "🌧️", 65: "⛈️",
-            71: "🌨️", 73: "🌨️", 75: "🌨️", 77: "🌨️",
-            80: "🌧️", 81: "🌧️", 82: "⛈️",
-            85: "🌨️", 86: "🌨️",
-            95: "⚡", 96: "⚡", 99: "⚡"
-        }
-        return icons.get(code, "🌈")
+        """Fetch weather data from Open-Meteo API (concurrent calls for one location share a request)"""
+        return self.weather_cache.fetch_once(lat, lon, lambda: weather_api.fetch_weather_data(lat, lon))
 
     def fetch_weather_threaded(self):
-        """Fetch weather in a separate thread"""
-        self._start_thread(self.fetch_weather)
-
-    def fetch_weather(self):
-        """Main method to fetch and display weather"""
+        """Fetch weather on the fetch engine (replaces any fetch still in flight)"""
+        self._ensure_started()
         city = self.city_entry.get().strip()
         
         if not city:
             messagebox.showwarning("Input Error", "Please enter a city name.")
             return
         
-        self.weather_text.config(state=tk.NORMAL)
-        self.weather_text.delete(1.0, tk.END)
-        self.weather_text.insert(tk.END, f"⏳ Fetching weather for {city}...\n")
-        self.weather_text.config(state=tk.DISABLED)
+        self.fetch_engine.submit("display", self.fetch_weather, city)
+
+    async def fetch_weather(self, city):
+        """Main method to fetch and display weather"""
+        self.show_text(f"⏳ Fetching weather for {city}...\n")
         
         try:
-            lat, lon, address_en, address_local = self.get_coordinates(city)
+            lat, lon, address_en, address_local = await self.fetch_engine.run_blocking(
+                NOMINATIM_HOST, self.get_coordinates, city
+            )
             
-            # Check cache first
-            cached = self.weather_cache.get(lat, lon)
+            # Check cache first (a fresh entry a few hundred metres away is just as good)
+            cached = await self._cached(lat, lon, NEARBY_RADIUS_KM)
             if cached:
                 self.current_location_data = {
                     'name': city,
@@ -685,19 +708,20 @@ class WeatherAppGUI:
                     'lon': lon,
                     'address': address_en
                 }
-                age = datetime.now() - cached['timestamp']
-                age_min = int(age.total_seconds() / 60)
-                cache_info = f"\n💾 Cached ({age_min} min old) • Fresh in {15-age_min} min\n"
-                
-                self.weather_text.config(state=tk.NORMAL)
-                self.weather_text.delete(1.0, tk.END)
-                self.weather_text.insert(tk.END, cached['formatted'] + cache_info)
-                self.weather_text.config(state=tk.DISABLED)
-                self.update_cache_indicator()
+                fresh = self.weather_cache.is_fresh(cached)
+                self.prefetcher.record_request('fresh' if fresh else 'stale')
+                # Render with this query's names; a nearby entry was stored under another one
+                self.show_report(cached.relabel(city, address_en, address_local), self._cache_info(cached))
+                self.ui.post("cache_label", self.update_cache_indicator)
+                if not fresh:
+                    self._revalidate(lat, lon, (city, address_en, address_local))
                 return
             
-            # Fetch new data
-            weather_data = self.fetch_weather_data(lat, lon)
+            # Fetch new data (and cache it, off the loop)
+            self.prefetcher.record_request('waited')
+            record = await self.fetch_engine.run_blocking(
+                weather_api.OPEN_METEO_HOST, self._fetch_record, lat, lon, (city, address_en, address_local)
+            )
             
             # Store current location
             self.current_location_data = {
@@ -708,40 +732,46 @@ class WeatherAppGUI:
                 'address': address_en
             }
             
-            formatted = self.format_weather_data(weather_data, city, address_en, address_local)
-            
-            # Cache it
-            self.weather_cache.set(lat, lon, weather_data, formatted)
-            self.update_cache_indicator()
-            
-            self.weather_text.config(state=tk.NORMAL)
-            self.weather_text.delete(1.0, tk.END)
-            self.weather_text.insert(tk.END, formatted)
-            self.weather_text.config(state=tk.DISABLED)
+            self.ui.post("cache_label", self.update_cache_indicator)
+            self.show_report(record)
             
         except Exception as e:
             logger.error(f"Error in fetch_weather: {e}")
             self.show_error(str(e))
 
-    def show_error(self, error_msg):
-        """Display error message"""
+    def show_text(self, text):
+        """Replace the weather display text (safe from any thread; applied on the next UI tick)"""
+        self.ui.post("weather_text", self._render_weather_text, text)
+
+    def show_report(self, record, footer=""):
+        """Display a weather record; the report is only rendered if this update is not superseded"""
+        self.ui.post("weather_text", lambda: self._render_weather_text(record.render() + footer))
+
+    def _render_weather_text(self, text):
+        """Repaint the weather display (main loop only)"""
         self.weather_text.config(state=tk.NORMAL)
         self.weather_text.delete(1.0, tk.END)
-        self.weather_text.insert(tk.END, "❌ ERROR\n\n")
-        self.weather_text.insert(tk.END, f"{error_msg}\n\n")
-        self.weather_text.insert(tk.END, "Please check:\n")
-        self.weather_text.insert(tk.END, "  • City name spelling\n")
-        self.weather_text.insert(tk.END, "  • Internet connection\n")
-        self.weather_text.insert(tk.END, "  • Try format: 'City, Country'\n")
+        self.weather_text.insert(tk.END, text)
         self.weather_text.config(state=tk.DISABLED)
 
+    def show_error(self, error_msg):
+        """Display error message"""
+        self.show_text(
+            "❌ ERROR\n\n"
+            f"{error_msg}\n\n"
+            "Please check:\n"
+            "  • City name spelling\n"
+            "  • Internet connection\n"
+            "  • Try format: 'City, Country'\n"
+        )
+
     def check_updates_startup(self):
         """Check for updates on startup (silent)"""
         try:
             time.sleep(2)
             update_info = self.update_manager.check_for_updates()
             if update_info:
-                self.root.after(0, lambda: self.update_button.config(
+                self.ui.post("update_button", lambda: self.update_button.config(
                     text=f"⬇️", bg=self.success_color
                 ))
         except Exception as e:
@@ -753,19 +783,17 @@ class WeatherAppGUI:
         
         def check_thread():
             try:
-                update_info = self.update_manager.check_for_updates()
+                update_info = self.update_manager.check_for_updates(force=True)
                 if update_info:
-                    self.root.after(0, lambda: self.show_update_dialog(update_info))
+                    self.ui.call(self.show_update_dialog, update_info)
                 else:
-                    self.root.after(0, lambda: messagebox.showinfo(
-                        "Up to Date", f"You are running the latest version (v{VERSION})"
-                    ))
+                    self.ui.call(messagebox.showinfo,
+                                 "Up to Date", f"You are running the latest version (v{VERSION})")
             except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror(
-                    "Update Check Failed", f"Failed to check for updates:\n{str(e)}"
-                ))
+                self.ui.call(messagebox.showerror,
+                             "Update Check Failed", f"Failed to check for updates:\n{str(e)}")
             finally:
-                self.root.after(0, lambda: self.update_button.config(state=tk.NORMAL))
+                self.ui.post("update_button", lambda: self.update_button.config(state=tk.NORMAL))
         
         threading.Thread(target=check_thread, daemon=True).start()
 
@@ -778,13 +806,74 @@ class WeatherAppGUI:
             self.install_update(update_info)
 
     def install_update(self, update_info):
-        """Install update"""
+        """Install update (the download and checksum run on a worker thread)"""
+        self.update_button.config(state=tk.DISABLED)
+        self._start_thread(self._install_update_thread, (update_info,))
+
+    def _install_update_thread(self, update_info):
+        """Download and verify the update with progress in the weather display, then close for updater.exe"""
         try:
-            self.update_manager.download_and_install_update(update_info)
-            time.sleep(0.5)
-            self.root.destroy()
+            self.update_manager.download_and_install_update(update_info, progress_callback=self.show_text)
+            self.ui.call(self.root.after, 500, self.on_closing)  # Flush and close everything before the swap
         except Exception as e:
-            messagebox.showerror("Update Failed", f"Failed to install update:\n{str(e)}")
+            self.ui.call(messagebox.showerror, "Update Failed", f"Failed to install update:\n{str(e)}")
+            self.ui.post("update_button", lambda: self.update_button.config(state=tk.NORMAL))
+
+    def show_diagnostics(self):
+        """Open (or raise) the live metrics panel"""
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.lift()
+            return
+        
+        window = tk.Toplevel(self.root, bg=self.bg_color)
+        window.title("Diagnostics")
+        window.geometry("760x480")
+        self.diagnostics_window = window
+        
+        btn_frame = tk.Frame(window, bg=self.bg_color)
+        btn_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        
+        text = scrolledtext.ScrolledText(
+            window, wrap=tk.NONE, font=("Courier New", 9),
+            bg="#1e1e1e", fg=self.fg_color, relief=tk.FLAT, padx=10, pady=10
+        )
+        text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        def refresh():
+            if not window.winfo_exists():
+                return
+            position = text.yview()[0]
+            text.config(state=tk.NORMAL)
+            text.delete(1.0, tk.END)
+            text.insert(tk.END, weather_metrics.REGISTRY.format_text())
+            text.config(state=tk.DISABLED)
+            text.yview_moveto(position)
+            window.after(DIAGNOSTICS_REFRESH_MS, refresh)
+        
+        save_btn = tk.Button(
+            btn_frame, text="💾 Save...", bg=self.accent_color, fg=self.fg_color,
+            font=("Arial", 9), command=self.save_metrics,
+            cursor="hand2", relief=tk.FLAT
+        )
+        save_btn.pack(side=tk.RIGHT)
+        
+        tk.Label(btn_frame, text="Updated every second", bg=self.bg_color,
+                 fg="#888888", font=("Arial", 8)).pack(side=tk.LEFT)
+        refresh()
+
+    def save_metrics(self):
+        """Dump the metrics to a JSON or Prometheus text file chosen by the user"""
+        path = filedialog.asksaveasfilename(
+            parent=self.diagnostics_window, initialdir=script_dir, initialfile=METRICS_DUMP_FILE,
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Prometheus text", "*.prom"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            weather_metrics.REGISTRY.dump(path)
+        except OSError as e:
+            messagebox.showerror("Save Failed", f"Could not write metrics:\n{e}")
 
     def set_window_icon(self):
         """Set window icon if available"""
@@ -798,6 +887,18 @@ class WeatherAppGUI:
     def on_closing(self):
         """Handle window closing"""
         logger.info("Application closing")
+        logger.info(f"UI dispatch stats: {self.ui.get_stats()}")
+        self.ui.stop()
+        if self.started:
+            # Stop the workers first, so nothing reads the caches or the gazetteer once they are closed
+            self.fetch_engine.stop()  # Cancels a prefetch pass the prefetcher may be waiting on
+            self.prefetcher.stop()
+            self.geocode_pipeline.stop()
+            self.weather_cache.close()
+            self.location_manager.close()
+            self.geocoder.cache.close()
+            if self.geocoder.gazetteer:
+                self.geocoder.gazetteer.close()
         self.root.destroy()
 
 
@@ -805,6 +906,7 @@ def main():
     """Main entry point"""
     try:
         root = tk.Tk()
+        startup.mark("tk init")
         app = WeatherAppGUI(root)
         root.protocol("WM_DELETE_WINDOW", app.on_closing)
         root.mainloop()
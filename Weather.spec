@@ -236,6 +236,12 @@ a = Analysis(
         'requests.adapters',
         'requests.packages',
         'requests.packages.urllib3',
+
+        # Modules Weather.py loads by name (LazyModule), invisible to the import analysis
+        'weather_api',
+        'weather_engine',
+        'weather_update',
+        'weather_download',
     ],
     hookspath=[],
     hooksconfig={},
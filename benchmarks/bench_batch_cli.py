@@ -0,0 +1,107 @@
+"""
+Benchmark: headless batch mode throughput and memory against the mock API
+
+Writes NDJSON location files of increasing size and streams them through
+BatchRunner (what `Weather.py --batch` uses) into a counting sink, sampling
+RSS as lines come out. Throughput should hold and peak RSS should stay flat
+as the input grows. A load-everything baseline (json.load, fetch, dump a
+list) is shown for comparison with --baseline; RSS does not shrink back,
+so it runs after the streaming run of each size.
+
+Usage: python benchmarks/bench_batch_cli.py [--sizes 5000 20000 80000] [--latency 0.02]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather_api
+from weather_batch import BatchRunner, iter_locations
+from weather_record import records_from_api
+from weather_report import report_dict
+from mock_servers import MockOpenMeteo
+from bench_cache_soak import rss_mb
+
+
+class CountingSink:
+    """File-like output that counts lines and samples RSS"""
+
+    def __init__(self, sample_every=2000):
+        self.lines = 0
+        self.bytes = 0
+        self.peak_rss = rss_mb()
+        self.sample_every = sample_every
+
+    def write(self, text):
+        before = self.lines
+        self.lines += text.count("\n")
+        self.bytes += len(text)
+        if self.lines // self.sample_every != before // self.sample_every:
+            self.peak_rss = max(self.peak_rss, rss_mb())
+
+    def flush(self):
+        pass
+
+
+def write_input(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({'name': f"Place {i}", 'lat': round(-60 + (i % 1200) * 0.1, 3),
+                                'lon': round(-180 + (i // 1200) * 0.05, 3)}) + "\n")
+
+
+def load_everything(path, sink, forecast_days):
+    """Baseline: read the whole file, fetch everything, then write everything"""
+    with open(path, encoding='utf-8') as f:
+        locations = [json.loads(line) for line in f]
+    responses = weather_api.fetch_weather_batch([(loc['lat'], loc['lon']) for loc in locations],
+                                                forecast_days=forecast_days)
+    records = records_from_api(responses, [(loc['name'], loc['name'], None) for loc in locations])
+    output = [json.dumps({'name': loc['name'], 'report': report_dict(record)}, ensure_ascii=False)
+              for loc, record in zip(locations, records)]
+    sink.peak_rss = max(sink.peak_rss, rss_mb())
+    sink.write("\n".join(output) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 20000, 80000])
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--forecast-days', type=int, default=1)
+    parser.add_argument('--baseline', action='store_true', help="also run the load-everything baseline")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    print(f"{'mode':<12}{'locations':>10}{'seconds':>9}{'loc/s':>9}{'first line ms':>15}{'peak RSS MB':>13}")
+    with MockOpenMeteo(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        weather_api.OPEN_METEO_URL = server.forecast_url
+        for count in args.sizes:
+            path = os.path.join(tmp, f"locations_{count}.ndjson")
+            write_input(path, count)
+
+            sink = CountingSink()
+            runner = BatchRunner(workers=args.workers, forecast_days=args.forecast_days)
+            stats = runner.run(iter_locations(path), sink)
+            assert sink.lines == count and stats['errors'] == 0
+            print(f"{'streaming':<12}{count:>10,}{stats['seconds']:>9.2f}{stats['per_second']:>9,.0f}"
+                  f"{stats['first_line_seconds'] * 1000:>15.1f}{sink.peak_rss:>13.1f}")
+
+            if args.baseline:
+                sink = CountingSink()
+                start = time.perf_counter()
+                load_everything(path, sink, args.forecast_days)
+                elapsed = time.perf_counter() - start
+                print(f"{'load all':<12}{count:>10,}{elapsed:>9.2f}{count / elapsed:>9,.0f}"
+                      f"{elapsed * 1000:>15.1f}{sink.peak_rss:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: batched multi-coordinate refresh vs the per-location loop
+
+Refreshes N synthetic saved locations against the mock Open-Meteo server,
+once with one request per location and once with fetch_weather_batch.
+
+Usage: python benchmarks/bench_batch_refresh.py [--locations 300] [--latency 0.02]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather_api
+from weather_cache import WeatherCache
+from weather_record import WeatherRecord
+from mock_servers import MockOpenMeteo
+
+
+def per_location(coords, cache):
+    for lat, lon in coords:
+        data = weather_api.fetch_weather_data(lat, lon)
+        cache.set(lat, lon, WeatherRecord.from_api(data, "", ""))
+
+
+def batched(coords, cache):
+    results = weather_api.fetch_weather_batch(coords)
+    cache.set_many((lat, lon, WeatherRecord.from_api(data, "", ""))
+                   for (lat, lon), data in zip(coords, results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--locations', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.02, help="mock API latency in seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    rng = random.Random(1)
+    coords = [(round(rng.uniform(-60, 70), 4), round(rng.uniform(-180, 180), 4))
+              for _ in range(args.locations)]
+
+    print(f"Locations: {args.locations}, mock latency {args.latency * 1000:.0f} ms\n")
+    print(f"{'mode':<14}{'wall (s)':>10}{'requests':>10}{'req/s':>10}{'loc/s':>10}")
+    with MockOpenMeteo(latency=args.latency) as server:
+        weather_api.OPEN_METEO_URL = server.forecast_url
+        for name, refresh in (("per-location", per_location), ("batched", batched)):
+            cache = WeatherCache(15)
+            before = server.requests
+            start = time.perf_counter()
+            refresh(coords, cache)
+            wall = time.perf_counter() - start
+            requests_made = server.requests - before
+            assert len(cache.cache) == len({cache.get_cache_key(*c) for c in coords})
+            print(f"{name:<14}{wall:>10.3f}{requests_made:>10}"
+                  f"{requests_made / wall:>10.1f}{args.locations / wall:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Soak benchmark: memory of a bounded WeatherCache over many distinct keys
+
+Writes a long stream of distinct coordinates (like a kiosk session that
+touches every place on a map) and samples the cache's accounted bytes and
+the process RSS. With the LRU budget the numbers should level off instead
+of growing with the number of keys.
+
+Usage: python benchmarks/bench_cache_soak.py [--keys 1000000] [--max-entries 5000]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weather_cache import WeatherCache
+from weather_record import WeatherRecord
+from mock_servers import fake_current_weather
+
+
+def rss_mb():
+    """Resident set size in MB (Linux /proc, falling back to peak RSS)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--keys', type=int, default=1_000_000)
+    parser.add_argument('--max-entries', type=int, default=5000)
+    parser.add_argument('--max-mb', type=float, default=32)
+    parser.add_argument('--samples', type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    cache = WeatherCache(15, max_entries=args.max_entries, max_bytes=int(args.max_mb * 1024 * 1024))
+    step = max(1, args.keys // args.samples)
+
+    print(f"{'keys written':>14}{'entries':>10}{'cache MB':>10}{'RSS MB':>9}{'evictions':>11}{'us/set':>8}")
+    start = time.perf_counter()
+    last = start
+    for i in range(1, args.keys + 1):
+        lat = -80 + (i % 160_000) / 1000
+        lon = -180 + (i // 160_000) / 10
+        cache.set(lat, lon, WeatherRecord.from_api(fake_current_weather(lat, lon), "Soak", "Soak"))
+        if i % step == 0:
+            now = time.perf_counter()
+            stats = cache.get_stats()
+            print(f"{i:>14,}{stats['entries']:>10}{stats['memory_bytes'] / 1e6:>10.1f}"
+                  f"{rss_mb():>9.1f}{stats['evictions']:>11,}{(now - last) / step * 1e6:>8.1f}")
+            last = now
+    print(f"\nTotal {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
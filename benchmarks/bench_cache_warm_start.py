@@ -0,0 +1,68 @@
+"""
+Benchmark: cold vs warm start time-to-first-forecast
+
+A cold start has an empty cache database and must go to the (mock) API.
+A warm start opens the database written by the previous run and is served
+from disk without any network round trip.
+
+Usage: python benchmarks/bench_cache_warm_start.py [--latency 0.25] [--runs 5]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather_api
+from weather_cache import WeatherCache
+from weather_record import WeatherRecord
+from mock_servers import MockOpenMeteo
+
+LAT, LON = 53.2194, 6.5665  # Groningen
+
+
+def time_to_first_forecast(db_path):
+    """Start a fresh cache on db_path and return seconds until a forecast is available"""
+    start = time.perf_counter()
+    cache = WeatherCache(15, persist_path=db_path)
+    cached = cache.get(LAT, LON)
+    if not cached:
+        data = weather_api.fetch_weather_data(LAT, LON)
+        cache.set(LAT, LON, WeatherRecord.from_api(data, "Groningen", "Groningen, Nederland"))
+    elapsed = time.perf_counter() - start
+    cache.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--latency', type=float, default=0.25, help="mock API latency in seconds")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    cold, warm = [], []
+    with MockOpenMeteo(latency=args.latency) as server:
+        weather_api.OPEN_METEO_URL = server.forecast_url
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as tmp:
+                db_path = os.path.join(tmp, "weather_cache.db")
+                cold.append(time_to_first_forecast(db_path))
+                warm.append(time_to_first_forecast(db_path))
+        api_calls = server.requests
+
+    cold_ms = 1000 * sum(cold) / len(cold)
+    warm_ms = 1000 * sum(warm) / len(warm)
+    print(f"Mock API latency:   {args.latency * 1000:.0f} ms ({api_calls} API calls for {args.runs} runs)")
+    print(f"Cold start:         {cold_ms:8.2f} ms")
+    print(f"Warm start:         {warm_ms:8.2f} ms")
+    print(f"Speedup:            {cold_ms / warm_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
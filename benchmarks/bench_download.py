@@ -0,0 +1,148 @@
+"""
+Benchmark: update/installer download throughput, one 8 KB stream vs the ranged Downloader
+
+Serves a release asset from the GitHub stand-in with a per-connection
+bandwidth cap (as CDN edges throttle single streams) and times:
+  the old download (one connection, 8 KB chunks, no checksum)
+  Downloader with 1, 2, 4 and 8 ranged connections (SHA-256 verified)
+then, without a cap, the chunk sizes the engine could use (throughput and
+CPU per MB), and finally resilience: connections dropped mid-range must be
+resumed without fetching the file again, a download aborted halfway must
+continue from its .part file in a new Downloader, and a wrong digest must
+leave no file behind.
+
+Usage: python benchmarks/bench_download.py [--size-mb 32] [--bandwidth-mb 8] [--total-bandwidth-mb 40]
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather_http
+from weather_download import Downloader, ChecksumMismatch, DOWNLOAD_CHUNK_BYTES
+from mock_servers import MockGitHub
+
+MB = 1024 * 1024
+CHUNK_SIZES = (8 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024)
+
+
+class Aborted(Exception):
+    """Stands in for the app being closed mid-download"""
+
+
+def legacy_download(url, dest_path):
+    """The installer's old download_file without the progress bar"""
+    response = weather_http.get(url, stream=True, timeout=30)
+    response.raise_for_status()
+    with open(dest_path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=8192):
+            if chunk:
+                f.write(chunk)
+
+
+def timed_download(func, *args):
+    start, cpu = time.perf_counter(), time.process_time()
+    func(*args)
+    return time.perf_counter() - start, time.process_time() - cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size-mb', type=int, default=32)
+    parser.add_argument('--bandwidth-mb', type=float, default=8.0, help="per-connection cap, MB/s")
+    parser.add_argument('--total-bandwidth-mb', type=float, default=40.0, help="cap for all connections, MB/s")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    size = args.size_mb * MB
+    body = random.Random(1).randbytes(size)
+    digest = f"sha256:{hashlib.sha256(body).hexdigest()}"
+    assets = {"Weather.exe": body}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def dest(name):
+            return os.path.join(tmp, name)
+
+        print(f"{args.size_mb} MB asset, {args.bandwidth_mb:g} MB/s per connection, "
+              f"{args.total_bandwidth_mb:g} MB/s in total\n")
+        print(f"{'download':<28}{'seconds':>9}{'MB/s':>8}{'CPU s':>8}")
+        with MockGitHub(assets=assets, bandwidth=args.bandwidth_mb * MB,
+                        total_bandwidth=args.total_bandwidth_mb * MB) as server:
+            url = f"{server.url}/download/Weather.exe"
+            seconds, cpu = timed_download(legacy_download, url, dest("legacy.exe"))
+            legacy_rate = size / seconds / MB
+            print(f"{'old: 1 stream, 8 KB':<28}{seconds:>9.2f}{legacy_rate:>8.1f}{cpu:>8.2f}")
+            rates = {}
+            for connections in (1, 2, 4, 8):
+                downloader = Downloader(connections=connections)
+                seconds, cpu = timed_download(downloader.download, url, dest(f"c{connections}.exe"), digest)
+                rates[connections] = size / seconds / MB
+                print(f"{f'new: {connections} connection(s)':<28}{seconds:>9.2f}{rates[connections]:>8.1f}{cpu:>8.2f}")
+                assert Path(dest(f"c{connections}.exe")).read_bytes() == body
+
+        print(f"\n{'chunk size (no cap)':<28}{'seconds':>9}{'MB/s':>8}{'CPU s/MB':>10}")
+        cpu_per_mb = {}
+        with MockGitHub(assets=assets) as server:
+            url = f"{server.url}/download/Weather.exe"
+            for chunk_size in CHUNK_SIZES:
+                downloader = Downloader(connections=1, chunk_size=chunk_size)
+                seconds, cpu = timed_download(downloader.download, url, dest(f"k{chunk_size}.exe"), digest)
+                cpu_per_mb[chunk_size] = cpu / args.size_mb
+                marker = "  <- DOWNLOAD_CHUNK_BYTES" if chunk_size == DOWNLOAD_CHUNK_BYTES else ""
+                print(f"{f'{chunk_size // 1024} KB':<28}{seconds:>9.2f}{size / seconds / MB:>8.1f}"
+                      f"{cpu_per_mb[chunk_size] * 1000:>8.2f}ms{marker}")
+
+            # Dropped connections: each range reconnects and continues from its last chunk
+            server.interruptions = [3 * MB, 5 * MB, 2 * MB]
+            sent = server.asset_bytes_sent
+            stats = Downloader().download(url, dest("dropped.exe"), digest)
+            refetched = server.asset_bytes_sent - sent - size
+            print(f"\nDropped 3 connections: {stats['retries']} resumes, {refetched / 1024:.0f} KB fetched twice")
+            assert stats['retries'] == 3 and Path(dest("dropped.exe")).read_bytes() == body
+            assert refetched < 3 * 2 * DOWNLOAD_CHUNK_BYTES, "interrupted ranges were fetched again from the start"
+
+            # Closed halfway: a later run (new Downloader, new process) continues from the .part file
+            def close_halfway(done, total):
+                if done > total // 2:
+                    raise Aborted()
+
+            try:
+                Downloader().download(url, dest("aborted.exe"), digest, close_halfway)
+            except Aborted:
+                pass
+            assert not os.path.exists(dest("aborted.exe")) and os.path.exists(dest("aborted.exe.part.json"))
+            sent = server.asset_bytes_sent
+            stats = Downloader().download(url, dest("aborted.exe"), digest)
+            second_run = server.asset_bytes_sent - sent
+            print(f"Closed halfway: next run kept {stats['resumed_bytes'] / MB:.1f} MB, "
+                  f"fetched {second_run / MB:.1f} MB of {args.size_mb} MB")
+            assert stats['resumed_bytes'] >= size // 2 - 4 * DOWNLOAD_CHUNK_BYTES
+            assert second_run <= size - stats['resumed_bytes'] + 1, "resumed bytes were downloaded again"
+            assert Path(dest("aborted.exe")).read_bytes() == body
+            assert not os.path.exists(dest("aborted.exe.part.json")), "state file left behind"
+
+            # A corrupted or substituted file is rejected and nothing is left to install
+            try:
+                Downloader().download(url, dest("tampered.exe"), "sha256:" + "0" * 64)
+                raise AssertionError("a wrong digest was accepted")
+            except ChecksumMismatch:
+                pass
+            assert not any(name.startswith("tampered.exe") for name in os.listdir(tmp))
+            print("Wrong digest: rejected, no file left")
+
+    best = max(rates.values())
+    print(f"\nBest {best:.1f} MB/s vs old {legacy_rate:.1f} MB/s ({best / legacy_rate:.1f}x)")
+    assert rates[4] > 2.5 * rates[1], "four connections should beat one per-connection cap by far"
+    assert cpu_per_mb[DOWNLOAD_CHUNK_BYTES] < cpu_per_mb[8 * 1024], "tuned chunk size should cost less CPU"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Stress test: rapid location clicks, thread-per-click vs the FetchEngine
+
+Simulates a user clicking through many saved locations a few milliseconds
+apart while the mock API answers with jittered latency. Reports how many
+upstream requests were made and whether the final display shows the last
+location clicked.
+
+Usage: python benchmarks/bench_fetch_engine.py [--clicks 40] [--interval 0.01]
+"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather_api
+from weather_engine import FetchEngine, wait_result
+from mock_servers import MockOpenMeteo
+
+
+class FakeDisplay:
+    """Stands in for the weather text widget: last writer wins"""
+
+    def __init__(self):
+        self.shown = None
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def show(self, location):
+        with self._lock:
+            self.shown = location
+            self.writes += 1
+
+
+def thread_per_click(locations, interval, display):
+    """The old behaviour: every click starts its own daemon thread"""
+    def worker(location):
+        weather_api.fetch_weather_data(*location)
+        display.show(location)
+
+    threads = []
+    for location in locations:
+        thread = threading.Thread(target=worker, args=(location,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        time.sleep(interval)
+    for thread in threads:
+        thread.join()
+
+
+def engine_clicks(locations, interval, display):
+    """Every click submits to the same slot, cancelling the one before"""
+    engine = FetchEngine().start()
+
+    async def job(location):
+        await engine.run_blocking(weather_api.OPEN_METEO_HOST, weather_api.fetch_weather_data, *location)
+        display.show(location)
+
+    future = None
+    for location in locations:
+        future = engine.submit("display", job, location)
+        time.sleep(interval)
+    wait_result(future)
+    # Let abandoned in-flight calls drain so the request count is final
+    while engine.get_stats()['calls_running']:
+        time.sleep(0.01)
+    stats = engine.get_stats()
+    engine.stop()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clicks', type=int, default=40)
+    parser.add_argument('--interval', type=float, default=0.01, help="seconds between clicks")
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.15)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("urllib3").setLevel(logging.ERROR)  # thread-per-click overflows the pool
+
+    locations = [(50.0 + i * 0.1, 5.0 + i * 0.1) for i in range(args.clicks)]
+    last = locations[-1]
+
+    print(f"{args.clicks} clicks, {args.interval * 1000:.0f} ms apart, "
+          f"API latency {args.latency * 1000:.0f}+{args.jitter * 1000:.0f} ms jitter\n")
+    print(f"{'mode':<18}{'requests':>10}{'redraws':>10}{'final correct':>15}")
+    with MockOpenMeteo(latency=args.latency, jitter=args.jitter) as server:
+        weather_api.OPEN_METEO_URL = server.forecast_url
+
+        display = FakeDisplay()
+        before = server.requests
+        thread_per_click(locations, args.interval, display)
+        print(f"{'thread per click':<18}{server.requests - before:>10}{display.writes:>10}"
+              f"{str(display.shown == last):>15}")
+
+        display = FakeDisplay()
+        before = server.requests
+        stats = engine_clicks(locations, args.interval, display)
+        print(f"{'fetch engine':<18}{server.requests - before:>10}{display.writes:>10}"
+              f"{str(display.shown == last):>15}")
+
+    print(f"\nEngine: {stats['superseded']} superseded, {stats['calls']} calls started, "
+          f"{stats['wasted_calls']} results discarded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: daily forecast aggregation, numpy vs pure-Python loops
+
+Builds hourly forecasts for many locations (500 x 384 hours = 16 days by
+default), then times the daily min/max/mean, precipitation sums and
+next-rain detection with the vectorized numpy path and with the
+pure-Python fallback used when numpy is not installed.
+
+Usage: python benchmarks/bench_forecast_aggregation.py [--locations 500] [--days 16]
+"""
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather_forecast
+from weather_forecast import HourlyBatch, aggregate, summarize
+from mock_servers import fake_current_weather, fake_forecast
+
+
+def best_of(repeat, func, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def close(a, b):
+    return (math.isnan(a) and math.isnan(b)) or abs(a - b) < 1e-3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--locations', type=int, default=500)
+    parser.add_argument('--days', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if weather_forecast.load_numpy() is None:
+        print("numpy is not installed; only the pure-Python path can run")
+        return
+
+    responses = []
+    for i in range(args.locations):
+        lat, lon = 35 + i * 0.05, -10 + i * 0.07
+        data = fake_current_weather(lat, lon)
+        data.update(fake_forecast(lat, lon, args.days))
+        responses.append(data)
+
+    print(f"{args.locations} locations x {args.days * 24} hours\n")
+    print(f"{'path':<14}{'load ms':>10}{'aggregate ms':>14}{'summarize ms':>14}")
+    results = {}
+    for name, use_numpy in (("pure Python", False), ("numpy", True)):
+        load, batch = best_of(args.repeat, HourlyBatch, responses, use_numpy)
+        compute, _ = best_of(args.repeat, aggregate, batch)
+        total, summaries = best_of(args.repeat, summarize, responses, weather_forecast.RAIN_THRESHOLD_MM,
+                                   use_numpy)
+        results[name] = (compute, total, summaries)
+        print(f"{name:<14}{load * 1000:>10.1f}{compute * 1000:>14.1f}{total * 1000:>14.1f}")
+
+    python_compute, python_total, expected = results["pure Python"]
+    numpy_compute, numpy_total, actual = results["numpy"]
+    for a, b in zip(expected, actual):
+        assert a.next_rain == b.next_rain and a.codes == b.codes
+        assert all(close(x, y) for x, y in zip(a.values, b.values))
+    print(f"\nAggregation speedup {python_compute / numpy_compute:.1f}x, "
+          f"end to end {python_total / numpy_total:.1f}x (results match)")
+
+
+if __name__ == "__main__":
+    main()
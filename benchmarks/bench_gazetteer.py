@@ -0,0 +1,227 @@
+"""
+Benchmark: offline gazetteer build, open, memory and lookups/sec at 100k+ places
+
+Generates a synthetic GeoNames dump (19 columns, alternate names, accented
+and repeated names across countries), builds the index once and measures
+opening it, the memory that costs, and forward (name) and reverse (nearest
+place) lookups per second. The same lookups are timed against the naive
+alternative of parsing the whole file into a dict and scanning every place
+for the nearest one. Answers are checked against the naive ones, and a
+Geocoder with the gazetteer must resolve known names without a single
+geolocator request.
+
+Usage: python benchmarks/bench_gazetteer.py [--places 120000] [--lookups 20000]
+"""
+
+import argparse
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weather_gazetteer import Gazetteer, build_index, name_key, _read_places
+from weather_geocode import Geocoder
+
+SYLLABLES = ["ber", "lin", "ams", "ter", "dam", "gro", "nin", "gen", "zü", "rich", "sa", "o", "pau", "lo",
+             "kra", "ków", "rey", "kja", "vík", "mü", "nchen", "sto", "ck", "holm", "bo", "go", "tá"]
+COUNTRIES = {"NL": "Netherlands", "DE": "Germany", "CH": "Switzerland", "BR": "Brazil", "PL": "Poland",
+             "IS": "Iceland", "SE": "Sweden", "CO": "Colombia", "US": "United States", "FR": "France"}
+NOMINATIM_RATE = 1.0  # What the online path manages per second
+
+
+def synthetic_name(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def write_dump(path, count, rng):
+    """GeoNames-style rows; a tenth of the names repeat in another country"""
+    names = []
+    with open(path, 'w', encoding='utf-8') as f:
+        for geoname_id in range(count):
+            if names and rng.random() < 0.1:
+                name = rng.choice(names)
+            else:
+                name = f"{synthetic_name(rng)} {synthetic_name(rng)}" if rng.random() < 0.3 else synthetic_name(rng)
+                names.append(name)
+            ascii_name = name_key(name).title()
+            alternates = ",".join(synthetic_name(rng) for _ in range(rng.randint(0, 2)))
+            lat = math.degrees(math.asin(rng.uniform(-1, 1)))  # Uniform over the sphere
+            lon = rng.uniform(-180, 180)
+            code = rng.choice(list(COUNTRIES))
+            population = int(rng.paretovariate(1.2) * 500)
+            f.write("\t".join([str(geoname_id), name, ascii_name, alternates, f"{lat:.5f}", f"{lon:.5f}",
+                               "P", "PPL", code, "", "", "", "", "", str(population), "", "0",
+                               "Europe/Amsterdam", "2024-01-01"]) + "\n")
+    return names
+
+
+def write_countries(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("#ISO\tISO3\tISO-Numeric\tfips\tCountry\n")
+        for code, country in COUNTRIES.items():
+            f.write(f"{code}\t{code}X\t0\t{code}\t{country}\n")
+
+
+class NaiveGazetteer:
+    """Everything parsed into Python objects; nearest place by scanning all of them"""
+
+    def __init__(self, path, countries):
+        self.places = []
+        self.by_name = {}
+        for names, lat, lon, population, code, country in _read_places(path, countries):
+            number = len(self.places)
+            self.places.append((names[0], lat, lon, population, country))
+            for key in {name_key(name) for name in names if name.strip()}:
+                best = self.by_name.get(key)
+                if best is None or population > self.places[best][3]:
+                    self.by_name[key] = number
+
+    def lookup(self, name):
+        number = self.by_name.get(name_key(name))
+        return None if number is None else self.places[number]
+
+    def nearest(self, lat, lon):
+        phi, lam = math.radians(lat), math.radians(lon)
+        best, best_distance = None, None
+        for number, (_, plat, plon, _, _) in enumerate(self.places):
+            p2, l2 = math.radians(plat), math.radians(plon)
+            distance = (math.sin((p2 - phi) / 2) ** 2
+                        + math.cos(phi) * math.cos(p2) * math.sin((l2 - lam) / 2) ** 2)
+            if best_distance is None or distance < best_distance:
+                best, best_distance = number, distance
+        return best, 2 * 6371.0 * math.asin(math.sqrt(best_distance))
+
+
+class CountingGeolocator:
+    """Geolocator stand-in that only counts requests"""
+
+    def __init__(self):
+        self.requests = 0
+
+    def geocode(self, query, **kwargs):
+        self.requests += 1
+        return None
+
+
+def rate(count, seconds):
+    return count / seconds if seconds else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--places', type=int, default=120000)
+    parser.add_argument('--lookups', type=int, default=20000, help="forward and reverse lookups timed")
+    parser.add_argument('--naive-reverse', type=int, default=20, help="reverse lookups timed by full scan")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "gazetteer.txt")
+        countries_path = os.path.join(tmp, "countryInfo.txt")
+        index_path = os.path.join(tmp, "gazetteer.idx")
+        names = write_dump(source, args.places, rng)
+        write_countries(countries_path)
+        print(f"{args.places} places, {len(names)} distinct primary names, "
+              f"source {os.path.getsize(source) / 1e6:.1f} MB\n")
+
+        start = time.perf_counter()
+        build_index(source, index_path, countries_path)
+        build_seconds = time.perf_counter() - start
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        gazetteer = Gazetteer(index_path)
+        open_ms = (time.perf_counter() - start) * 1000
+        gazetteer_heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        naive = NaiveGazetteer(source, {code: country for code, country in COUNTRIES.items()})
+        naive_load_ms = (time.perf_counter() - start) * 1000
+        naive_heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        queries = [rng.choice(names) for _ in range(args.lookups)]
+        misses = [f"Nowhere {i}" for i in range(args.lookups // 10)]
+        start = time.perf_counter()
+        answers = [gazetteer.lookup(query) for query in queries]
+        forward_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        missed = [gazetteer.lookup(query) for query in misses]
+        miss_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        naive_answers = [naive.lookup(query) for query in queries]
+        naive_forward_seconds = time.perf_counter() - start
+
+        points = [(math.degrees(math.asin(rng.uniform(-1, 1))), rng.uniform(-180, 180))
+                  for _ in range(args.lookups)]
+        start = time.perf_counter()
+        nearest = [gazetteer.nearest(lat, lon)[0] for lat, lon in points]
+        reverse_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        naive_nearest = [naive.nearest(lat, lon) for lat, lon in points[:args.naive_reverse]]
+        naive_reverse_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for lat, lon in points[:1000]:
+            gazetteer.nearest(lat, lon, k=10)
+        k10_seconds = time.perf_counter() - start
+
+        print(f"{'':<28}{'gazetteer':>14}{'naive':>14}")
+        print(f"{'build index (once)':<28}{build_seconds:>13.2f}s{'-':>14}")
+        print(f"{'open / load':<28}{open_ms:>12.2f}ms{naive_load_ms:>12.0f}ms")
+        print(f"{'python heap after load':<28}{gazetteer_heap / 1e6:>12.2f}MB{naive_heap / 1e6:>12.1f}MB")
+        print(f"{'index file (mapped)':<28}{os.path.getsize(index_path) / 1e6:>12.1f}MB{'-':>14}")
+        print(f"{'forward lookups/s':<28}{rate(len(queries), forward_seconds):>14,.0f}"
+              f"{rate(len(queries), naive_forward_seconds):>14,.0f}")
+        print(f"{'forward misses/s':<28}{rate(len(misses), miss_seconds):>14,.0f}{'-':>14}")
+        print(f"{'reverse lookups/s':<28}{rate(len(points), reverse_seconds):>14,.0f}"
+              f"{rate(args.naive_reverse, naive_reverse_seconds):>14,.1f}")
+        print(f"{'reverse k=10 lookups/s':<28}{rate(1000, k10_seconds):>14,.0f}{'-':>14}")
+        print(f"\nNominatim allows {NOMINATIM_RATE:g} lookup/s; offline forward is "
+              f"{rate(len(queries), forward_seconds) / NOMINATIM_RATE:,.0f}x that")
+
+        # Same answers as the naive version (the most populous place of a name; the nearest place)
+        for query, answer, expected in zip(queries, answers, naive_answers):
+            assert answer is not None, f"{query} not found"
+            assert answer[2] == f"{expected[0]}, {expected[4]}" and abs(answer[0] - expected[1]) < 1e-6, \
+                f"{query}: {answer} != {expected}"
+        assert not any(missed), "a name that is not in the file was found"
+        for (distance, place), (expected, expected_km) in zip(nearest, naive_nearest):
+            # Coordinates are stored as float32 on the unit sphere: equal within a few metres
+            assert abs(distance - expected_km) < 0.05, f"nearest {distance:.3f} km != {expected_km:.3f} km"
+        qualified = f"{naive.places[0][0]}, {naive.places[0][4]}"
+        assert gazetteer.lookup(qualified) is not None, f"{qualified} not found"
+        assert gazetteer.lookup(f"{naive.places[0][0]}, Atlantis") is None, "country qualifier ignored"
+
+        # Known names never reach the geolocator; unknown ones still do
+        geolocator = CountingGeolocator()
+        geocoder = Geocoder("bench-gazetteer", geolocator=geolocator, gazetteer=gazetteer)
+        for query in queries[:1000]:
+            geocoder.lookup(query)
+        assert geolocator.requests == 0, f"{geolocator.requests} geolocator requests for known names"
+        try:
+            geocoder.lookup("Nowhere at all")
+        except RuntimeError:
+            pass
+        assert geolocator.requests == 1, "an unknown name did not fall back to the geolocator"
+        print(f"Geocoder: 1000 known names, {geolocator.requests - 1} geolocator requests; "
+              f"unknown name fell back to it")
+
+        assert open_ms < 50, f"opening the index took {open_ms:.1f} ms"
+        assert gazetteer_heap < naive_heap / 100, "opening the index should not load it into the heap"
+        assert rate(len(points), reverse_seconds) > 100 * rate(args.naive_reverse, naive_reverse_seconds)
+        gazetteer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: geocoding latency with and without the GeocodeCache
+
+Uses a stub geolocator that sleeps like a Nominatim round trip, then
+replays a query mix where most lookups repeat an earlier city.
+
+Usage: python benchmarks/bench_geocode_cache.py [--latency 0.05] [--queries 200]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weather_geocode import Geocoder, GeocodeCache
+
+CITIES = ["Groningen", "Amsterdam", "Utrecht", "Rotterdam", "Berlin",
+          "Paris", "London", "Madrid", "Rome", "Oslo"]
+
+
+class StubLocation:
+    def __init__(self, name):
+        self.latitude = 50.0 + len(name)
+        self.longitude = 5.0 + len(name) / 10
+        self.address = f"{name}, Stubland"
+
+
+class StubGeolocator:
+    """Stands in for Nominatim with a fixed round-trip delay"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def geocode(self, query, timeout=None, language=None, addressdetails=False):
+        self.calls += 1
+        time.sleep(self.latency)
+        return StubLocation(query.split(",")[0].strip().title())
+
+
+def run(geocoder, queries):
+    start = time.perf_counter()
+    for query in queries:
+        geocoder.lookup(query)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--latency', type=float, default=0.05, help="stub round trip in seconds")
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    rng = random.Random(42)
+    # Vary case and spacing so the normalized key is what produces the hits
+    queries = [rng.choice([c, c.lower(), f"  {c.upper()} "]) for c in rng.choices(CITIES, k=args.queries)]
+
+    uncached_stub = StubGeolocator(args.latency)
+    uncached = run(Geocoder("bench", geolocator=uncached_stub), queries)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = GeocodeCache(persist_path=os.path.join(tmp, "geocode_cache.json"))
+        cached_stub = StubGeolocator(args.latency)
+        cached = run(Geocoder("bench", cache=cache, geolocator=cached_stub), queries)
+        cache.close()
+        stats = cache.get_stats()
+
+        # A restart reloads the persisted cache and should not touch the network at all
+        restart_stub = StubGeolocator(args.latency)
+        restarted = run(Geocoder("bench", cache=GeocodeCache(persist_path=cache.persist_path),
+                                 geolocator=restart_stub), queries)
+
+    print(f"Queries:              {args.queries} ({len(CITIES)} distinct cities)")
+    print(f"No cache:             {uncached * 1000:9.1f} ms, {uncached_stub.calls} geocoder calls")
+    print(f"With cache:           {cached * 1000:9.1f} ms, {cached_stub.calls} geocoder calls")
+    print(f"After restart:        {restarted * 1000:9.1f} ms, {restart_stub.calls} geocoder calls")
+    print(f"Hits / misses:        {stats['hits']} / {stats['misses']} (hit rate {stats['hit_rate']:.1%})")
+    print(f"Mean lookup (cached): {cached / args.queries * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark: bulk geocoding against a rate-limited Nominatim stand-in, direct vs GeocodePipeline
+
+The stand-in answers HTTP 429 to any request that arrives sooner than
+1/rate after the previous one, like Nominatim's usage policy (scaled up
+from 1 request per second so the run is short). A list of cities is
+imported twice:
+  direct     Geocoder.lookup back to back, no limiter (the old batch path)
+  pipeline   GeocodePipeline.stream() with a token bucket at the same rate,
+             while interactive lookups arrive in the middle of the import
+The pipeline must not be throttled once, must resolve every name, must
+not send a duplicate name twice, and its interactive lookups must not
+wait behind the bulk queue.
+
+Usage: python benchmarks/bench_geocode_pipeline.py [--rate 10] [--cities 40] [--interactive 5]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from geopy.geocoders import Nominatim
+
+from weather_geocode import Geocoder, GeocodeCache, GeocodePipeline, PRIORITY_BULK
+from weather_ratelimit import TokenBucket
+from mock_servers import MockNominatim
+
+REQUESTS_PER_LOOKUP = 2  # English and local name
+
+
+def make_geocoder(server, tmp, name, limiter=None):
+    geolocator = Nominatim(user_agent="bench-pipeline", domain=server.domain, scheme="http")
+    return Geocoder("bench-pipeline", cache=GeocodeCache(persist_path=os.path.join(tmp, name)),
+                    geolocator=geolocator, rate_limiter=limiter)
+
+
+def run_direct(server, geocoder, names):
+    failures = 0
+    start = time.perf_counter()
+    for name in names:
+        try:
+            geocoder.lookup(name)
+        except Exception:
+            failures += 1
+    return time.perf_counter() - start, failures
+
+
+def run_pipeline(server, geocoder, names, interactive_names, rate):
+    pipeline = GeocodePipeline(geocoder).start()
+    interactive_latency = []
+    depth_samples = []
+
+    def interactive():
+        # Typed searches arriving while the import is running
+        time.sleep(REQUESTS_PER_LOOKUP * 3 / rate)
+        for name in interactive_names:
+            start = time.perf_counter()
+            pipeline.lookup(name, timeout=60)
+            interactive_latency.append(time.perf_counter() - start)
+            depth_samples.append(pipeline.queue_depth())
+            time.sleep(REQUESTS_PER_LOOKUP * 2 / rate)
+
+    thread = threading.Thread(target=interactive)
+    thread.start()
+    start = time.perf_counter()
+    first = None
+    resolved = failures = 0
+    for name, result, error in pipeline.stream(names, PRIORITY_BULK):
+        first = first or time.perf_counter() - start
+        resolved += error is None
+        failures += error is not None
+    seconds = time.perf_counter() - start
+    thread.join()
+    stats = pipeline.get_stats()
+    pipeline.stop()
+    return seconds, first, resolved, failures, interactive_latency, max(depth_samples, default=0), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rate', type=float, default=10.0, help="requests per second the stand-in allows")
+    parser.add_argument('--cities', type=int, default=40)
+    parser.add_argument('--interactive', type=int, default=5, help="interactive lookups during the import")
+    parser.add_argument('--latency', type=float, default=0.01, help="stand-in round trip in seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    unique = [f"Import City {i}" for i in range(args.cities)]
+    # Every fifth name comes back in another spelling; the queue must merge them
+    names = unique + [unique[i].upper() for i in range(0, args.cities, 5)]
+    interactive_names = [f"Typed City {i}" for i in range(args.interactive)]
+    interval = 1 / args.rate
+
+    print(f"Stand-in allows {args.rate:g} requests/s; {len(names)} names ({args.cities} unique), "
+          f"{REQUESTS_PER_LOOKUP} requests per lookup\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        with MockNominatim(rate_limit=args.rate, latency=args.latency) as server:
+            direct_seconds, direct_failures = run_direct(server, make_geocoder(server, tmp, "direct.json"),
+                                                         unique[:10])
+            direct_throttled = server.throttled
+        print(f"direct (10 names):  {direct_seconds:6.2f}s, {direct_throttled} requests throttled, "
+              f"{direct_failures} lookups failed")
+
+        with MockNominatim(rate_limit=args.rate, latency=args.latency) as server:
+            limiter = TokenBucket(args.rate)
+            seconds, first, resolved, failures, latency, depth, stats = run_pipeline(
+                server, make_geocoder(server, tmp, "pipeline.json", limiter), names, interactive_names, args.rate)
+            requests, throttled = server.requests, server.throttled
+
+    ideal = (args.cities + args.interactive) * REQUESTS_PER_LOOKUP * interval
+    print(f"pipeline:           {seconds:6.2f}s (ideal at the rate {ideal:.2f}s), first result after "
+          f"{first:.2f}s, {throttled} requests throttled, {resolved} resolved, {failures} failed")
+    print(f"  requests sent {requests}, deduplicated names {stats['deduplicated']}, "
+          f"max queue depth seen {depth}")
+    for label, wait in sorted(stats['wait'].items()):
+        print(f"  {label:<12} queue wait avg {wait['avg_seconds'] * 1000:7.0f} ms, "
+              f"max {wait['max_seconds'] * 1000:7.0f} ms ({wait['count']} lookups)")
+    print(f"  interactive lookup latency max {max(latency) * 1000:.0f} ms")
+
+    assert throttled == 0, f"pipeline was throttled {throttled} times"
+    assert resolved == len(names) and not failures, "not every name was resolved"
+    assert requests == (args.cities + args.interactive) * REQUESTS_PER_LOOKUP, f"{requests} requests sent"
+    # At worst a lookup waits for the bulk lookup in progress, then makes its own requests
+    bound = (REQUESTS_PER_LOOKUP * 2 + 1) * interval + 0.5
+    assert max(latency) < bound, f"interactive lookup took {max(latency):.2f}s (bound {bound:.2f}s)"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: bare requests.get vs the shared pooled HttpClient
+
+Fires the same number of Open-Meteo calls from a thread pool, first with a
+fresh connection per call and then through weather_http, and reports wall
+time plus the TCP connections the mock server had to accept.
+
+Usage: python benchmarks/bench_http_pool.py [--requests 400] [--workers 8]
+"""
+
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import requests
+
+import weather_http
+from mock_servers import MockOpenMeteo
+
+
+def run(get, url, total, workers):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for response in pool.map(lambda i: get(f"{url}?latitude={i % 90}&longitude=5", timeout=10),
+                                 range(total)):
+            response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help="mock API latency in seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    client = weather_http.configure(pool_size=args.workers)
+    print(f"{'mode':<14}{'wall (s)':>10}{'req/s':>10}{'server conns':>14}")
+    with MockOpenMeteo(latency=args.latency) as server:
+        for name, get in (("bare get", requests.get), ("pooled", client.get)):
+            before = server.connections
+            wall = run(get, server.forecast_url, args.requests, args.workers)
+            print(f"{name:<14}{wall:>10.3f}{args.requests / wall:>10.1f}"
+                  f"{server.connections - before:>14}")
+
+    stats = client.get_stats()
+    print(f"\nHttpClient: {stats['requests']} requests, {stats['connections_opened']} connections "
+          f"opened, reuse rate {stats['reuse_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Benchmark: installer extract, download and progress, old install_thread vs streaming extraction
+Builds a large synthetic onedir release (Weather/ with thousands of small
+files and a few large libraries) and measures:
+  extract   old extractall into _temp_extract + move into place, vs
+            extract_zip writing each member once at its final path
+            (1 worker, and several for large members): best-of-3 time and
+            peak extra disk space over the old install and the zip
+  install   download + extract end to end from the GitHub stand-in, with
+            a per-connection bandwidth cap: old single 8 KB stream vs the
+            installer's download_files
+  assets    standalone Weather.exe + updater.exe, one after the other vs
+            concurrently
+  progress  callbacks the old code turned into redraws vs the redraws the
+            installer applies through its UIDispatcher at PROGRESS_TICK_MS
+The Tk root is the headless stand-in from bench_ui_dispatch.
+
+Usage: python benchmarks/bench_install.py [--small-files 3000] [--large-mb 24] [--large-files 4] [--bandwidth-mb 8]
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather_http
+from weather_extract import extract_zip, EXTRACT_WORKERS
+from weather_installer import InstallerGUI, PROGRESS_TICK_MS
+from weather_ui import UIDispatcher
+from bench_ui_dispatch import FakeRoot
+from mock_servers import MockGitHub
+
+MB = 1024 * 1024
+
+
+def build_release(path, small_files, large_files, large_mb):
+    """Onedir zip like PyInstaller's: Weather/Weather.exe, Weather/_internal/... (about half compressible)"""
+    rng = random.Random(25)
+    noise = rng.randbytes(4 * MB)
+    pattern = (b"weather_app " * 400)[:4096]
+
+    def payload(size, seed):
+        offset = seed * 4099 % (len(noise) - 4096)
+        blocks = []
+        for start in range(0, size, 8192):
+            blocks.append(noise[offset:offset + 4096])
+            blocks.append(pattern)
+            offset = (offset + 12289) % (len(noise) - 4096)
+        return b"".join(blocks)[:size]
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        archive.writestr("Weather/Weather.exe", payload(6 * MB, 1))
+        for n in range(large_files):
+            archive.writestr(f"Weather/_internal/lib{n}.dll", payload(large_mb * MB, n + 2))
+        for n in range(small_files):
+            archive.writestr(f"Weather/_internal/pkg{n % 60}/module{n}.pyc", payload(rng.randint(2048, 40960), n))
+    return os.path.getsize(path)
+
+
+def legacy_extract(zip_path, install_dir):
+    """The old install_thread extraction"""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        temp_extract = install_dir / "_temp_extract"
+        temp_extract.mkdir(exist_ok=True)
+        zip_ref.extractall(temp_extract)
+        for item in (temp_extract / "Weather").iterdir():
+            dest = install_dir / item.name
+            if dest.exists():
+                if dest.is_dir():
+                    shutil.rmtree(dest)
+                else:
+                    dest.unlink()
+            shutil.move(str(item), str(dest))
+        shutil.rmtree(temp_extract)
+
+
+def legacy_download(url, dest_path, progress):
+    """The old download_file: one stream, a progress update per 8 KB"""
+    response = weather_http.get(url, stream=True, timeout=30)
+    response.raise_for_status()
+    with open(dest_path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=8192):
+            if chunk:
+                f.write(chunk)
+                progress()
+
+
+def tree_digest(root):
+    digest = hashlib.sha256()
+    for path in sorted(Path(root).rglob("*")):
+        if path.is_file():
+            digest.update(path.relative_to(root).as_posix().encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class FakeVar:
+    """Stands in for a tk Variable; every set() is a redraw of the bound widget"""
+
+    def __init__(self, main_thread):
+        self.main_thread = main_thread
+        self.sets = 0
+        self.foreign = 0
+
+    def set(self, value):
+        self.sets += 1
+        self.foreign += threading.current_thread() is not self.main_thread
+
+
+class HeadlessInstaller:
+    """InstallerGUI's progress and download code on the headless root (the widgets are not built)"""
+
+    def __init__(self):
+        self.root = FakeRoot()
+        self.gui = InstallerGUI.__new__(InstallerGUI)
+        self.gui.root = self.root
+        self.gui.progress_var = FakeVar(threading.current_thread())
+        self.gui.status_text = FakeVar(threading.current_thread())
+        self.gui.ui = UIDispatcher(self.root, tick_ms=PROGRESS_TICK_MS).start()
+
+    def run(self, func):
+        """Run func on a worker thread as install_thread does, with the main loop going; returns seconds"""
+        errors = []
+
+        def worker():
+            try:
+                func(self.gui)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                self.root.after(PROGRESS_TICK_MS * 3, self.root.quit)  # Let the last tick land
+
+        start = time.perf_counter()
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.mainloop()
+        if errors:
+            raise errors[0]
+        return time.perf_counter() - start - PROGRESS_TICK_MS * 3 / 1000
+
+    @property
+    def redraws(self):
+        return self.gui.progress_var.sets
+
+    @property
+    def foreign(self):
+        return self.gui.progress_var.foreign + self.gui.status_text.foreign
+
+
+class DiskPeak:
+    """Most disk space in use on a filesystem while the block runs, above what was in use before"""
+
+    def __init__(self, path):
+        self.path = path
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def used(self):
+        stat = os.statvfs(self.path)
+        return (stat.f_blocks - stat.f_bfree) * stat.f_frsize
+
+    def __enter__(self):
+        self.base = self.used()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, self.used() - self.base)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.used() - self.base)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--small-files', type=int, default=3000)
+    parser.add_argument('--large-files', type=int, default=4)
+    parser.add_argument('--large-mb', type=int, default=24)
+    parser.add_argument('--bandwidth-mb', type=float, default=8.0, help="per-connection cap, MB/s")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        zip_path = tmp / "Weather_onedir.zip"
+        zip_size = build_release(zip_path, args.small_files, args.large_files, args.large_mb)
+        with zipfile.ZipFile(zip_path) as archive:
+            unpacked = sum(info.file_size for info in archive.infolist())
+            members = len(archive.infolist())
+        print(f"Release: {members} files, {unpacked / MB:.0f} MB unpacked, {zip_size / MB:.0f} MB zipped; "
+              f"{os.cpu_count()} CPU(s), EXTRACT_WORKERS={EXTRACT_WORKERS}\n")
+
+        # Extract, into an existing install as an update does
+        print(f"{'extract (best of 3)':<34}{'seconds':>9}{'MB/s':>8}{'peak extra MB':>15}")
+        times = {}
+        peaks = {}
+        digests = {}
+        runs = (("old: extractall + move", lambda d: legacy_extract(zip_path, d)),
+                ("new: streamed, 1 worker", lambda d: extract_zip(zip_path, d, "Weather/", workers=1, replace=True)),
+                (f"new: streamed, {max(2, EXTRACT_WORKERS)} workers",
+                 lambda d: extract_zip(zip_path, d, "Weather/", workers=max(2, EXTRACT_WORKERS), replace=True)))
+        for name, run in runs:
+            install_dir = tmp / f"install-{len(times)}"
+            install_dir.mkdir()
+            run(install_dir)  # The previous version
+            best = float('inf')
+            for _ in range(3):
+                with DiskPeak(install_dir) as disk:
+                    start = time.perf_counter()
+                    run(install_dir)
+                    best = min(best, time.perf_counter() - start)
+            times[name] = best
+            peaks[name] = disk.peak
+            digests[name] = tree_digest(install_dir)
+            shutil.rmtree(install_dir)
+            print(f"{name:<34}{best:>9.2f}{unpacked / best / MB:>8.1f}{disk.peak / MB:>15.0f}")
+        assert len(set(digests.values())) == 1, "extractions differ"
+        legacy_time, streamed_time, parallel_time = times.values()
+        legacy_peak, streamed_peak, _ = peaks.values()
+
+        # End to end: download the zip and unpack it, as install_thread does
+        assets = {"Weather_onedir.zip": zip_path.read_bytes(),
+                  "Weather.exe": random.Random(1).randbytes(24 * MB),
+                  "updater.exe": random.Random(2).randbytes(2 * MB)}
+        with MockGitHub(assets=assets, bandwidth=args.bandwidth_mb * MB) as server:
+            release = {asset['name']: asset for asset in server.release()['assets']}
+            onedir = release["Weather_onedir.zip"]
+
+            old_dir = tmp / "old"
+            old_dir.mkdir()
+            callbacks = [0]
+
+            def count():
+                callbacks[0] += 1
+
+            start = time.perf_counter()
+            legacy_download(onedir['browser_download_url'], old_dir / "Weather_onedir.zip", count)
+            legacy_extract(old_dir / "Weather_onedir.zip", old_dir)
+            old_install = time.perf_counter() - start
+
+            installer = HeadlessInstaller()
+            new_dir = tmp / "new"
+            new_dir.mkdir()
+
+            def install(gui):
+                gui.download_files([(onedir, new_dir / "Weather_onedir.zip")], 20, 70)
+                extract_zip(new_dir / "Weather_onedir.zip", new_dir, "Weather/", replace=True,
+                            progress_callback=lambda done, total: gui.update_progress(70 + 15 * done / total, ""))
+
+            new_install = installer.run(install)
+            (old_dir / "Weather_onedir.zip").unlink()
+            (new_dir / "Weather_onedir.zip").unlink()
+            assert tree_digest(old_dir) == tree_digest(new_dir)
+            print(f"\nInstall at {args.bandwidth_mb:g} MB/s per connection: old {old_install:.2f} s, "
+                  f"new {new_install:.2f} s ({old_install / new_install:.1f}x)")
+            print(f"Progress: old {callbacks[0]} redraws from the worker thread, new {installer.redraws} "
+                  f"on the main loop ({installer.redraws / new_install:.0f}/s, "
+                  f"{installer.gui.ui.get_stats()['coalesced']} updates coalesced)")
+            assert installer.foreign == 0, "progress widgets touched from a worker thread"
+            assert installer.redraws <= new_install * 1000 / PROGRESS_TICK_MS + 2, "more redraws than frames"
+            assert installer.redraws * 20 < callbacks[0]
+
+            # Standalone fallback: Weather.exe and updater.exe
+            pair = [(release["Weather.exe"], tmp / "Weather.exe"), (release["updater.exe"], tmp / "updater.exe")]
+            sequential = HeadlessInstaller().run(lambda gui: [gui.download_files([item], 20, 85) for item in pair])
+            for _, path in pair:
+                path.unlink()
+            concurrent = HeadlessInstaller().run(lambda gui: gui.download_files(pair, 20, 85))
+            for asset, path in pair:
+                assert path.read_bytes() == assets[asset['name']]
+            print(f"Weather.exe + updater.exe: one after the other {sequential:.2f} s, "
+                  f"concurrently {concurrent:.2f} s")
+
+    print(f"\nExtract: {legacy_time / streamed_time:.2f}x the old speed streamed"
+          f"{f', {legacy_time / parallel_time:.2f}x with parallel large members' if os.cpu_count() > 1 else ''}; "
+          f"peak extra disk {streamed_peak / MB:.0f} MB instead of {legacy_peak / MB:.0f} MB")
+    # The old move is a rename on the same disk, so the win is the second copy's space, not write time
+    assert streamed_peak < legacy_peak / 2, "streaming should not need a second copy of the release"
+    assert streamed_time < legacy_time * 1.15, "streaming extraction should be no slower than extract + move"
+    if os.cpu_count() > 1:
+        assert parallel_time < streamed_time, "parallel decompression of large members should help on several cores"
+    assert new_install < old_install / 2
+    assert concurrent < sequential
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Benchmark: locations list frame times with 10k saved locations, full refill vs VirtualListView
+
+The old list deleted every row and inserted every location again after each
+add or remove. VirtualListView keeps only the visible rows in the Listbox and
+applies differences. Both are timed per change (load, add, remove, scroll,
+and for the new list each keystroke of a type-to-filter query, after the
+prefix index has been built once). A real Tk
+Listbox is used when a display is available, including the repaint
+(update_idletasks); otherwise a stand-in Listbox counts the widget calls.
+
+Usage: python benchmarks/bench_location_list.py [--locations 10000] [--rows 25]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weather_listview import VirtualListView, words
+
+FRAME_BUDGET_MS = 16.7  # One frame at 60 Hz
+CITIES = ["Groningen", "Amsterdam", "Utrecht", "Zürich", "São Paulo", "New York", "Kraków", "Reykjavík"]
+
+
+class FakeListbox:
+    """Listbox stand-in for headless runs: keeps the rows and counts widget calls"""
+
+    def __init__(self, height):
+        self.items = []
+        self.selected = set()
+        self.height = height
+        self.calls = 0
+
+    def cget(self, option):
+        return self.height
+
+    def bind(self, sequence, func):
+        pass
+
+    def size(self):
+        return len(self.items)
+
+    def delete(self, first, last=None):
+        self.calls += 1
+        end = first if last is None else (len(self.items) - 1 if last == 'end' else last)
+        del self.items[first:end + 1]
+
+    def insert(self, index, *labels):
+        self.calls += 1
+        index = len(self.items) if index == 'end' else index
+        self.items[index:index] = labels
+
+    def selection_clear(self, first, last=None):
+        self.calls += 1
+        self.selected.clear()
+
+    def selection_set(self, index):
+        self.calls += 1
+        self.selected.add(index)
+
+    def get(self, index):
+        return self.items[index]
+
+    def curselection(self):
+        return tuple(sorted(self.selected))
+
+    def update_idletasks(self):
+        pass
+
+
+class FakeScrollbar:
+    def config(self, **options):
+        pass
+
+    def set(self, first, last):
+        pass
+
+
+def make_widgets(rows):
+    """Real Tk Listbox and Scrollbar when there is a display, stand-ins otherwise"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        return None, FakeListbox(rows), FakeScrollbar()
+    listbox = tk.Listbox(root, height=rows, exportselection=False)
+    scrollbar = tk.Scrollbar(root)
+    listbox.pack(side=tk.LEFT)
+    scrollbar.pack(side=tk.RIGHT)
+    root.update()
+    return root, listbox, scrollbar
+
+
+def label(i):
+    city = CITIES[i % len(CITIES)]
+    return f"{city} {i} ({city} District {i // 100})"
+
+
+def frame(listbox, func, *args):
+    """Milliseconds from a change until the Listbox is repainted"""
+    start = time.perf_counter()
+    func(*args)
+    listbox.update_idletasks()
+    return (time.perf_counter() - start) * 1000
+
+
+def legacy_refresh(listbox, labels):
+    listbox.delete(0, 'end')
+    for text in labels:
+        listbox.insert('end', text)
+
+
+def summary(samples):
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2], ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], ordered[-1]
+
+
+def report(name, samples):
+    p50, p99, worst = summary(samples)
+    print(f"{name:<26}{len(samples):>7}{p50:>10.3f}{p99:>10.3f}{worst:>10.3f}")
+    return p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--locations', type=int, default=10000)
+    parser.add_argument('--rows', type=int, default=25, help="visible rows in the list")
+    parser.add_argument('--changes', type=int, default=20, help="adds and removes timed for the old list")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(0)
+
+    root, listbox, scrollbar = make_widgets(args.rows)
+    print(f"{args.locations} locations, {args.rows} visible rows, "
+          f"{'Tk Listbox' if root else 'stand-in Listbox (no display)'}; frame times in ms\n")
+    print(f"{'change':<26}{'frames':>7}{'p50':>10}{'p99':>10}{'max':>10}")
+
+    labels = {f"id{i}": label(i) for i in range(args.locations)}
+    extra = [(f"id{args.locations + i}", label(args.locations + i)) for i in range(args.changes)]
+
+    # Old list: every change refills the Listbox with every location
+    current = list(labels.values())
+    report("old: load", [frame(listbox, legacy_refresh, listbox, current)])
+    old_add = []
+    for item_id, text in extra:
+        current.append(text)
+        old_add.append(frame(listbox, legacy_refresh, listbox, current))
+    old_calls = getattr(listbox, 'calls', 0)
+    old_p99 = report("old: add", old_add)
+    old_remove = []
+    for _ in range(args.changes):
+        current.pop(rng.randrange(len(current)))
+        old_remove.append(frame(listbox, legacy_refresh, listbox, current))
+    report("old: remove", old_remove)
+    old_calls = (getattr(listbox, 'calls', 0) - old_calls) // args.changes
+    listbox.delete(0, 'end')
+
+    # New list
+    view = VirtualListView(listbox, scrollbar)
+    calls_before = getattr(listbox, 'calls', 0)
+    report("new: load", [frame(listbox, view.set_items, labels.items())])
+    worst = []
+    worst.append(report("new: add", [frame(listbox, view.add, item_id, text) for item_id, text in extra]))
+    ids = list(labels)
+    worst.append(report("new: remove", [frame(listbox, view.remove, ids.pop(rng.randrange(len(ids))))
+                                        for _ in range(args.changes)]))
+    worst.append(report("new: scroll (line)", [frame(listbox, view.yview, 'scroll', 1, 'units')
+                                               for _ in range(500)]))
+    worst.append(report("new: scroll (page)", [frame(listbox, view.yview, 'scroll', 1, 'pages')
+                                               for _ in range(100)]))
+    worst.append(report("new: scroll (drag)", [frame(listbox, view.yview, 'moveto', rng.random())
+                                               for _ in range(100)]))
+
+    # Selection is held by id: pick one, filter around it, and it is still the selected row
+    view.yview('moveto', 0.5)
+    chosen = view.rows[view._top + 2]
+    view.select(chosen)
+    # Built once when the filter box gets focus, before the first keystroke
+    report("new: filter index (once)", [frame(listbox, view.prepare_filter)])
+    keystrokes = []
+    query = ""
+    for char in labels[chosen]:
+        query += char
+        keystrokes.append(frame(listbox, view.set_filter, query))
+    worst.append(report("new: filter keystroke", keystrokes))
+    assert view.selected_id == chosen and chosen in view.rows, "selection was lost by filtering"
+    expected = [item_id for item_id in view._labels
+                if all(any(word.startswith(prefix) for word in words(view._labels[item_id]))
+                       for prefix in words(query))]
+    assert view.rows == expected, "prefix index disagrees with a full scan"
+    worst.append(report("new: clear filter", [frame(listbox, view.set_filter, "")]))
+    assert view.selected_id == chosen
+
+    assert listbox.size() <= args.rows + 1, f"Listbox holds {listbox.size()} rows, expected at most a window"
+    shown = [view._labels[item_id] for item_id in view.rows[view._top:view._top + args.rows + 1]]
+    assert [listbox.get(i) for i in range(listbox.size())] == shown, "Listbox rows differ from the view"
+
+    print(f"\nRenders: {view.stats['renders']}, rows inserted {view.stats['inserted']}, "
+          f"deleted {view.stats['deleted']}")
+    if not root:
+        new_calls = (listbox.calls - calls_before) / view.stats['renders']
+        print(f"Listbox calls per change: old {old_calls}, new {new_calls:.1f}")
+    print(f"Old add p99 {old_p99:.1f} ms; new list worst p99 {max(worst):.3f} ms "
+          f"(budget {FRAME_BUDGET_MS} ms per frame)")
+    assert max(worst) < FRAME_BUDGET_MS, "a list update did not fit in one frame"
+    if root:
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
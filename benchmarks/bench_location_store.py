@@ -0,0 +1,166 @@
+"""
+Benchmark: saved-location add, remove, lookup and load at 1k to 10k+ locations
+
+Compares LocationManager (indexed, append log plus compaction) with the
+previous store, which scanned the list for duplicates and rewrote the
+whole JSON file with indent=2 on every change. The previous store is only
+run for a limited number of operations at each size, since every one of
+them rewrites the file. Afterwards the new store is checked for crash
+safety: a torn last log line and a crash between compaction's rename and
+the log truncation must both load to the same locations.
+
+Usage: python benchmarks/bench_location_store.py [--sizes 1000 10000] [--legacy-ops 50] [--no-sync]
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weather_locations import LocationManager
+
+
+class LegacyLocationManager:
+    """The store as it was: linear duplicate scan, full indent=2 rewrite per change"""
+
+    def __init__(self, config_path):
+        self.config_path = config_path
+        self.locations = []
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                self.locations = json.load(f).get('locations', [])
+
+    def save_locations(self):
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            json.dump({'locations': self.locations}, f, indent=2, ensure_ascii=False)
+
+    def add_location(self, name, lat, lon, address, local_name=None):
+        for loc in self.locations:
+            if loc['name'] == name:
+                return False
+        self.locations.append({'name': name, 'local_name': local_name or name, 'lat': lat, 'lon': lon,
+                               'address': address, 'added': datetime.now().isoformat()})
+        self.save_locations()
+        return True
+
+    def remove_location(self, name):
+        self.locations = [loc for loc in self.locations if loc['name'] != name]
+        self.save_locations()
+
+
+def place(i):
+    return f"Place {i}", round(-60 + (i % 1200) * 0.1, 4), round(-180 + (i // 1200) * 0.05, 4)
+
+
+def per_op_us(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(*item)
+    return (time.perf_counter() - start) / max(1, len(items)) * 1e6
+
+
+def fill(store, count):
+    for i in range(count):
+        name, lat, lon = place(i)
+        store.add_location(name, lat, lon, f"{name}, Benchland")
+
+
+def bench_size(tmp, size, legacy_ops, sync):
+    path = os.path.join(tmp, f"new_{size}.json")
+    store = LocationManager(path, sync=sync)
+    start = time.perf_counter()
+    fill(store, size)
+    fill_s = time.perf_counter() - start
+    store.close()
+
+    store = LocationManager(path, sync=sync)
+    extra = [(*place(size + i),) for i in range(legacy_ops)]
+    store.find_by_coordinates(0.0, 0.0)  # Builds the coordinate index, as the first lookup in the app would
+    add_us = per_op_us(lambda name, lat, lon: store.add_location(name, lat, lon, name), extra)
+    lookup_us = per_op_us(lambda name, lat, lon: store.find_by_coordinates(lat, lon), extra)
+    remove_us = per_op_us(lambda name, lat, lon: store.remove_location(name), extra)
+    store.close()
+    start = time.perf_counter()
+    loaded = LocationManager(path, sync=sync)
+    load_ms = (time.perf_counter() - start) * 1000
+    assert len(loaded) == size, f"reloaded {len(loaded)} of {size} locations"
+    snapshot_kb = os.path.getsize(path) / 1024
+
+    legacy_path = os.path.join(tmp, f"legacy_{size}.json")
+    legacy = LegacyLocationManager(legacy_path)
+    legacy.locations = [dict(loc) for loc in loaded.get_locations()]
+    legacy.save_locations()
+    legacy_add_us = per_op_us(lambda name, lat, lon: legacy.add_location(name, lat, lon, name), extra)
+    legacy_remove_us = per_op_us(lambda name, lat, lon: legacy.remove_location(name), extra)
+    start = time.perf_counter()
+    LegacyLocationManager(legacy_path)
+    legacy_load_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{size:>8}{fill_s:>9.2f}{add_us:>11.0f}{legacy_add_us:>11.0f}{remove_us:>11.0f}"
+          f"{legacy_remove_us:>11.0f}{lookup_us:>9.2f}{load_ms:>9.1f}{legacy_load_ms:>9.1f}{snapshot_kb:>10.0f}")
+    return add_us, legacy_add_us
+
+
+def check_crash_safety(tmp):
+    path = os.path.join(tmp, "crash.json")
+    store = LocationManager(path, sync=False)
+    fill(store, 300)  # Past COMPACT_MIN_OPS, so a snapshot exists and the log holds the rest
+    for i in range(0, 300, 3):
+        store.remove_location(place(i)[0])
+    store.set_priority(place(1)[0], 3)
+    store._log.close()  # Simulate a crash: no close(), no final compaction
+    store._log = None
+    expected = [loc['name'] for loc in store.get_locations()]
+    log_copy = os.path.join(tmp, "crash.log.copy")
+    shutil.copy(store.log_path, log_copy)
+
+    with open(store.log_path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "add", "location": {"name": "Tor')  # Torn write
+    recovered = LocationManager(path, sync=False)
+    assert [loc['name'] for loc in recovered.get_locations()] == expected, "torn log changed the result"
+    assert recovered.get_location(place(1)[0])['priority'] == 3
+    recovered.close()
+
+    # Crash after compaction renamed the snapshot but before it emptied the log
+    shutil.copy(log_copy, recovered.log_path)
+    replayed = LocationManager(path, sync=False)
+    names = [loc['name'] for loc in replayed.get_locations()]
+    assert names == expected, "replaying a compacted log changed the result"
+    assert replayed.get_location(place(1)[0])['priority'] == 3
+    replayed.close()
+    print(f"\nCrash safety: torn log line and repeated replay both load {len(expected)} locations")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--legacy-ops', type=int, default=50, help="adds and removes timed at each size")
+    parser.add_argument('--no-sync', action='store_true', help="do not fsync log appends")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    print(f"fsync per change: {'off' if args.no_sync else 'on'}; times per operation in microseconds\n")
+    print(f"{'size':>8}{'fill s':>9}{'add':>11}{'old add':>11}{'remove':>11}{'old rm':>11}"
+          f"{'lookup':>9}{'load ms':>9}{'old load':>9}{'file KB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [bench_size(tmp, size, args.legacy_ops, not args.no_sync) for size in args.sizes]
+        check_crash_safety(tmp)
+
+    # Adding to the store must not get slower with its size the way a full rewrite does
+    (small_add, _), (large_add, large_legacy) = results[0], results[-1]
+    assert large_add < large_legacy, "indexed store is slower than rewriting the file"
+    if len(args.sizes) > 1:
+        print(f"Add at {args.sizes[-1]} vs {args.sizes[0]} locations: {large_add / small_add:.1f}x "
+              f"(old store {large_legacy / results[0][1]:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: how often a click waits on the network
+
+Simulates a user clicking saved locations at random with a compressed
+clock (a 3 second cache lifetime instead of 15 minutes) and compares:
+  - expire-and-refetch (the old behaviour)
+  - stale-while-revalidate only
+  - stale-while-revalidate plus the PrefetchScheduler, which keeps
+    recently viewed locations fresh
+  - the same with every location opted in (priority 1)
+
+Usage: python benchmarks/bench_prefetch.py [--seconds 10] [--locations 20]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather_api
+from weather_cache import WeatherCache
+from weather_record import WeatherRecord
+from weather_prefetch import PrefetchScheduler
+from mock_servers import MockOpenMeteo
+
+CACHE_MINUTES = 0.05  # 3 seconds
+
+
+def refresh(cache, locations):
+    results = weather_api.fetch_weather_batch([(loc['lat'], loc['lon']) for loc in locations])
+    cache.set_many((loc['lat'], loc['lon'], WeatherRecord.from_api(data, loc['name'], loc['name']))
+                   for loc, data in zip(locations, results))
+
+
+def simulate(locations, seconds, click_interval, stale, prefetch, opted_in=False):
+    if opted_in:
+        locations = [dict(location, priority=1) for location in locations]
+    cache = WeatherCache(CACHE_MINUTES, stale_minutes=1 if stale else 0)
+    scheduler = PrefetchScheduler(cache, lambda due: refresh(cache, due), lambda: locations,
+                                  check_interval=0.2, jitter=0.5, lead_times={1: 1.0})
+    if prefetch:
+        scheduler.start()
+
+    rng = random.Random(7)
+    waits = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        location = rng.choice(locations)
+        scheduler.mark_viewed(location['lat'], location['lon'])
+        start = time.perf_counter()
+        cached = cache.get(location['lat'], location['lon'], allow_stale=stale)
+        if cached:
+            fresh = cache.is_fresh(cached)
+            scheduler.record_request('fresh' if fresh else 'stale')
+            if not fresh:
+                threading.Thread(target=refresh, args=(cache, [location]), daemon=True).start()
+        else:
+            scheduler.record_request('waited')
+            data = weather_api.fetch_weather_data(location['lat'], location['lon'])
+            cache.set(location['lat'], location['lon'],
+                      WeatherRecord.from_api(data, location['name'], location['name']))
+        waits.append(time.perf_counter() - start)
+        time.sleep(click_interval)
+
+    scheduler.stop()
+    waits.sort()
+    return scheduler.get_stats(), waits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--locations', type=int, default=20)
+    parser.add_argument('--click-interval', type=float, default=0.05)
+    parser.add_argument('--latency', type=float, default=0.1)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    locations = [{'name': f"loc{i}", 'lat': 50 + i * 0.01, 'lon': 5 + i * 0.01}
+                 for i in range(args.locations)]
+
+    print(f"{'mode':<24}{'clicks':>8}{'waited':>8}{'stale':>8}{'wait rate':>11}{'p95 ms':>9}")
+    with MockOpenMeteo(latency=args.latency) as server:
+        weather_api.OPEN_METEO_URL = server.forecast_url
+        modes = (("expire and refetch", False, False, False),
+                 ("stale-while-reval.", True, False, False),
+                 ("SWR + prefetch viewed", True, True, False),
+                 ("SWR + prefetch all", True, True, True))
+        for name, stale, prefetch, opted_in in modes:
+            stats, waits = simulate(locations, args.seconds, args.click_interval, stale, prefetch, opted_in)
+            p95 = waits[int(len(waits) * 0.95)] * 1000
+            print(f"{name:<24}{stats['user_requests']:>8}{stats['waited']:>8}"
+                  f"{stats['served_stale']:>8}{stats['wait_rate']:>11.1%}{p95:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: bytes per cached location, raw response entries vs WeatherRecord
+
+The old cache entry was the parsed JSON response, its ~1 KB formatted
+report and a datetime. The new one is a slotted WeatherRecord with the
+report rendered on demand. Memory is measured with tracemalloc for the
+entries plus their cache keys.
+
+Usage: python benchmarks/bench_record_memory.py [--sizes 10000 100000]
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weather_record import WeatherRecord
+from mock_servers import fake_current_weather
+
+PLACES = 500  # Distinct place names shared by the saved locations
+
+
+def responses(count):
+    """Decoded API payloads, as response.json() would hand them over"""
+    rng = random.Random(11)
+    for i in range(count):
+        data = fake_current_weather(50 + i * 1e-3, 5 + i * 1e-3)
+        current = data['current']
+        current['temperature_2m'] = round(rng.uniform(-10, 30), 1)
+        current['apparent_temperature'] = round(rng.uniform(-15, 30), 1)
+        current['wind_speed_10m'] = round(rng.uniform(0, 60), 1)
+        yield f"{50 + i * 1e-3:.3f}_{5 + i * 1e-3:.3f}", json.loads(json.dumps(data))
+
+
+def place(i):
+    n = i % PLACES
+    return f"Place {n}", f"Place {n}, Province, Country", f"Plaats {n}"
+
+
+def build_dicts(count):
+    entries = {}
+    for i, (key, data) in enumerate(responses(count)):
+        name, address_en, address_local = place(i)
+        entries[key] = {
+            'data': data,
+            'formatted': WeatherRecord.from_api(data, name, address_en, address_local).render(),
+            'timestamp': datetime.now()
+        }
+    return entries
+
+
+def build_records(count):
+    entries = {}
+    for i, (key, data) in enumerate(responses(count)):
+        entries[key] = WeatherRecord.from_api(data, *place(i))
+    return entries
+
+
+def measure(build, count):
+    """Traced bytes per entry while count entries are held"""
+    gc.collect()
+    tracemalloc.start()
+    entries = build(count)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entries
+    return current / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    sample = WeatherRecord.from_api(fake_current_weather(50, 5), *place(0))
+    print(f"Report rendered on demand: {len(sample.render())} chars\n")
+    print(f"{'entries':>10}{'dict B/loc':>12}{'record B/loc':>14}{'saving':>8}{'total dict MB':>15}{'total rec MB':>14}")
+    for count in args.sizes:
+        dict_bytes = measure(build_dicts, count)
+        record_bytes = measure(build_records, count)
+        print(f"{count:>10,}{dict_bytes:>12.0f}{record_bytes:>14.0f}{1 - record_bytes / dict_bytes:>8.0%}"
+              f"{dict_bytes * count / 1e6:>15.1f}{record_bytes * count / 1e6:>14.1f}")
+
+    start = time.perf_counter()
+    for _ in range(10_000):
+        sample.render()
+    print(f"\nrender(): {(time.perf_counter() - start) / 10_000 * 1e6:.1f} us per report")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: report rendering throughput for large batches of records
+
+Compares the old string += report builder with the precompiled templates
+in weather_report (plain, compact and JSON modes), and shows what lazy
+rendering saves when only the first few reports of a batch are looked at.
+
+Usage: python benchmarks/bench_report_render.py [--records 100000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weather_record import WeatherRecord
+from weather_report import WEATHER_CODES, get_weather_icon, render_report, render_reports
+from mock_servers import fake_current_weather
+
+
+def concat_report(record):
+    """The previous format_weather_data, one += per line"""
+    temp = record.temperature
+    weather_desc = WEATHER_CODES.get(record.weather_code, "Unknown")
+    output = "=" * 64 + "\n"
+    output += f"  WEATHER REPORT: {record.location_name.upper()}\n"
+    output += "=" * 64 + "\n\n"
+    if record.address_local and record.address_local != record.address_en:
+        output += f"📍 Location (Local): {record.address_local}\n"
+        output += f"📍 Location (EN):    {record.address_en}\n"
+    else:
+        output += f"📍 Location: {record.address_en}\n"
+    output += f"🕐 Time:     {record.observation_time}\n\n"
+    output += "─" * 64 + "\n"
+    output += "  CURRENT CONDITIONS\n"
+    output += "─" * 64 + "\n\n"
+    output += f"{get_weather_icon(record.weather_code)}  {weather_desc}\n\n"
+    output += f"Temperature:        {str(temp):>6}°C\n"
+    output += f"Feels Like:         {str(record.feels_like):>6}°C\n"
+    output += f"Humidity:           {str(record.humidity):>6}%\n"
+    output += f"Wind Speed:         {str(record.wind_speed):>6} km/h\n"
+    output += f"Wind Direction:     {str(record.wind_direction):>6}°\n"
+    output += f"Precipitation:      {str(record.precipitation):>6} mm\n"
+    output += f"Cloud Cover:        {str(record.cloud_cover):>6}%\n"
+    output += "\n" + "=" * 64 + "\n"
+    return output
+
+
+def make_records(count):
+    rng = random.Random(5)
+    codes = list(WEATHER_CODES)
+    records = []
+    for i in range(count):
+        data = fake_current_weather(50 + i * 1e-3, 5 + i * 1e-3)
+        data['current']['temperature_2m'] = round(rng.uniform(-10, 30), 1)
+        data['current']['weather_code'] = rng.choice(codes)
+        records.append(WeatherRecord.from_api(data, f"Place {i % 500}", f"Place {i % 500}, Country",
+                                              f"Plaats {i % 500}"))
+    return records
+
+
+def timed(func, records):
+    start = time.perf_counter()
+    for record in records:
+        func(record)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=100_000)
+    parser.add_argument('--shown', type=int, default=20, help="reports actually looked at in the lazy run")
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    assert concat_report(records[0]) == render_report(records[0])
+
+    print(f"{args.records:,} records\n")
+    print(f"{'renderer':<20}{'seconds':>9}{'reports/s':>12}{'us/report':>11}")
+    baseline = timed(concat_report, records)
+    rows = [("+= concatenation", baseline)]
+    for mode in ('plain', 'compact', 'json'):
+        rows.append((f"template {mode}", timed(lambda r: render_report(r, mode), records)))
+    for name, elapsed in rows:
+        print(f"{name:<20}{elapsed:>9.3f}{args.records / elapsed:>12,.0f}{elapsed / args.records * 1e6:>11.2f}")
+
+    start = time.perf_counter()
+    eager = [render_report(record) for record in records][:args.shown]
+    eager_time = time.perf_counter() - start
+    start = time.perf_counter()
+    reports = render_reports(records)
+    lazy = [next(reports) for _ in range(args.shown)]
+    lazy_time = time.perf_counter() - start
+    assert eager == lazy
+    print(f"\nShow {args.shown} of {args.records:,}: eager {eager_time * 1000:.1f} ms, lazy {lazy_time * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark: local JSON API server latency and throughput under concurrent load
+
+Starts WeatherServer (what `Weather.py --serve` runs) against the mock
+Open-Meteo endpoint and a stub geolocator, then drives it with keep-alive
+asyncio clients. Scenarios:
+  hot        pre-warmed coordinates, answered from memory
+  cold       a new coordinate per request, each one an upstream fetch
+  stampede   every client asks for the same uncached coordinate at once
+  query      ?q= city names over a small, repeating set
+p50/p99 latency, requests per second and upstream request counts are
+reported; hot keys must not reach upstream and a stampede must cost one
+upstream request.
+
+Usage: python benchmarks/bench_server_load.py [--clients 50] [--requests 5000] [--latency 0.02]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather_api
+from weather_cache import WeatherCache
+from weather_engine import FetchEngine
+from weather_geocode import Geocoder, GeocodeCache
+from weather_server import WeatherServer
+from mock_servers import MockOpenMeteo
+from bench_geocode_cache import StubGeolocator, CITIES
+
+
+async def client(port, paths, latencies, errors):
+    """One keep-alive connection issuing its requests back to back"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line == b"\r\n":
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            json.loads(await reader.readexactly(length))
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def drive(port, paths_per_client):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, paths, latencies, errors) for paths in paths_per_client))
+    return time.perf_counter() - start, sorted(latencies), errors
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+
+def run_scenario(name, port, paths_per_client, upstream):
+    before = upstream()
+    seconds, latencies, errors = asyncio.run(drive(port, paths_per_client))
+    calls = upstream() - before
+    print(f"{name:<10}{len(latencies):>8}{len(latencies) / seconds:>10.0f}"
+          f"{percentile(latencies, 0.5) * 1000:>10.2f}{percentile(latencies, 0.99) * 1000:>10.2f}"
+          f"{calls:>10}{len(errors):>8}")
+    return calls, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=5000, help="requests in the hot and query runs")
+    parser.add_argument('--cold', type=int, default=400, help="requests in the cold run")
+    parser.add_argument('--latency', type=float, default=0.02, help="upstream round trip in seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with MockOpenMeteo(latency=args.latency) as meteo, tempfile.TemporaryDirectory() as tmp:
+        weather_api.OPEN_METEO_URL = meteo.forecast_url
+        geolocator = StubGeolocator(args.latency)
+        geocoder = Geocoder("bench", cache=GeocodeCache(persist_path=os.path.join(tmp, "geo.json")),
+                            geolocator=geolocator)
+        cache = WeatherCache(persist_path=os.path.join(tmp, "cache.db"), stale_minutes=60)
+        engine = FetchEngine().start()
+        server = WeatherServer(cache, geocoder, engine, port=0)
+        asyncio.run_coroutine_threadsafe(server.start(), engine.loop).result()
+
+        def split(paths):
+            return [paths[i::args.clients] for i in range(args.clients)]
+
+        hot_keys = [(50 + i * 0.5, 5 + i * 0.5) for i in range(20)]
+        asyncio.run(drive(server.port, [[f"/weather?lat={lat}&lon={lon}" for lat, lon in hot_keys]]))
+
+        print(f"{args.clients} keep-alive clients, upstream latency {args.latency * 1000:.0f} ms\n")
+        print(f"{'scenario':<10}{'requests':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+              f"{'upstream':>10}{'errors':>8}")
+
+        hot = [f"/weather?lat={lat}&lon={lon}" for i in range(args.requests)
+               for lat, lon in [hot_keys[i % len(hot_keys)]]]
+        hot_calls, hot_errors = run_scenario("hot", server.port, split(hot), lambda: meteo.requests)
+
+        cold = [f"/weather?lat={-40 + i * 0.01:.2f}&lon={100 + i * 0.01:.2f}" for i in range(args.cold)]
+        cold_calls, cold_errors = run_scenario("cold", server.port, split(cold), lambda: meteo.requests)
+
+        stampede = [["/weather?lat=12.34&lon=56.78"] for _ in range(args.clients)]
+        stampede_calls, stampede_errors = run_scenario("stampede", server.port, stampede,
+                                                       lambda: meteo.requests)
+
+        query = [f"/weather?q={CITIES[i % len(CITIES)]}&mode=compact" for i in range(args.requests)]
+        run_scenario("query", server.port, split(query), lambda: geolocator.calls)
+
+        stats = server.get_stats()['server']
+        print(f"\nserver: {stats['fresh']} fresh, {stats['fetched']} fetched, "
+              f"{stats['coalesced']} coalesced, {stats['geocoded']} geocoded, "
+              f"{stats['connections']} connections")
+
+        asyncio.run_coroutine_threadsafe(server.stop(), engine.loop).result()
+        engine.stop()
+        cache.close()
+
+    assert not (hot_errors or cold_errors or stampede_errors), "requests failed"
+    assert hot_calls == 0, f"hot keys reached upstream {hot_calls} times"
+    assert cold_calls == args.cold, f"expected {args.cold} cold fetches, got {cold_calls}"
+    assert stampede_calls == 1, f"stampede cost {stampede_calls} upstream requests"
+    # Each lookup asks Nominatim twice: English and local names
+    assert geolocator.calls <= 2 * len(CITIES), f"{geolocator.calls} geocoder calls for {len(CITIES)} cities"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Stress test: many threads missing the cache for one key at once
+
+Every thread calls WeatherCache.fetch_once for the same location while the
+mock API is slow. Exactly one upstream request may reach the server; the
+script exits non-zero otherwise. A second round makes the upstream fail and
+checks that every caller sees the error.
+
+Usage: python benchmarks/bench_single_flight.py [--threads 64]
+"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather_api
+from weather_cache import WeatherCache
+from mock_servers import MockOpenMeteo
+
+LAT, LON = 53.2194, 6.5665
+
+
+def hammer(cache, threads, fetch):
+    """Release all threads at once and collect their results or errors"""
+    barrier = threading.Barrier(threads)
+    outcomes = []
+    lock = threading.Lock()
+
+    def worker():
+        barrier.wait()
+        try:
+            outcome = cache.fetch_once(LAT, LON, fetch)
+        except Exception as e:
+            outcome = e
+        with lock:
+            outcomes.append(outcome)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    return outcomes, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--latency', type=float, default=0.3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with MockOpenMeteo(latency=args.latency) as server:
+        weather_api.OPEN_METEO_URL = server.forecast_url
+        cache = WeatherCache(15)
+
+        outcomes, wall = hammer(cache, args.threads, lambda: weather_api.fetch_weather_data(LAT, LON))
+        stats = cache.get_stats()
+        print(f"{args.threads} concurrent misses in {wall * 1000:.0f} ms")
+        print(f"Upstream requests:  {server.requests}")
+        print(f"Coalesced calls:    {stats['coalesced']}")
+        assert server.requests == 1, f"expected exactly 1 upstream request, got {server.requests}"
+        assert all(o is outcomes[0] for o in outcomes), "callers did not share one result"
+
+    calls = []
+
+    def failing_fetch():
+        calls.append(1)
+        time.sleep(args.latency)
+        raise RuntimeError("Weather API request timed out.")
+
+    outcomes, _ = hammer(cache, args.threads, failing_fetch)
+    assert len(calls) == 1, f"expected 1 failing upstream call, got {len(calls)}"
+    assert all(isinstance(o, RuntimeError) for o in outcomes), "not every caller saw the error"
+    print(f"Error round:        1 upstream call, error shared with {len(outcomes)} callers")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: nearby-coordinate cache hits through the spatial index
+
+Seeds the cache with one entry per city, then queries points scattered a
+few hundred metres around those cities (as different spellings of one
+place geocode to slightly different coordinates). Reports hit rate and
+lookup time for exact-key lookups and several radii, plus a linear scan
+over all entries for comparison.
+
+Usage: python benchmarks/bench_spatial_lookup.py [--cities 20000] [--queries 20000]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weather_cache import WeatherCache, distance_km
+from weather_record import WeatherRecord
+
+SPREAD_KM = 0.4  # Typical distance between two geocodes of one place
+
+
+def scatter(rng, lat, lon, spread_km):
+    """Random point roughly spread_km around lat, lon"""
+    return (lat + rng.gauss(0, spread_km / 111.32),
+            lon + rng.gauss(0, spread_km / 70.0))
+
+
+def linear_nearest(cache, lat, lon, radius_km):
+    best = None
+    for key in cache.cache:
+        klat, klon = cache._coords[key]
+        distance = distance_km(lat, lon, klat, klon)
+        if distance <= radius_km and (best is None or distance < best[0]):
+            best = (distance, key)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--cities', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=20000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    rng = random.Random(3)
+    # Cities clustered on land-ish latitudes, like real saved locations
+    cities = [(rng.uniform(-45, 65), rng.uniform(-125, 150)) for _ in range(args.cities)]
+    cache = WeatherCache(15, max_entries=args.cities * 2, max_bytes=1 << 40)
+    for lat, lon in cities:
+        cache.set(lat, lon, WeatherRecord.from_api({}, "", ""))
+    queries = [scatter(rng, *rng.choice(cities), SPREAD_KM) for _ in range(args.queries)]
+
+    print(f"{args.cities} cached entries, {args.queries} queries scattered ~{SPREAD_KM} km\n")
+    print(f"{'lookup':<18}{'hit rate':>10}{'us/lookup':>12}")
+    for radius in (0, 0.5, 1.0, 2.0, 5.0):
+        hits = 0
+        start = time.perf_counter()
+        for lat, lon in queries:
+            if cache.get(lat, lon, radius_km=radius) is not None:
+                hits += 1
+        elapsed = time.perf_counter() - start
+        label = "exact key" if radius == 0 else f"radius {radius} km"
+        print(f"{label:<18}{hits / len(queries):>10.1%}{elapsed / len(queries) * 1e6:>12.1f}")
+
+    sample = queries[:200]
+    start = time.perf_counter()
+    for lat, lon in sample:
+        linear_nearest(cache, lat, lon, 1.0)
+    elapsed = time.perf_counter() - start
+    print(f"{'linear scan 1 km':<18}{'':>10}{elapsed / len(sample) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Stress test: worker-thread widget updates, direct vs the UIDispatcher
+
+Several worker threads each write "loading" and then a result to the same
+weather display, as the fetch coroutines do. With direct writes every
+update repaints the widget from a worker thread. With the UIDispatcher the
+writes are posted as intents, coalesced, and applied on the main loop. The
+main loop is a stand-in for Tk's after() scheduler so this runs headless.
+
+Usage: python benchmarks/bench_ui_dispatch.py [--workers 8] [--updates 200]
+"""
+
+import argparse
+import heapq
+import itertools
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from weather_ui import UIDispatcher
+
+REPAINT_SECONDS = 0.0005  # Cost of one delete/insert on the text widget
+
+
+class FakeRoot:
+    """Minimal Tk root: after() callbacks run on the thread that calls mainloop()"""
+
+    def __init__(self):
+        self._timers = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._quit = False
+
+    def after(self, ms, func, *args):
+        with self._lock:
+            heapq.heappush(self._timers, (time.perf_counter() + ms / 1000, next(self._seq), func, args))
+
+    def quit(self):
+        self._quit = True
+
+    def mainloop(self):
+        while not self._quit:
+            with self._lock:
+                timer = self._timers[0] if self._timers else None
+                if timer and timer[0] <= time.perf_counter():
+                    heapq.heappop(self._timers)
+                else:
+                    timer = None
+            if timer is None:
+                time.sleep(0.001)
+                continue
+            timer[2](*timer[3])
+
+
+class FakeText:
+    """Stands in for the weather text widget; counts repaints and foreign-thread access"""
+
+    def __init__(self, main_thread):
+        self.main_thread = main_thread
+        self.text = None
+        self.repaints = 0
+        self.cross_thread = 0
+
+    def set(self, text):
+        if threading.current_thread() is not self.main_thread:
+            self.cross_thread += 1
+        time.sleep(REPAINT_SECONDS)
+        self.text = text
+        self.repaints += 1
+
+
+def run_workers(workers, updates, show):
+    def worker(n):
+        for i in range(updates):
+            show(f"loading {n}:{i}")
+            time.sleep(0.001)  # The fetch itself
+            show(f"result {n}:{i}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def direct(workers, updates):
+    """The old behaviour: workers write to the widget themselves"""
+    widget = FakeText(threading.main_thread())
+    elapsed = run_workers(workers, updates, widget.set)
+    return widget, elapsed, None
+
+
+def dispatched(workers, updates, tick_ms):
+    root = FakeRoot()
+    widget = FakeText(threading.main_thread())
+    ui = UIDispatcher(root, tick_ms=tick_ms).start()
+    result = {}
+
+    def drive():
+        result['elapsed'] = run_workers(workers, updates,
+                                        lambda text: ui.post("weather_text", widget.set, text))
+        time.sleep(tick_ms * 3 / 1000)  # Let the last tick drain
+        ui.stop()
+        root.quit()
+
+    driver = threading.Thread(target=drive)
+    driver.start()
+    root.mainloop()
+    driver.join()
+    return widget, result['elapsed'], ui.get_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--updates', type=int, default=200, help="fetches per worker")
+    parser.add_argument('--tick-ms', type=int, default=16)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    posted = args.workers * args.updates * 2
+    print(f"{args.workers} workers x {args.updates} fetches = {posted} display updates\n")
+    print(f"{'mode':<14}{'repaints':>10}{'cross-thread':>14}{'seconds':>9}{'final set':>11}")
+
+    widget, elapsed, _ = direct(args.workers, args.updates)
+    print(f"{'direct':<14}{widget.repaints:>10}{widget.cross_thread:>14}{elapsed:>9.2f}"
+          f"{str(widget.text.startswith('result')):>11}")
+
+    widget, elapsed, stats = dispatched(args.workers, args.updates, args.tick_ms)
+    print(f"{'dispatcher':<14}{widget.repaints:>10}{widget.cross_thread:>14}{elapsed:>9.2f}"
+          f"{str(widget.text.startswith('result')):>11}")
+
+    print(f"\nDispatcher: {stats['posted']} posted, {stats['coalesced']} coalesced, "
+          f"{stats['applied']} applied in {stats['ticks']} ticks; "
+          f"latency avg {stats['avg_latency_ms']:.1f} ms / max {stats['max_latency_ms']:.1f} ms, "
+          f"max drain {stats['max_drain_ms']:.1f} ms, max tick lag {stats['max_tick_lag_ms']:.1f} ms")
+
+    assert widget.cross_thread == 0, "widget touched outside the main loop"
+    assert stats['applied'] + stats['coalesced'] == stats['posted'], "intents lost"
+    assert widget.text.startswith('result'), "final update was not applied"
+
+
+if __name__ == "__main__":
+    main()
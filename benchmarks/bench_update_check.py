@@ -0,0 +1,142 @@
+"""
+Benchmark: update-check requests and bytes, unconditional fetch vs conditional UpdateManager
+
+Plays the same sequence of update checks against the GitHub stand-in with
+the old check (full releases/latest on every startup and click) and with
+UpdateManager, which persists the release with its ETag/Last-Modified:
+  startups    app restarts within the re-check interval (no request at all)
+  revalidate  startups after the interval (conditional request, 304)
+  clicks      manual checks (forced, conditional, 304)
+  release     a new version is published (200, update found)
+  outage      the API fails (backoff: later startups do not retry at once)
+Also checks that versions compare as numbers (1.10.0 is newer than 1.9.0).
+
+Usage: python benchmarks/bench_update_check.py [--startups 20] [--clicks 10] [--notes-kb 6]
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import weather_http
+import weather_update
+from weather_update import UpdateManager
+from mock_servers import MockGitHub
+
+REPO = "Rog294super/Weather-App"
+
+
+def legacy_check(current_version):
+    """The old check: unconditional GET and a string comparison of versions"""
+    try:
+        response = weather_http.get(f"{weather_update.GITHUB_API_URL}/repos/{REPO}/releases/latest", timeout=10)
+        if response.status_code != 200:
+            return None
+        latest_version = response.json().get("tag_name", "").lstrip("v")
+        return latest_version if latest_version and latest_version > current_version else None
+    except Exception:
+        return None
+
+
+class Counter:
+    """Requests and release bytes the server saw during one phase"""
+
+    def __init__(self, server):
+        self.server = server
+        self.requests = server.requests
+        self.bytes = server.release_bytes
+
+    def done(self):
+        return self.server.requests - self.requests, self.server.release_bytes - self.bytes
+
+
+def run(server, checks, tmp, current):
+    """Run (phase, kind) checks; kind is 'startup' or 'click'. Returns {phase: [checks, requests, bytes, found]}"""
+    results = {}
+    manager = None
+    for phase, kind, setup in checks:
+        if setup:
+            setup()
+        counter = Counter(server)
+        if checks.legacy:
+            found = legacy_check(current)
+        else:
+            if kind == 'startup' or manager is None:
+                # A fresh process every startup: only the state file carries over
+                manager = UpdateManager(current, REPO, tmp, check_interval=checks.interval(phase))
+            found = manager.check_for_updates(force=kind == 'click')
+        requests, size = counter.done()
+        totals = results.setdefault(phase, [0, 0, 0, 0])
+        totals[0] += 1
+        totals[1] += requests
+        totals[2] += size
+        totals[3] += found is not None
+    return results
+
+
+class Plan(list):
+    """Check sequence shared by both runs"""
+
+    def __init__(self, server, args, legacy):
+        super().__init__()
+        self.legacy = legacy
+        self.extend(('startups', 'startup', None) for _ in range(args.startups))
+        self.extend(('revalidate', 'startup', None) for _ in range(args.startups))
+        self.extend(('clicks', 'click', None) for _ in range(args.clicks))
+        self.append(('release', 'click', lambda: setattr(server, 'latest_version', "1.10.0")))
+        self.extend(('release', 'startup', None) for _ in range(args.startups - 1))
+        self.append(('outage', 'click', lambda: setattr(server, 'error_rate', 1.0)))
+        self.extend(('outage', 'startup', None) for _ in range(args.startups - 1))
+
+    def interval(self, phase):
+        # 'startups' happen within the interval; the later phases as if it had passed each time
+        return weather_update.UPDATE_CHECK_INTERVAL_SECONDS if phase in ('startups', 'outage') else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--startups', type=int, default=20, help="startups per phase")
+    parser.add_argument('--clicks', type=int, default=10)
+    parser.add_argument('--notes-kb', type=int, default=6, help="release notes size, like a real release")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    notes = ("- Fixed a thing in the weather view\n" * (args.notes_kb * 1024 // 36 + 1))[:args.notes_kb * 1024]
+    totals = {}
+    results = {}
+    for name, legacy in (("unconditional", True), ("UpdateManager", False)):
+        with tempfile.TemporaryDirectory() as tmp:
+            # 403 like GitHub's rate limit: not retried by the HTTP client
+            with MockGitHub(latest_version="1.9.0", notes=notes, error_status=403) as server:
+                weather_update.GITHUB_API_URL = server.url
+                results[name] = run(server, Plan(server, args, legacy), tmp, "1.9.0")
+                totals[name] = (server.requests, server.release_bytes, server.not_modified)
+
+    print(f"{'phase':<12}{'checks':>8}{'old req':>9}{'old KB':>9}{'new req':>9}{'new KB':>9}"
+          f"{'old found':>11}{'new found':>11}")
+    for phase, (checks, old_requests, old_bytes, old_found) in results["unconditional"].items():
+        _, new_requests, new_bytes, new_found = results["UpdateManager"][phase]
+        print(f"{phase:<12}{checks:>8}{old_requests:>9}{old_bytes / 1024:>9.1f}{new_requests:>9}"
+              f"{new_bytes / 1024:>9.1f}{old_found:>11}{new_found:>11}")
+    old_requests, old_bytes, _ = totals["unconditional"]
+    new_requests, new_bytes, not_modified = totals["UpdateManager"]
+    print(f"\nTotal: {old_requests} requests / {old_bytes / 1024:.1f} KB before, {new_requests} requests "
+          f"({not_modified} answered 304) / {new_bytes / 1024:.1f} KB after; "
+          f"saved {old_requests - new_requests} requests and {(old_bytes - new_bytes) / 1024:.1f} KB")
+
+    new = results["UpdateManager"]
+    assert new['startups'][1] == 1, "startups within the interval should share one request"
+    assert new['revalidate'][2] == 0 and new['clicks'][2] == 0, "an unchanged release was downloaded again"
+    assert new['release'][2] > 0 and new['release'][3] == new['release'][0], "the new release was not seen"
+    assert results["unconditional"]['release'][3] == 0, "expected the string comparison to miss 1.10.0"
+    assert new['outage'][1] == 1, f"{new['outage'][1]} requests during the outage; expected backoff after one"
+    assert new['outage'][3] == new['outage'][0], "the stored release should still be offered during an outage"
+    assert new_bytes < old_bytes / 5
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+"""
+Mock Servers
+Local stand-ins for the external APIs so benchmarks are repeatable
+"""
+
+import hashlib
+import json
+import math
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from weather_ratelimit import TokenBucket
+
+ASSET_SLICE_BYTES = 64 * 1024  # Asset bodies are written (and throttled) in slices of this size
+
+
+def fake_current_weather(lat, lon):
+    """Build an Open-Meteo style response for one coordinate"""
+    return {
+        'latitude': lat,
+        'longitude': lon,
+        'timezone': 'Europe/Amsterdam',
+        'current': {
+            'time': '2026-01-01T12:00',
+            'temperature_2m': 7.4,
+            'relative_humidity_2m': 81,
+            'apparent_temperature': 4.9,
+            'precipitation': 0.1,
+            'rain': 0.1,
+            'weather_code': 61,
+            'cloud_cover': 90,
+            'wind_speed_10m': 18.3,
+            'wind_direction_10m': 240
+        }
+    }
+
+
+def fake_forecast(lat, lon, days):
+    """Hourly and daily forecast blocks like Open-Meteo returns them"""
+    rng = random.Random(f"{lat:.3f},{lon:.3f}")
+    hours = days * 24
+    base = 15 - abs(lat) / 4
+    temperature = [round(base + 6 * math.sin((h % 24 - 9) / 24 * 2 * math.pi) + rng.gauss(0, 1), 1)
+                   for h in range(hours)]
+    precipitation = [round(rng.expovariate(2), 1) if rng.random() < 0.15 else 0.0 for _ in range(hours)]
+    return {
+        'hourly': {
+            'time': [f"2026-01-{1 + h // 24:02d}T{h % 24:02d}:00" for h in range(hours)],
+            'temperature_2m': temperature,
+            'precipitation': precipitation,
+        },
+        'daily': {
+            'time': [f"2026-01-{1 + d:02d}" for d in range(days)],
+            'weather_code': [rng.choice((0, 2, 3, 61, 63, 80)) for _ in range(days)],
+        },
+    }
+
+
+class MockServer:
+    """Runs a ThreadingHTTPServer with a handler in a background thread"""
+
+    handler_class = None
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate  # Fraction of requests answered with error_status
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)  # Seeded so error injection repeats run to run
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def should_fail(self):
+        """Decide whether this request gets an injected error (and count it)"""
+        if not self.error_rate:
+            return False
+        with self._lock:
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return fail
+
+    def delay(self):
+        """Sleep for the configured latency plus a random jitter"""
+        seconds = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if seconds:
+            time.sleep(seconds)
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def start(self):
+        server = self
+
+        class Handler(self.handler_class):
+            mock = server
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Request handler that keeps benchmark output clean"""
+
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment; otherwise delayed ACKs add ~40 ms per keep-alive request
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    mock = None
+
+    def setup(self):
+        super().setup()
+        if self.mock:
+            self.mock.count_connection()
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionError:
+            self.close_connection = True  # Client went away mid-response, e.g. a cancelled download
+
+    def finish(self):
+        try:
+            super().finish()
+        except ConnectionError:
+            pass
+
+    def send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class OpenMeteoHandler(QuietHandler):
+    """Answers /v1/forecast like Open-Meteo does"""
+
+    def do_GET(self):
+        self.mock.count_request()
+        self.mock.delay()
+        if self.mock.should_fail():
+            return self.send_json({'error': True, 'reason': "injected failure"}, self.mock.error_status)
+
+        query = parse_qs(urlparse(self.path).query)
+        lats = [float(v) for v in query.get('latitude', ['0'])[0].split(',')]
+        lons = [float(v) for v in query.get('longitude', ['0'])[0].split(',')]
+        results = [fake_current_weather(lat, lon) for lat, lon in zip(lats, lons)]
+        if 'hourly' in query:
+            days = int(query.get('forecast_days', ['7'])[0])
+            for result in results:
+                result.update(fake_forecast(result['latitude'], result['longitude'], days))
+        # Like Open-Meteo: one location is an object, several are an array
+        self.send_json(results[0] if len(results) == 1 else results)
+
+
+class MockOpenMeteo(MockServer):
+    """Local Open-Meteo forecast endpoint"""
+
+    handler_class = OpenMeteoHandler
+
+    @property
+    def forecast_url(self):
+        return f"{self.url}/v1/forecast"
+
+
+def fake_place(query, language="en"):
+    """Nominatim-style search result for any name, stable per name"""
+    name = query.split(",")[0].strip().title()
+    digest = hashlib.sha1(name.lower().encode('utf-8')).digest()
+    lat = -60 + digest[0] / 255 * 130
+    lon = -180 + int.from_bytes(digest[1:3], 'big') / 65535 * 360
+    country = "Mockland" if language == "en" else "Mockland (lokaal)"
+    return {'place_id': int.from_bytes(digest[3:7], 'big'), 'lat': f"{lat:.7f}", 'lon': f"{lon:.7f}",
+            'display_name': f"{name}, {country}", 'type': 'city', 'importance': 0.5}
+
+
+class NominatimHandler(QuietHandler):
+    """Answers /search like Nominatim does; names starting with "Nowhere" are not found"""
+
+    def do_GET(self):
+        self.mock.count_request()
+        if not self.mock.admit():
+            return self.send_json({'error': "Too many requests"}, 429, {'Retry-After': "1"})
+        self.mock.delay()
+        if self.mock.should_fail():
+            return self.send_json({'error': "injected failure"}, self.mock.error_status)
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        text = query.get('q', [''])[0]
+        if url.path != "/search" or not text:
+            return self.send_json({'error': "Bad request"}, 400)
+        if text.lower().startswith("nowhere"):
+            return self.send_json([])
+        self.send_json([fake_place(text, query.get('accept-language', ['en'])[0])])
+
+
+class MockNominatim(MockServer):
+    """Local Nominatim search endpoint
+
+    With rate_limit (requests per second) it enforces a usage policy like
+    Nominatim's: a request arriving sooner than 1/rate_limit after the last
+    accepted one (less RATE_TOLERANCE for timer noise) gets HTTP 429.
+    """
+
+    handler_class = NominatimHandler
+    RATE_TOLERANCE = 0.2
+
+    def __init__(self, rate_limit=None, **kwargs):
+        super().__init__(**kwargs)
+        self.rate_limit = rate_limit
+        self.throttled = 0
+        self._last_accepted = None
+
+    def admit(self):
+        """Whether a request arriving now is within the rate limit (and count it if not)"""
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            gap = 1.0 / self.rate_limit * (1 - self.RATE_TOLERANCE)
+            if self._last_accepted is not None and now - self._last_accepted < gap:
+                self.throttled += 1
+                return False
+            self._last_accepted = now
+            return True
+
+    @property
+    def domain(self):
+        """host:port for geopy's Nominatim(domain=..., scheme="http")"""
+        return self.url.split("://", 1)[1]
+
+
+class GitHubHandler(QuietHandler):
+    """Answers releases/latest like the GitHub API and serves the release assets"""
+
+    def do_GET(self):
+        self.mock.count_request()
+        self.mock.delay()
+        if self.mock.should_fail():
+            return self.send_json({'message': "injected failure"}, self.mock.error_status)
+
+        path = urlparse(self.path).path
+        if path.endswith("/releases/latest"):
+            body, etag, modified = self.mock.release_response()
+            headers = {'ETag': etag, 'Last-Modified': modified}
+            if self.mock.conditional and (self.headers.get('If-None-Match') == etag
+                                          or (not self.headers.get('If-None-Match')
+                                              and self.headers.get('If-Modified-Since') == modified)):
+                self.mock.count_response(304, 0)
+                self.send_response(304)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', "0")
+                self.end_headers()
+                return
+            self.mock.count_response(200, len(body))
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if path.startswith("/download/"):
+            body = self.mock.asset_files().get(path[len("/download/"):])
+            if body is None:
+                return self.send_json({'message': "Not Found"}, 404)
+            return self.send_asset(body)
+        self.send_json({'message': "Not Found"}, 404)
+
+    def send_asset(self, body):
+        """Serve an asset like a CDN: strong ETag, single byte ranges, optional bandwidth cap"""
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        start, end, status = 0, len(body) - 1, 200
+        requested = self.headers.get('Range', "")
+        if_range = self.headers.get('If-Range')
+        if self.mock.ranges and requested.startswith("bytes=") and (if_range is None or if_range == etag):
+            first, _, last = requested[len("bytes="):].partition("-")
+            start = int(first) if first else max(0, len(body) - int(last))
+            end = min(int(last), len(body) - 1) if first and last else len(body) - 1
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(body)}")
+                self.send_header('Content-Length', "0")
+                self.end_headers()
+                return
+            status = 206
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('ETag', etag)
+        if self.mock.ranges:
+            self.send_header('Accept-Ranges', "bytes")
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(body)}")
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        self.wfile.flush()
+
+        cut = self.mock.take_interruption(end - start + 1)
+        bucket = TokenBucket(self.mock.bandwidth, self.mock.bandwidth / 20) if self.mock.bandwidth else None
+        position = start
+        while position <= end:
+            size = min(ASSET_SLICE_BYTES, end + 1 - position)
+            if cut is not None and position - start + size > cut:
+                # Drop the connection partway, as a flaky network would
+                self.wfile.write(body[position:start + cut])
+                self.wfile.flush()
+                self.mock.count_asset_bytes(start + cut - position)
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            if bucket:
+                bucket.acquire(size)
+            if self.mock.total_limiter:
+                self.mock.total_limiter.acquire(size)
+            self.wfile.write(body[position:position + size])
+            self.mock.count_asset_bytes(size)
+            position += size
+
+
+class MockGitHub(MockServer):
+    """Local GitHub releases API and asset downloads
+
+    releases/latest carries an ETag and Last-Modified and, with conditional
+    on, answers a matching If-None-Match (or If-Modified-Since) with 304 as
+    GitHub does. release_bytes counts the release JSON bytes sent.
+
+    Assets are listed with their sha256 digest and served with byte ranges
+    (unless ranges is off), optionally capped per connection (bandwidth) or
+    in total (total_bandwidth), in bytes per second. Each entry put in
+    interruptions cuts the next long enough response off after that many
+    bytes.
+    """
+
+    handler_class = GitHubHandler
+
+    def __init__(self, latest_version="9.9.9", asset_size=1024 * 1024, notes="Mock release notes",
+                 conditional=True, assets=None, ranges=True, bandwidth=None, total_bandwidth=None, **kwargs):
+        super().__init__(**kwargs)
+        self.latest_version = latest_version
+        self.asset_size = asset_size
+        self.notes = notes
+        self.conditional = conditional
+        self.assets = assets  # {name: bytes}; by default one Weather.exe of asset_size random bytes
+        self.ranges = ranges
+        self.bandwidth = bandwidth  # Bytes per second per connection, like a throttled CDN edge
+        self.total_limiter = TokenBucket(total_bandwidth, total_bandwidth / 20) if total_bandwidth else None
+        self.release_bytes = 0
+        self.not_modified = 0
+        self.asset_bytes_sent = 0
+        self.interruptions = []  # Byte counts after which the next responses are cut off
+        self._published = {}  # {version: epoch seconds}
+        self._asset = None
+
+    def count_asset_bytes(self, size):
+        with self._lock:
+            self.asset_bytes_sent += size
+
+    def take_interruption(self, length):
+        """Bytes after which this response is cut off, or None"""
+        with self._lock:
+            if self.interruptions and self.interruptions[0] < length:
+                return self.interruptions.pop(0)
+        return None
+
+    def asset_files(self):
+        if self.assets is not None:
+            return self.assets
+        return {"Weather.exe": self.asset_bytes()}
+
+    def count_response(self, status, size):
+        with self._lock:
+            self.release_bytes += size
+            self.not_modified += status == 304
+
+    def release_response(self):
+        """(body, ETag, Last-Modified) of releases/latest; both validators change with the version"""
+        body = json.dumps(self.release()).encode('utf-8')
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        with self._lock:
+            # Published when first served, so a new latest_version gets a later date
+            published = self._published.setdefault(self.latest_version,
+                                                   max([time.time(), *self._published.values()]) + 1)
+        modified = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(published))
+        return body, etag, modified
+
+    def asset_bytes(self):
+        if self._asset is None or len(self._asset) != self.asset_size:
+            self._asset = random.Random(self.asset_size).randbytes(self.asset_size)
+        return self._asset
+
+    def release(self):
+        return {
+            'tag_name': f"v{self.latest_version}",
+            'html_url': f"{self.url}/releases/v{self.latest_version}",
+            'body': self.notes,
+            'assets': [{'name': name, 'size': len(body), 'digest': f"sha256:{hashlib.sha256(body).hexdigest()}",
+                        'browser_download_url': f"{self.url}/download/{name}"}
+                       for name, body in self.asset_files().items()],
+        }
@@ -0,0 +1,386 @@
+"""
+Benchmark suite: repeatable scenarios against local Open-Meteo, Nominatim and GitHub stand-ins
+
+Runs the weather fetch, geocoding, cache, saved-location and update-check
+code paths through fixed scenarios (cold, warm, burst, many locations,
+injected errors) with configurable upstream latency, and writes the
+results as JSON so two versions can be compared:
+
+  python benchmarks/run_suite.py --output before.json
+  ... change something ...
+  python benchmarks/run_suite.py --output after.json --compare before.json
+
+Usage: python benchmarks/run_suite.py [--latency 0.02] [--scenarios weather_cold geocode_warm] [--output FILE]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from geopy.geocoders import Nominatim
+
+import weather_api
+import weather_http
+import weather_update
+from weather_cache import WeatherCache
+from weather_geocode import Geocoder, GeocodeCache
+from weather_locations import LocationManager
+from weather_startup import FIRST_PAINT_TARGET_MS
+from weather_record import WeatherRecord, records_from_api
+from weather_update import UpdateManager
+from mock_servers import MockOpenMeteo, MockNominatim, MockGitHub
+
+SUITE_FORMAT = 1  # Bump when result keys change meaning
+
+
+def timings(samples):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 3)
+
+    return {'count': len(ordered), 'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+            'p50_ms': pick(0.5), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99),
+            'max_ms': round(ordered[-1] * 1000, 3)}
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def coordinates(count, offset=0):
+    """Distinct, repeatable coordinates spread over the globe"""
+    return [(round(-60 + ((i + offset) % 1200) * 0.1, 3), round(-180 + ((i + offset) // 1200) * 0.05, 3))
+            for i in range(count)]
+
+
+class Suite:
+    """Holds the stand-in servers and runs one scenario at a time"""
+
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.meteo = MockOpenMeteo(latency=args.latency, jitter=args.jitter).start()
+        self.nominatim = MockNominatim(latency=args.latency, jitter=args.jitter).start()
+        self.github = MockGitHub(latency=args.latency, jitter=args.jitter).start()
+        weather_api.OPEN_METEO_URL = self.meteo.forecast_url
+        weather_update.GITHUB_API_URL = self.github.url
+        # Short backoff so injected errors cost retries, not seconds of sleeping
+        weather_http.configure(backoff_base=0.01, backoff_max=0.05)
+
+    def close(self):
+        for server in (self.meteo, self.nominatim, self.github):
+            server.stop()
+
+    def run(self, name):
+        """Run a scenario and add the upstream traffic it caused"""
+        scenario = SCENARIOS[name]
+        servers = {'open_meteo': self.meteo, 'nominatim': self.nominatim, 'github': self.github}
+        before = {key: server.requests for key, server in servers.items()}
+        http_before = weather_http.get_client().get_stats()
+        start = time.perf_counter()
+        result = scenario(self)
+        result['seconds'] = round(time.perf_counter() - start, 4)
+        result['upstream_requests'] = {key: server.requests - before[key] for key, server in servers.items()}
+        http_after = weather_http.get_client().get_stats()
+        result['http_retries'] = http_after['retries'] - http_before['retries']
+        return result
+
+    def path(self, name):
+        return os.path.join(self.workdir, name)
+
+    def geocoder(self, cache_name):
+        geolocator = Nominatim(user_agent="weather-suite", domain=self.nominatim.domain, scheme="http")
+        return Geocoder("weather-suite", cache=GeocodeCache(persist_path=self.path(cache_name)),
+                        geolocator=geolocator)
+
+
+def scenario_weather_cold(suite):
+    """One upstream fetch per coordinate, nothing cached"""
+    samples = [timed(weather_api.fetch_weather_data, lat, lon)[0]
+               for lat, lon in coordinates(suite.args.requests)]
+    return {'fetch': timings(samples)}
+
+
+def scenario_weather_warm(suite):
+    """Same coordinates again through a filled WeatherCache"""
+    cache = WeatherCache(persist_path=suite.path("warm.db"))
+    keys = coordinates(suite.args.requests, offset=5000)
+    for lat, lon in keys:
+        cache.set(lat, lon, WeatherRecord.from_api(weather_api.fetch_weather_data(lat, lon), "x", "x"))
+    samples = []
+    for _ in range(10):
+        samples.extend(timed(cache.get, lat, lon)[0] for lat, lon in keys)
+    cache.close()
+
+    # Warm start: a new process opening the same database
+    reopened = WeatherCache(persist_path=suite.path("warm.db"))
+    disk = [timed(reopened.get, lat, lon)[0] for lat, lon in keys]
+    reopened.close()
+    return {'memory_hit': timings(samples), 'disk_hit': timings(disk)}
+
+
+def scenario_weather_burst(suite):
+    """Many threads asking for the same few uncached coordinates at once"""
+    cache = WeatherCache()
+    keys = coordinates(4, offset=9000)
+    samples = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(suite.args.burst)
+
+    def worker(index):
+        lat, lon = keys[index % len(keys)]
+        barrier.wait()
+        elapsed, _ = timed(cache.fetch_once, lat, lon, lambda: weather_api.fetch_weather_data(lat, lon))
+        with lock:
+            samples.append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(suite.args.burst)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'callers': suite.args.burst, 'keys': len(keys), 'coalesced': cache.coalesced,
+            'fetch': timings(samples)}
+
+
+def scenario_many_locations(suite):
+    """Refresh a large location list with multi-coordinate requests"""
+    cache = WeatherCache(persist_path=suite.path("many.db"), max_entries=suite.args.many * 2)
+    keys = coordinates(suite.args.many, offset=20000)
+    fetch_time, responses = timed(weather_api.fetch_weather_batch, keys)
+    labels = [(f"Place {i}", f"Place {i}", None) for i in range(len(keys))]
+    build_time, records = timed(records_from_api, responses, labels)
+    store_time, _ = timed(cache.set_many, [(lat, lon, record) for (lat, lon), record in zip(keys, records)])
+    cache.close()
+    total = fetch_time + build_time + store_time
+    return {'locations': len(keys), 'fetch_ms': round(fetch_time * 1000, 3),
+            'build_ms': round(build_time * 1000, 3), 'store_ms': round(store_time * 1000, 3),
+            'per_second': round(len(keys) / total, 1)}
+
+
+def scenario_geocode_cold(suite):
+    """Unique city names, each resolved through Nominatim"""
+    geocoder = suite.geocoder("geo_cold.json")
+    samples = [timed(geocoder.lookup, f"Cold City {i}")[0] for i in range(suite.args.requests)]
+    return {'lookup': timings(samples)}
+
+
+def scenario_geocode_warm(suite):
+    """A small set of names looked up over and over"""
+    geocoder = suite.geocoder("geo_warm.json")
+    names = [f"Warm City {i}" for i in range(10)]
+    for name in names:
+        geocoder.lookup(name)
+    samples = [timed(geocoder.lookup, names[i % len(names)].upper())[0] for i in range(suite.args.requests * 10)]
+    return {'lookup': timings(samples), 'cache': geocoder.cache.get_stats()}
+
+
+def scenario_locations(suite):
+    """Add, list and remove saved locations in a growing file"""
+    path = suite.path("locations.json")
+    manager = LocationManager(path)
+    count = suite.args.saved
+    add = [timed(manager.add_location, f"Place {i}", lat, lon, f"Place {i}, Mockland")[0]
+           for i, (lat, lon) in enumerate(coordinates(count))]
+    load_time, _ = timed(LocationManager, path)
+    lookups = [timed(manager.get_locations)[0] for _ in range(count)]
+    find = [timed(manager.find_by_coordinates, lat, lon)[0] for lat, lon in coordinates(count)]
+    remove = [timed(manager.remove_location, f"Place {i}")[0] for i in range(0, count, max(1, count // 50))]
+    close_time, _ = timed(manager.close)
+    return {'saved': count, 'file_bytes': os.path.getsize(path), 'add': timings(add),
+            'load_ms': round(load_time * 1000, 3), 'list': timings(lookups), 'find': timings(find),
+            'remove': timings(remove), 'close_ms': round(close_time * 1000, 3)}
+
+
+def scenario_update_check(suite):
+    """Repeated release checks against the GitHub stand-in: automatic (interval) and forced (conditional)"""
+    manager = UpdateManager("1.0.0", "Rog294super/Weather-App", suite.workdir)
+    found = 0
+    automatic = []
+    forced = []
+    bytes_before = suite.github.release_bytes
+    for _ in range(suite.args.requests):
+        elapsed, info = timed(manager.check_for_updates)
+        automatic.append(elapsed)
+        found += info is not None
+        elapsed, info = timed(manager.check_for_updates, True)
+        forced.append(elapsed)
+        found += info is not None
+    stats = manager.get_stats()
+    return {'check': timings(automatic), 'forced_check': timings(forced), 'updates_found': found,
+            'not_modified': stats['not_modified'], 'skipped': stats['skipped'],
+            'release_bytes': suite.github.release_bytes - bytes_before}
+
+
+def scenario_weather_errors(suite):
+    """Cold fetches while Open-Meteo fails a share of requests"""
+    suite.meteo.error_rate = suite.args.error_rate
+    failures = 0
+    samples = []
+    try:
+        for lat, lon in coordinates(suite.args.requests, offset=30000):
+            start = time.perf_counter()
+            try:
+                weather_api.fetch_weather_data(lat, lon)
+            except RuntimeError:
+                failures += 1
+            samples.append(time.perf_counter() - start)
+    finally:
+        suite.meteo.error_rate = 0.0
+    return {'error_rate': suite.args.error_rate, 'failed_calls': failures, 'fetch': timings(samples)}
+
+
+def _startup_run(code_or_script):
+    """Run a fresh interpreter and return (wall ms, timing dict) or None if it failed"""
+    start = time.perf_counter()
+    command = [sys.executable] + code_or_script
+    try:
+        done = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, timeout=60)
+    except subprocess.TimeoutExpired:
+        return None
+    wall = (time.perf_counter() - start) * 1000
+    lines = done.stdout.strip().splitlines()
+    if done.returncode != 0 or not lines:
+        return None
+    return wall, json.loads(lines[-1])
+
+
+def scenario_startup(suite):
+    """Time to first paint of the GUI in a fresh process, against FIRST_PAINT_TARGET_MS"""
+    runs = [_startup_run(["Weather.py", "--timing=json"]) for _ in range(suite.args.startup_runs)]
+    runs = [run for run in runs if run]
+    display = bool(runs)
+    if not display:
+        # No display to open a window on: time the import phase alone (module import, no Tk())
+        code = "import json, Weather; print(json.dumps(Weather.startup.to_dict()))"
+        runs = [run for run in (_startup_run(["-c", code]) for _ in range(suite.args.startup_runs)) if run]
+    if not runs:
+        return {'display': display, 'error': "Weather.py could not be started"}
+
+    first_paint = [timing['first_paint_ms'] for _, timing in runs if timing.get('first_paint_ms') is not None]
+    median_paint = round(statistics.median(first_paint), 2) if first_paint else None
+    return {
+        'display': display,
+        'runs': len(runs),
+        'imports_ms': round(statistics.median(timing['phases'].get('imports', 0) for _, timing in runs), 2),
+        'first_paint_ms': median_paint,
+        'process_ms': round(statistics.median(wall for wall, _ in runs), 2),
+        'target_ms': FIRST_PAINT_TARGET_MS,
+        'meets_target': (median_paint <= FIRST_PAINT_TARGET_MS) if median_paint is not None else None,
+        'phases': runs[-1][1]['phases'],
+    }
+
+
+SCENARIOS = {
+    'weather_cold': scenario_weather_cold,
+    'weather_warm': scenario_weather_warm,
+    'weather_burst': scenario_weather_burst,
+    'many_locations': scenario_many_locations,
+    'geocode_cold': scenario_geocode_cold,
+    'geocode_warm': scenario_geocode_warm,
+    'locations': scenario_locations,
+    'update_check': scenario_update_check,
+    'weather_errors': scenario_weather_errors,
+    'startup': scenario_startup,
+}
+
+
+def app_version():
+    """VERSION from Weather.py, read as text so tkinter is not imported"""
+    match = re.search(r'^VERSION = "([^"]+)"', (ROOT / "Weather.py").read_text(encoding='utf-8'), re.M)
+    return match.group(1) if match else None
+
+
+def flatten(result, prefix=""):
+    """{'fetch': {'p50_ms': 1}} -> {'fetch.p50_ms': 1}, numbers only"""
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(report, baseline):
+    """Print latency and throughput changes against an earlier run"""
+    print(f"\nCompared with {baseline.get('version')} run at {baseline.get('started')}:")
+    for name, result in report['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if old is None:
+            continue
+        before, after = flatten(old), flatten(result)
+        for key, value in after.items():
+            tracked = key.endswith(("p50_ms", "p99_ms")) or key in ("per_second", "first_paint_ms", "imports_ms")
+            if not tracked or not before.get(key):
+                continue
+            change = (value - before[key]) / before[key] * 100
+            print(f"  {name + '.' + key:<36}{before[key]:>12.3f}{value:>12.3f}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--latency', type=float, default=0.02, help="stand-in server latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.2, help="share of failed requests in weather_errors")
+    parser.add_argument('--requests', type=int, default=50, help="calls per cold/warm scenario")
+    parser.add_argument('--burst', type=int, default=32, help="concurrent callers in weather_burst")
+    parser.add_argument('--many', type=int, default=2000, help="locations in many_locations")
+    parser.add_argument('--saved', type=int, default=500, help="saved locations in the locations scenario")
+    parser.add_argument('--startup-runs', type=int, default=3, help="fresh processes timed in the startup scenario")
+    parser.add_argument('--output', '-o', help="write the JSON results here (default: stdout)")
+    parser.add_argument('--compare', metavar='FILE', help="earlier results to compare against")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('weather_http').setLevel(logging.ERROR)  # Injected errors log every retry
+
+    report = {
+        'format': SUITE_FORMAT,
+        'version': app_version(),
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        suite = Suite(args, workdir)
+        try:
+            for name in args.scenarios:
+                print(f"running {name}...", file=sys.stderr)
+                report['results'][name] = suite.run(name)
+        finally:
+            suite.close()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding='utf-8')
+    else:
+        print(text)
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text(encoding='utf-8')))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Weather API Module
+Talks to the Open-Meteo forecast API
+"""
+
+import logging
+import requests
+
+import weather_http
+import weather_metrics
+
+logger = logging.getLogger(__name__)
+
+OPEN_METEO_HOST = "api.open-meteo.com"
+OPEN_METEO_URL = f"https://{OPEN_METEO_HOST}/v1/forecast"
+
+CURRENT_FIELDS = (
+    "temperature_2m,relative_humidity_2m,apparent_temperature,"
+    "precipitation,rain,weather_code,cloud_cover,"
+    "wind_speed_10m,wind_direction_10m"
+)
+HOURLY_FIELDS = "temperature_2m,precipitation"
+DAILY_FIELDS = "weather_code"
+FORECAST_DAYS = 7  # Open-Meteo serves 1-16 days; 0 requests current conditions only
+
+_fetch_seconds = weather_metrics.histogram("weather_fetch_seconds", "Open-Meteo request time", ("kind",))
+FETCH_SINGLE_SECONDS = _fetch_seconds.labels(kind="single")
+FETCH_BATCH_SECONDS = _fetch_seconds.labels(kind="batch")
+FETCH_ERRORS = weather_metrics.counter("weather_fetch_errors_total", "Open-Meteo requests that failed")
+
+
+def forecast_params(forecast_days):
+    """Query string for the hourly and daily forecast blocks"""
+    if not forecast_days:
+        return ""
+    return f"&hourly={HOURLY_FIELDS}&daily={DAILY_FIELDS}&forecast_days={forecast_days}"
+
+
+def fetch_weather_data(lat, lon, timeout=10, forecast_days=FORECAST_DAYS):
+    """Fetch current weather and the hourly/daily forecast for one coordinate from Open-Meteo"""
+    try:
+        url = (
+            f"{OPEN_METEO_URL}"
+            f"?latitude={lat}&longitude={lon}"
+            f"&current={CURRENT_FIELDS}"
+            f"{forecast_params(forecast_days)}"
+            f"&timezone=auto"
+        )
+
+        with FETCH_SINGLE_SECONDS.time():
+            response = weather_http.get(url, timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+
+    except requests.exceptions.Timeout:
+        FETCH_ERRORS.inc()
+        raise RuntimeError("Weather API request timed out.")
+    except requests.exceptions.ConnectionError:
+        FETCH_ERRORS.inc()
+        raise RuntimeError("Failed to connect to weather service.")
+    except Exception as e:
+        FETCH_ERRORS.inc()
+        raise RuntimeError(f"Failed to fetch weather data: {e}")
+
+
+BATCH_CHUNK_SIZE = 100  # Locations per multi-coordinate request (keeps URLs short)
+
+
+def fetch_weather_batch(coordinates, chunk_size=BATCH_CHUNK_SIZE, timeout=30,
+                        forecast_days=FORECAST_DAYS):
+    """Fetch weather and forecasts for many (lat, lon) pairs using multi-coordinate requests
+
+    Returns a list of response dicts in the same order as coordinates.
+    """
+    coordinates = list(coordinates)
+    results = []
+    for start in range(0, len(coordinates), chunk_size):
+        chunk = coordinates[start:start + chunk_size]
+        results.extend(_fetch_chunk(chunk, timeout, forecast_days))
+    logger.info(f"Batch fetched {len(results)} locations in "
+                f"{(len(coordinates) + chunk_size - 1) // chunk_size} requests")
+    return results
+
+
+def _fetch_chunk(chunk, timeout, forecast_days):
+    """Fetch one multi-coordinate request and split the response per location"""
+    try:
+        url = (
+            f"{OPEN_METEO_URL}"
+            f"?latitude={','.join(str(lat) for lat, _ in chunk)}"
+            f"&longitude={','.join(str(lon) for _, lon in chunk)}"
+            f"&current={CURRENT_FIELDS}"
+            f"{forecast_params(forecast_days)}"
+            f"&timezone=auto"
+        )
+
+        with FETCH_BATCH_SECONDS.time():
+            response = weather_http.get(url, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+
+    except requests.exceptions.Timeout:
+        FETCH_ERRORS.inc()
+        raise RuntimeError("Weather API request timed out.")
+    except requests.exceptions.ConnectionError:
+        FETCH_ERRORS.inc()
+        raise RuntimeError("Failed to connect to weather service.")
+    except Exception as e:
+        FETCH_ERRORS.inc()
+        raise RuntimeError(f"Failed to fetch weather data: {e}")
+
+    # A single coordinate comes back as an object, several as an array
+    if isinstance(data, dict):
+        data = [data]
+    if len(data) != len(chunk):
+        raise RuntimeError(f"Weather API returned {len(data)} results for {len(chunk)} locations")
+    return data
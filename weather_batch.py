@@ -0,0 +1,303 @@
+"""
+Batch Module
+Headless mode: fetch weather for a file of locations and stream NDJSON, without tkinter
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import weather_api
+import weather_metrics
+from weather_cache import WeatherCache, CACHE_DB_FILE
+from weather_locations import LocationManager, CONFIG_FILE
+from weather_record import records_from_api
+from weather_report import report_dict
+
+logger = logging.getLogger(__name__)
+
+BATCH_WORKERS = 8
+BATCH_CHUNK_SIZE = 25  # Locations per upstream request, and per burst of output lines
+READ_BLOCK_SIZE = 64 * 1024
+LOCATIONS_FILE_START = re.compile(r'\s*\{\s*"locations"\s*:\s*\[')  # As LocationManager writes it
+
+
+def iter_locations(path, block_size=READ_BLOCK_SIZE):
+    """Yield location dicts from a file without loading it whole
+
+    Accepts NDJSON (one object per line), a JSON array of objects, or the
+    app's own {"locations": [...]} file. Only about two read blocks are held
+    in memory at a time. Any other JSON object holding a "locations" list
+    (e.g. with "locations" after other keys) is rejected with ValueError.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8-sig') as f:  # Editors on Windows may add a BOM
+        buffer = f.read(block_size)
+        wrapper = LOCATIONS_FILE_START.match(buffer)
+        if wrapper:
+            pos, in_array = wrapper.end(), True
+        elif buffer.lstrip().startswith('['):
+            pos, in_array = buffer.index('[') + 1, True
+        else:
+            pos, in_array = 0, False  # NDJSON
+        separators = ", \t\r\n" if in_array else " \t\r\n"
+        eof = False
+
+        while True:
+            if not eof and len(buffer) - pos < block_size:
+                chunk = f.read(block_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+            while pos < len(buffer) and buffer[pos] in separators:
+                pos += 1
+            if pos >= len(buffer):
+                if eof:
+                    return
+                continue
+            if in_array and buffer[pos] == ']':
+                return
+
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"Malformed location in {path}: {e.msg}")
+                # The object runs past the buffer; read more and try again
+                chunk = f.read(block_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            if isinstance(item, dict):
+                if not in_array and isinstance(item.get('locations'), list):
+                    raise ValueError(f"Unsupported locations file {path}: "
+                                     f"expected {{\"locations\": [...]}} with no keys before it")
+                yield item
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BatchRunner:
+    """Fetches locations chunk by chunk on a thread pool and writes one NDJSON line each
+
+    At most workers * 2 chunks are read ahead of the output, so memory stays
+    flat however long the input is. Lines are written as each chunk
+    completes, in completion order, so fast results are not held up by slow
+    ones. Cache hits are answered without a request; every fetched record
+    goes into the cache.
+    """
+
+    def __init__(self, cache=None, geocoder=None, workers=BATCH_WORKERS, chunk_size=BATCH_CHUNK_SIZE,
+                 forecast_days=weather_api.FORECAST_DAYS, mode='json'):
+        self.cache = cache
+        self.geocoder = geocoder
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.forecast_days = forecast_days
+        self.mode = mode
+        self._pipeline = None  # Rate-limited geocoding queue while a run is in progress
+        self.stats = {'locations': 0, 'fetched': 0, 'cached': 0, 'errors': 0, 'requests': 0}
+        self._stats_lock = threading.Lock()
+
+    def run(self, locations, output):
+        """Process every location and write its line to output; returns the stats"""
+        start = time.perf_counter()
+        first_line = None
+        if self.geocoder is not None:
+            from weather_geocode import GeocodePipeline
+            self._pipeline = GeocodePipeline(self.geocoder).start()
+        try:
+            first_line = self._run(locations, output)
+        finally:
+            if self._pipeline:
+                stats = self._pipeline.get_stats()
+                self._pipeline.stop()
+                self._pipeline = None
+                logger.info(f"Geocoded {stats['completed']} names, {stats['cache_hits']} from cache")
+
+        stats = dict(self.stats)
+        stats['seconds'] = time.perf_counter() - start
+        stats['first_line_seconds'] = (first_line - start) if first_line else None
+        stats['per_second'] = stats['locations'] / stats['seconds'] if stats['seconds'] else 0.0
+        return stats
+
+    def _run(self, locations, output):
+        """Feed chunks to the workers and write their lines; returns when the first line was written"""
+        first_line = None
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="batch") as pool:
+            pending = set()
+            for chunk in _chunks(locations, self.chunk_size):
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    first_line = first_line or time.perf_counter()
+                    self._write(done, output)
+                pending.add(pool.submit(self._process, chunk))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                first_line = first_line or time.perf_counter()
+                self._write(done, output)
+        return first_line
+
+    def _write(self, futures, output):
+        for future in futures:
+            output.write(future.result())
+        output.flush()
+
+    def _process(self, chunk):
+        """Resolve one chunk to its NDJSON text (never raises)"""
+        lines = [None] * len(chunk)
+        to_fetch = []  # (index, lat, lon, labels)
+        cached_count = errors = 0
+        # The chunk's names go into the geocoding queue together, behind any interactive lookups
+        names = [location['name'] for location in chunk
+                 if (location.get('lat') is None or location.get('lon') is None) and location.get('name')]
+        lookups = {}
+        if names and self._pipeline:
+            from weather_geocode import PRIORITY_BULK
+            lookups = dict(zip(names, self._pipeline.submit_many(names, PRIORITY_BULK)))
+        for index, location in enumerate(chunk):
+            try:
+                lat, lon, labels = self._resolve(location, lookups)
+            except Exception as e:
+                lines[index] = self._error_line(location, e)
+                errors += 1
+                continue
+            cached = self.cache.get(lat, lon) if self.cache else None
+            if cached is not None:
+                lines[index] = self._line(location, lat, lon, cached.relabel(*labels), cached=True)
+                cached_count += 1
+            else:
+                to_fetch.append((index, lat, lon, labels))
+
+        if to_fetch:
+            try:
+                responses = weather_api.fetch_weather_batch(
+                    [(lat, lon) for _, lat, lon, _ in to_fetch], chunk_size=len(to_fetch),
+                    forecast_days=self.forecast_days
+                )
+                records = records_from_api(responses, [labels for _, _, _, labels in to_fetch])
+                if self.cache:
+                    self.cache.set_many((lat, lon, record)
+                                        for (_, lat, lon, _), record in zip(to_fetch, records))
+                for (index, lat, lon, _), record in zip(to_fetch, records):
+                    lines[index] = self._line(chunk[index], lat, lon, record, cached=False)
+            except Exception as e:
+                logger.warning(f"Batch request for {len(to_fetch)} locations failed: {e}")
+                for index, _, _, _ in to_fetch:
+                    lines[index] = self._error_line(chunk[index], e)
+                errors += len(to_fetch)
+
+        with self._stats_lock:
+            self.stats['locations'] += len(chunk)
+            self.stats['fetched'] += len(to_fetch)
+            self.stats['cached'] += cached_count
+            self.stats['errors'] += errors
+            self.stats['requests'] += 1 if to_fetch else 0
+        return "".join(lines)
+
+    def _resolve(self, location, lookups):
+        """(lat, lon, (location_name, address_en, address_local)) for an input location"""
+        name = location.get('name')
+        lat, lon = location.get('lat'), location.get('lon')
+        if lat is None or lon is None:
+            if not name or name not in lookups:
+                raise ValueError("Location needs 'lat' and 'lon' or a 'name' to look up")
+            lat, lon, address_en, address_local = lookups[name].result()
+            return lat, lon, (name, address_en, address_local)
+        lat, lon = float(lat), float(lon)
+        label = location.get('local_name') or name
+        if not label:
+            label = (self.geocoder.reverse(lat, lon) if self.geocoder else None) or f"{lat}, {lon}"
+        return lat, lon, (label, location.get('address') or label, name)
+
+    def _line(self, location, lat, lon, record, cached):
+        report = report_dict(record) if self.mode == 'json' else record.render(self.mode)
+        return json.dumps({'name': location.get('name'), 'lat': lat, 'lon': lon,
+                           'cached': cached, 'report': report}, ensure_ascii=False) + "\n"
+
+    def _error_line(self, location, error):
+        return json.dumps({'error': str(error), 'name': location.get('name'),
+                           'lat': location.get('lat'), 'lon': location.get('lon')},
+                          ensure_ascii=False) + "\n"
+
+
+def main(argv, data_dir, user_agent="weather_app"):
+    """Entry point for `Weather.py --batch [FILE]`; returns the process exit code"""
+    parser = argparse.ArgumentParser(prog="Weather.py",
+                                     description="Fetch weather for many locations and write NDJSON")
+    parser.add_argument('--batch', nargs='?', const='', default='', metavar='FILE',
+                        help="NDJSON, JSON array or weather_locations.json file (default: saved locations)")
+    parser.add_argument('--output', '-o', help="write to this file instead of stdout")
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS)
+    parser.add_argument('--chunk-size', type=int, default=BATCH_CHUNK_SIZE)
+    parser.add_argument('--forecast-days', type=int, default=weather_api.FORECAST_DAYS)
+    parser.add_argument('--mode', choices=('json', 'compact', 'plain'), default='json')
+    parser.add_argument('--no-cache', action='store_true', help="do not read or write the cache database")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="write metrics here when done (Prometheus text for .prom/.txt, JSON otherwise)")
+    args = parser.parse_args(argv)
+    if not args.output and sys.stdout is None:
+        # The windowed build has no console to stream to
+        parser.error("no standard output to write to; pass --output FILE")
+
+    # Logs go to stderr so stdout carries only NDJSON
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr,
+                        format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+
+    if args.batch:
+        locations = iter_locations(args.batch)
+    else:
+        locations = iter(LocationManager(os.path.join(data_dir, CONFIG_FILE)).get_locations())
+
+    cache = None if args.no_cache else WeatherCache(persist_path=os.path.join(data_dir, CACHE_DB_FILE))
+    geocoder = _make_geocoder(data_dir, user_agent)
+    runner = BatchRunner(cache, geocoder, args.workers, args.chunk_size, args.forecast_days, args.mode)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        stats = runner.run(locations, output)
+    except (OSError, ValueError) as e:
+        logger.error(f"Batch failed: {e}")
+        return 1
+    finally:
+        if args.output:
+            output.close()
+        if cache:
+            cache.close()
+        if geocoder and geocoder.cache:
+            geocoder.cache.close()
+
+    logger.warning(f"Batch done: {stats['locations']} locations ({stats['cached']} cached, "
+                   f"{stats['errors']} errors) in {stats['seconds']:.1f}s")
+    if args.metrics:
+        try:
+            weather_metrics.REGISTRY.dump(args.metrics)
+        except OSError as e:
+            logger.error(f"Could not write metrics: {e}")
+    return 0 if not stats['errors'] else 2
+
+
+def _make_geocoder(data_dir, user_agent):
+    """Geocoder for name-only inputs, or None with neither geopy nor an offline gazetteer"""
+    from weather_gazetteer import load_gazetteer
+    gazetteer = load_gazetteer(data_dir)
+    if importlib.util.find_spec("geopy") is None and gazetteer is None:
+        return None
+    from weather_geocode import Geocoder, GeocodeCache, GEOCODE_CACHE_FILE
+    return Geocoder(user_agent, cache=GeocodeCache(persist_path=os.path.join(data_dir, GEOCODE_CACHE_FILE)),
+                    gazetteer=gazetteer)
@@ -3,64 +3,585 @@ Weather Cache Module
 Caches weather data to reduce API calls and improve performance
 """
 
+import heapq
 import logging
+import math
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
+import weather_metrics
+from weather_record import WeatherRecord
+
 logger = logging.getLogger(__name__)
 
 CACHE_DURATION_MINUTES = 15  # Weather data updates every 15 minutes
+CACHE_STALE_MINUTES = 60  # How long an expired entry may still be shown while it refreshes
+CACHE_DB_FILE = "weather_cache.db"
+CACHE_MAX_ENTRIES = 5000
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+SWEEP_INTERVAL_SECONDS = 60
+NEARBY_RADIUS_KM = 1.0  # Default radius for nearby-coordinate cache hits
+GRID_CELL_DEGREES = 0.1  # Spatial index bucket size (~11 km of latitude)
+EARTH_RADIUS_KM = 6371.0
+
+_lookups = weather_metrics.counter("weather_cache_lookups_total", "Weather cache lookups by result", ("result",))
+LOOKUP_HIT = _lookups.labels(result="hit")
+LOOKUP_STALE = _lookups.labels(result="stale")
+LOOKUP_NEARBY = _lookups.labels(result="nearby")
+LOOKUP_MISS = _lookups.labels(result="miss")
+EXPIRIES = weather_metrics.counter("weather_cache_expiries_total", "Weather cache entries dropped after expiring")
+EVICTIONS = weather_metrics.counter("weather_cache_evictions_total", "Weather cache entries evicted for space")
+
+
+def approx_size(obj):
+    """Rough in-memory size of a cache entry (containers walked recursively)"""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__slots__'):
+        shared = getattr(obj, 'SHARED_SLOTS', ())
+        size += sum(approx_size(getattr(obj, slot)) for slot in obj.__slots__ if slot not in shared)
+    elif isinstance(obj, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(approx_size(v) for v in obj)
+    return size
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two coordinates (haversine)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """Grid bucket map from coordinates to cache keys for radius queries
+
+    Each key lives in the GRID_CELL_DEGREES cell containing it. A radius query
+    only visits the cells overlapping the query's bounding box, so its cost
+    depends on local density rather than on the total number of entries.
+    Columns wrap around at the antimeridian, so a box crossing ±180°
+    longitude also visits the cells on the other side (and a box reaching
+    a pole visits every column).
+    """
+
+    def __init__(self, cell_degrees=GRID_CELL_DEGREES):
+        self.cell = cell_degrees
+        self.columns = max(1, round(360 / cell_degrees))
+        self.buckets = {}  # {(row, col): {key: (lat, lon)}}
+
+    def _column(self, col):
+        """Column index wrapped into [-columns/2, columns/2)"""
+        half = self.columns // 2
+        return (col + half) % self.columns - half
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell), self._column(math.floor(lon / self.cell)))
+
+    def add(self, key, lat, lon):
+        self.buckets.setdefault(self._cell(lat, lon), {})[key] = (lat, lon)
+
+    def remove(self, key, lat, lon):
+        cell = self._cell(lat, lon)
+        bucket = self.buckets.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self.buckets[cell]
+
+    def clear(self):
+        self.buckets.clear()
+
+    def within(self, lat, lon, radius_km):
+        """Yield (distance_km, key) for every indexed key within radius_km"""
+        dlat = radius_km / 111.32
+        dlon = radius_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+        row0, row1 = math.floor((lat - dlat) / self.cell), math.floor((lat + dlat) / self.cell)
+        col0, col1 = math.floor((lon - dlon) / self.cell), math.floor((lon + dlon) / self.cell)
+        if abs(lat) + dlat >= 90:
+            col0, col1 = 0, self.columns - 1  # The box reaches a pole: every longitude is close
+        columns = {self._column(col) for col in range(col0, min(col1, col0 + self.columns - 1) + 1)}
+        for row in range(row0, row1 + 1):
+            for col in columns:
+                bucket = self.buckets.get((row, col))
+                if not bucket:
+                    continue
+                for key, (klat, klon) in bucket.items():
+                    distance = distance_km(lat, lon, klat, klon)
+                    if distance <= radius_km:
+                        yield distance, key
+
+
+class PersistentCacheStore:
+    """SQLite backing store so cached weather survives a restart"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._conn = None  # Opened on first use so startup stays cheap
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the database and create the table if needed"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            # Databases from before weather_records kept the raw response plus its report in weather_cache
+            if self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weather_cache'"
+            ).fetchone():
+                self._conn.execute("DROP TABLE weather_cache")
+                logger.info("Dropped the old weather_cache table")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS weather_records ("
+                "key TEXT PRIMARY KEY, record TEXT NOT NULL, timestamp REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS weather_records_timestamp ON weather_records (timestamp)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def load(self, key):
+        """Load one entry, returns None if it is not stored"""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT record FROM weather_records WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache store read failed for {key}: {e}")
+            return None
+
+        if row is None:
+            return None
+        try:
+            return WeatherRecord.from_json(row[0])
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Discarding unreadable cache record for {key}: {e}")
+            return None
+
+    def save(self, key, entry):
+        """Write one entry through to disk"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO weather_records (key, record, timestamp) VALUES (?, ?, ?)",
+                    (key, entry.to_json(), entry.fetched_at)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache store write failed for {key}: {e}")
+
+    def save_many(self, items):
+        """Write several (key, entry) pairs in a single transaction"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO weather_records (key, record, timestamp) VALUES (?, ?, ?)",
+                    [(key, entry.to_json(), entry.fetched_at) for key, entry in items]
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache store batch write failed: {e}")
+
+    def delete(self, key):
+        """Remove one entry"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM weather_records WHERE key = ?", (key,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache store delete failed for {key}: {e}")
+
+    def purge_older_than(self, cutoff):
+        """Drop every entry stored before cutoff, returns the number removed"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                removed = conn.execute(
+                    "DELETE FROM weather_records WHERE timestamp < ?", (cutoff.timestamp(),)
+                ).rowcount
+                conn.commit()
+                return removed
+        except sqlite3.Error as e:
+            logger.warning(f"Cache store purge failed: {e}")
+            return 0
+
+    def count(self):
+        """Number of stored entries"""
+        try:
+            with self._lock:
+                return self._connect().execute("SELECT COUNT(*) FROM weather_records").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Cache store count failed: {e}")
+            return 0
+
+    def clear(self):
+        """Remove every stored entry"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM weather_records")
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache store clear failed: {e}")
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class _Flight:
+    """One outstanding upstream fetch that concurrent callers can wait on"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
 
 
 class WeatherCache:
-    """Caches weather data to reduce API calls and improve performance"""
-    
-    def __init__(self, cache_duration_minutes=15):
-        self.cache = {}  # {location_key: {'data': dict, 'formatted': str, 'timestamp': datetime}}
+    """Caches weather data to reduce API calls and improve performance
+
+    The in-memory tier is an LRU bounded by max_entries and max_bytes. Expired
+    entries are dropped by a periodic sweep that walks an expiry heap, so it
+    only touches entries that actually expired. A grid index over the keys
+    lets get() fall back to the nearest entry within a radius.
+    """
+
+    def __init__(self, cache_duration_minutes=15, persist_path=None, stale_minutes=0,
+                 max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                 sweep_interval=SWEEP_INTERVAL_SECONDS):
+        # {location_key: WeatherRecord}, in LRU order
+        self.cache = OrderedDict()
         self.cache_duration = timedelta(minutes=cache_duration_minutes)
+        # Expired entries are kept this much longer so they can be served while revalidating
+        self.stale_window = timedelta(minutes=stale_minutes)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._lock = threading.RLock()
+        self._sizes = {}  # {location_key: approx bytes}
+        self._bytes = 0
+        self._expiry_heap = []  # [(expires_at, key, timestamp)], may hold superseded records
+        self._coords = {}  # {location_key: (lat, lon)} as rounded in the key
+        self.spatial_index = SpatialIndex()
+        self.nearby_hits = 0
+        self._last_sweep = time.monotonic()
+        self.evictions = 0
+        self.expirations = 0
+        # Optional on-disk tier; entries are pulled in lazily on first lookup
+        self.store = PersistentCacheStore(persist_path) if persist_path else None
+        self._purged = False
+        # Single-flight bookkeeping: {location_key: _Flight}
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.coalesced = 0
         logger.info(f"WeatherCache initialized ({cache_duration_minutes} min duration)")
-    
+
+    def __len__(self):
+        return len(self.cache)
+
+    @property
+    def memory_bytes(self):
+        """Approximate size of the in-memory entries"""
+        return self._bytes
+
     def get_cache_key(self, lat, lon):
         """Generate cache key from coordinates (rounded to 3 decimals ~100m accuracy)"""
         return f"{round(lat, 3)}_{round(lon, 3)}"
-    
-    def get(self, lat, lon):
-        """Get cached weather data if still valid"""
+
+    @property
+    def retention(self):
+        """How long an entry is kept at all: cache duration plus the stale window"""
+        return self.cache_duration + self.stale_window
+
+    def get(self, lat, lon, allow_stale=False, radius_km=0, memory_only=False):
+        """Get cached weather data if still valid
+
+        With allow_stale, an expired entry still inside the stale window is
+        returned too; use is_fresh() to tell the two apart. With radius_km, a
+        miss on the exact key falls back to the nearest usable entry within
+        that distance (in-memory entries only). With memory_only the disk
+        tier is neither read nor written, for callers on an event loop; a
+        miss is then not counted if there is a disk tier, since the caller
+        is expected to retry with a full get() off the loop.
+        """
         key = self.get_cache_key(lat, lon)
-        
-        if key in self.cache:
-            cached = self.cache[key]
-            age = datetime.now() - cached['timestamp']
-            
+        if not memory_only:
+            self._maybe_sweep()
+
+        with self._lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+        if cached is None and self.store and not memory_only:
+            cached = self._load_persisted(key)
+
+        if cached is not None:
+            age = datetime.now() - cached.timestamp
+
             if age < self.cache_duration:
                 logger.info(f"Cache HIT for {key} (age: {int(age.total_seconds())}s)")
+                LOOKUP_HIT.inc()
                 return cached
+            elif age < self.retention:
+                if allow_stale:
+                    logger.info(f"Cache STALE for {key} (age: {int(age.total_seconds())}s)")
+                    LOOKUP_STALE.inc()
+                    return cached
+                logger.info(f"Cache EXPIRED for {key} (age: {int(age.total_seconds())}s, kept as stale)")
             else:
                 logger.info(f"Cache EXPIRED for {key} (age: {int(age.total_seconds())}s)")
-                del self.cache[key]  # Remove expired entry to free memory
-        
+                with self._lock:
+                    self._remove(key)  # Remove expired entry to free memory
+                    self.expirations += 1
+                EXPIRIES.inc()
+                if self.store and not memory_only:
+                    self.store.delete(key)
+
+        if radius_km:
+            nearby = self._get_nearby(key, lat, lon, radius_km, allow_stale)
+            if nearby is not None:
+                LOOKUP_NEARBY.inc()
+                return nearby
+
+        if memory_only and self.store:
+            return None
         logger.info(f"Cache MISS for {key}")
+        LOOKUP_MISS.inc()
         return None
-    
-    def set(self, lat, lon, weather_data, formatted_text):
-        """Cache weather data"""
+
+    def _get_nearby(self, key, lat, lon, radius_km, allow_stale):
+        """Nearest fresh (or, with allow_stale, retained) entry within radius_km of lat, lon"""
+        max_age = (self.retention if allow_stale else self.cache_duration).total_seconds()
+        now = time.time()
+        best = None
+        with self._lock:
+            for distance, other in self.spatial_index.within(lat, lon, radius_km):
+                if other == key or (best is not None and distance >= best[0]):
+                    continue
+                if now - self.cache[other].fetched_at < max_age:
+                    best = (distance, other)
+            if best is None:
+                return None
+            distance, other = best
+            self.cache.move_to_end(other)
+            self.nearby_hits += 1
+            cached = self.cache[other]
+        logger.info(f"Cache NEARBY HIT for {key} -> {other} ({distance:.2f} km)")
+        return cached
+
+    def peek(self, lat, lon):
+        """Return the in-memory entry for a coordinate, fresh or stale, without expiring it
+
+        Never touches the disk tier or the LRU order, so scanning many
+        locations is cheap and does not push recently used entries out.
+        """
+        return self.cache.get(self.get_cache_key(lat, lon))
+
+    def is_fresh(self, entry):
+        """True if a cache entry is younger than the cache duration"""
+        return time.time() - entry.fetched_at < self.cache_duration.total_seconds()
+
+    def _load_persisted(self, key):
+        """Pull an entry that is still usable from the disk tier into memory"""
+        if not self._purged:
+            # First disk access of this session: drop what expired while we were closed
+            self._purged = True
+            removed = self.store.purge_older_than(datetime.now() - self.retention)
+            if removed:
+                logger.info(f"Purged {removed} expired entries from cache store")
+
+        cached = self.store.load(key)
+        if not cached:
+            return None
+
+        if time.time() - cached.fetched_at >= self.retention.total_seconds():
+            self.store.delete(key)
+            return None
+
+        with self._lock:
+            self._insert(key, cached)
+        logger.info(f"Loaded {key} from cache store")
+        return cached
+
+    def _insert(self, key, entry):
+        """Add or replace an entry, then evict least recently used ones over budget (lock held)"""
+        self._remove(key)
+        size = approx_size(key) + approx_size(entry)
+        self.cache[key] = entry
+        self._sizes[key] = size
+        self._bytes += size
+        coords = tuple(float(part) for part in key.split("_"))
+        self._coords[key] = coords
+        self.spatial_index.add(key, *coords)
+
+        stamp = entry.fetched_at
+        heapq.heappush(self._expiry_heap, (stamp + self.retention.total_seconds(), key, stamp))
+
+        while self.cache and (len(self.cache) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self.cache))
+            if oldest == key and len(self.cache) == 1:
+                break  # Never evict the entry just written
+            self._remove(oldest)
+            self.evictions += 1
+            EVICTIONS.inc()
+
+        # Superseded and evicted records pile up in the heap; rebuild it when it doubles
+        if len(self._expiry_heap) > 2 * len(self.cache) + 64:
+            retention = self.retention.total_seconds()
+            self._expiry_heap = [
+                (e.fetched_at + retention, k, e.fetched_at)
+                for k, e in self.cache.items()
+            ]
+            heapq.heapify(self._expiry_heap)
+
+    def _remove(self, key):
+        """Drop an entry and its size accounting (lock held)"""
+        if self.cache.pop(key, None) is not None:
+            self._bytes -= self._sizes.pop(key)
+            self.spatial_index.remove(key, *self._coords.pop(key))
+
+    def _maybe_sweep(self):
+        """Run sweep_expired() if the sweep interval has passed"""
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep_expired()
+
+    def sweep_expired(self):
+        """Drop entries past their retention; cost is O(expired), not O(entries)"""
+        now = time.time()
+        removed = 0
+        with self._lock:
+            self._last_sweep = time.monotonic()
+            heap = self._expiry_heap
+            while heap and heap[0][0] <= now:
+                _, key, stamp = heapq.heappop(heap)
+                entry = self.cache.get(key)
+                # Skip records superseded by a newer write of the same key
+                if entry is not None and entry.fetched_at == stamp:
+                    self._remove(key)
+                    removed += 1
+            self.expirations += removed
+        EXPIRIES.inc(removed)
+
+        if self.store:
+            self.store.purge_older_than(datetime.now() - self.retention)
+        if removed:
+            logger.info(f"Swept {removed} expired cache entries")
+        return removed
+
+    def fetch_once(self, lat, lon, fetch):
+        """Call fetch() unless a fetch for the same key is already running, then share its outcome
+
+        Concurrent misses for one location (startup, background refresh and a
+        click) end up waiting on a single upstream request; they all get its
+        result, or all see its exception.
+        """
         key = self.get_cache_key(lat, lon)
-        self.cache[key] = {
-            'data': weather_data,
-            'formatted': formatted_text,
-            'timestamp': datetime.now()
-        }
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.info(f"Joined in-flight fetch for {key}")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fetch()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def set(self, lat, lon, record):
+        """Cache a WeatherRecord"""
+        key = self.get_cache_key(lat, lon)
+        with self._lock:
+            self._insert(key, record)
+        if self.store:
+            self.store.save(key, record)
         logger.info(f"Cached weather for {key} (total cached: {len(self.cache)})")
-    
+        self._maybe_sweep()
+
+    def set_many(self, items):
+        """Cache several (lat, lon, record) tuples in one pass"""
+        written = []
+        with self._lock:
+            for lat, lon, record in items:
+                key = self.get_cache_key(lat, lon)
+                self._insert(key, record)
+                written.append((key, record))
+        if self.store and written:
+            self.store.save_many(written)
+        logger.info(f"Cached weather for {len(written)} locations (total cached: {len(self.cache)})")
+        self._maybe_sweep()
+
     def clear(self):
         """Clear all cached data"""
-        count = len(self.cache)
-        self.cache.clear()
+        with self._lock:
+            count = len(self.cache)
+            self.cache.clear()
+            self._sizes.clear()
+            self._coords.clear()
+            self.spatial_index.clear()
+            self._bytes = 0
+            self._expiry_heap = []
+        if self.store:
+            self.store.clear()
         logger.info(f"Cleared {count} cache entries")
         return count
-    
+
+    def close(self):
+        """Release the disk tier"""
+        if self.store:
+            self.store.close()
+
+    def summary(self):
+        """(entries, memory_bytes) for a status line; cheap enough to call after every lookup"""
+        with self._lock:
+            return len(self.cache), self._bytes
+
     def get_stats(self):
-        """Get cache statistics"""
-        return {
-            'entries': len(self.cache),
-            'keys': list(self.cache.keys())
-        }
+        """Get cache statistics (lists every key and counts the disk tier; for diagnostics)"""
+        with self._lock:
+            stats = {
+                'entries': len(self.cache),
+                'keys': list(self.cache.keys()),
+                'memory_bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'nearby_hits': self.nearby_hits,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._flights)
+            }
+        if self.store:
+            stats['persisted'] = self.store.count()
+        return stats
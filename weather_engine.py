@@ -0,0 +1,172 @@
+"""
+Fetch Engine Module
+Runs weather and geocoding jobs on one background asyncio loop
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST_CONCURRENCY = 4
+# Max simultaneous blocking calls per upstream host
+HOST_CONCURRENCY = {
+    "api.open-meteo.com": 4,
+    "nominatim.openstreetmap.org": 1,  # Nominatim usage policy: no parallel requests
+}
+EXECUTOR_WORKERS = 8
+
+
+class FetchEngine:
+    """Background asyncio loop where a new job cancels the in-flight job it replaces
+
+    Jobs are coroutine functions submitted under a slot name (e.g. "display"). Submitting
+    to a slot cancels whatever is still running there, so a burst of clicks only
+    finishes the last one. Blocking network calls go through run_blocking(),
+    which bounds concurrency per host and runs them on a small thread pool.
+    """
+
+    def __init__(self, host_concurrency=None, executor_workers=EXECUTOR_WORKERS):
+        self.host_concurrency = dict(HOST_CONCURRENCY if host_concurrency is None else host_concurrency)
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=executor_workers,
+                                           thread_name_prefix="fetch-engine")
+        self.thread = threading.Thread(target=self._run_loop, daemon=True, name="fetch-engine")
+        self._host_semaphores = {}
+        self._slots = {}  # {slot: concurrent.futures.Future}
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.stats = {
+            'submitted': 0,     # jobs handed to the engine
+            'superseded': 0,    # jobs cancelled by a newer job in the same slot
+            'completed': 0,     # jobs that ran to the end
+            'failed': 0,        # jobs that raised
+            'calls': 0,         # blocking calls started (i.e. upstream requests)
+            'calls_running': 0, # blocking calls not yet returned
+            'wasted_calls': 0,  # blocking calls whose result was thrown away
+        }
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        """Start the background loop thread"""
+        if not self.thread.is_alive():
+            self.thread.start()
+            logger.info("FetchEngine started")
+        return self
+
+    def stop(self):
+        """Cancel outstanding jobs and stop the loop"""
+        with self._lock:
+            self._stopped = True
+            for future in self._slots.values():
+                future.cancel()
+            self._slots.clear()
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("FetchEngine stopped")
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self.stats[key] += delta
+
+    def submit(self, slot, job, *args, on_error=None):
+        """Schedule job(*args) under slot, cancelling the job it replaces
+
+        on_error(exception) is called from the engine thread if the job fails.
+        Returns a concurrent.futures.Future for the job. Raises RuntimeError
+        once the engine has been stopped.
+        """
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("FetchEngine is stopped")
+            future = asyncio.run_coroutine_threadsafe(self._guard(job, args, on_error), self.loop)
+            self.stats['submitted'] += 1
+            previous = self._slots.get(slot)
+            self._slots[slot] = future
+        if previous is not None and previous.cancel():
+            self._count('superseded')
+            logger.info(f"Cancelled superseded '{slot}' job")
+        future.add_done_callback(lambda f: self._release_slot(slot, f))
+        return future
+
+    def is_pending(self, slot):
+        """True while a job submitted under slot has not finished"""
+        with self._lock:
+            return slot in self._slots
+
+    def _release_slot(self, slot, future):
+        with self._lock:
+            if self._slots.get(slot) is future:
+                del self._slots[slot]
+
+    async def _guard(self, job, args, on_error):
+        """Run a job, keeping cancellation quiet and routing errors to on_error"""
+        try:
+            result = await job(*args)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._count('failed')
+            logger.error(f"Fetch job failed: {e}")
+            if on_error:
+                on_error(e)
+            return None
+        self._count('completed')
+        return result
+
+    def _host_semaphore(self, host):
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            limit = self.host_concurrency.get(host, DEFAULT_HOST_CONCURRENCY)
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def run_blocking(self, host, func, *args):
+        """Await func(*args) on the executor, at most host_concurrency[host] at a time
+
+        A job cancelled while waiting for its host slot never sends its request.
+        One cancelled mid-request lets the call finish in the background and
+        drops the result.
+        """
+        async with self._host_semaphore(host):
+            self._count('calls')
+            self._count('calls_running')
+            call = self.loop.run_in_executor(self.executor, func, *args)
+            try:
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                self._count('wasted_calls')
+                # Keep the host slot until the abandoned request actually finishes
+                try:
+                    await call
+                except Exception:
+                    pass
+                raise
+            finally:
+                self._count('calls_running', -1)
+
+    async def map_blocking(self, host, func, items):
+        """run_blocking(host, func, item) for every item at once; results (or exceptions) in order"""
+        return await asyncio.gather(*(self.run_blocking(host, func, item) for item in items),
+                                    return_exceptions=True)
+
+    def get_stats(self):
+        """Job and request counters"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self._slots)
+        return stats
+
+
+def wait_result(future, timeout=None):
+    """Block on a submitted job, returning None if it was superseded"""
+    try:
+        return future.result(timeout)
+    except CancelledError:
+        return None
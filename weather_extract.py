@@ -0,0 +1,154 @@
+"""
+Extract Module
+Streams zip members straight to their install path, decompressing large members in parallel
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_WORKERS = min(4, os.cpu_count() or 1)
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024  # Members this large are decompressed on worker threads (zlib releases the GIL)
+COPY_BUFFER_BYTES = 1024 * 1024
+
+
+def member_path(dest_dir, name):
+    """Where a member goes under dest_dir; refuses absolute paths and '..' (zip slip)"""
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if not parts or ".." in parts or ":" in parts[0] or name.startswith(("/", "\\")):
+        raise ValueError(f"Unsafe path in zip: {name!r}")
+    return os.path.join(dest_dir, *parts)
+
+
+class _Progress:
+    def __init__(self, total, callback):
+        self.total = total
+        self.done = 0
+        self.callback = callback
+        self._lock = threading.Lock()
+
+    def advance(self, count):
+        with self._lock:
+            self.done += count
+            done = self.done
+        if self.callback:
+            self.callback(done, self.total)
+
+
+def extract_zip(zip_path, dest_dir, strip_prefix=None, workers=EXTRACT_WORKERS, progress_callback=None,
+                replace=False, parallel_min_bytes=PARALLEL_MIN_BYTES):
+    """Extract zip_path into dest_dir, writing every file once, at its final path
+
+    With strip_prefix (e.g. "Weather/") only members under it are extracted,
+    with the prefix removed. Existing files are overwritten in place (much
+    cheaper than deleting and recreating thousands of them); with replace,
+    whatever else is left in the top-level folders the archive brings is
+    removed afterwards, so files the new version dropped do not linger. Members of parallel_min_bytes and up are decompressed on
+    `workers` threads while the small ones are written in between.
+    progress_callback(bytes done, bytes total) may be called from any thread.
+    """
+    start = time.perf_counter()
+    dest_dir = str(dest_dir)
+    handles = []  # ZipFile per worker thread; reading one from several threads would serialize on its lock
+    local = threading.local()
+
+    def worker_archive():
+        archive = getattr(local, 'archive', None)
+        if archive is None:
+            archive = local.archive = zipfile.ZipFile(zip_path)
+            handles.append(archive)
+        return archive
+
+    with zipfile.ZipFile(zip_path) as archive:
+        members = []
+        for info in archive.infolist():
+            name = info.filename
+            if strip_prefix:
+                if not name.startswith(strip_prefix):
+                    continue
+                name = name[len(strip_prefix):]
+            if name.strip("/"):
+                members.append((info, member_path(dest_dir, name)))
+
+        # Folders first, so threads never race to create them
+        folders = {target if info.is_dir() else os.path.dirname(target) for info, target in members}
+        for folder in sorted(folders):
+            if os.path.isfile(folder) or os.path.islink(folder):
+                os.remove(folder)  # A file in the old version, a folder in this one
+            os.makedirs(folder, exist_ok=True)
+
+        files = [(info, target) for info, target in members if not info.is_dir()]
+        for _, target in files:
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target)
+        progress = _Progress(sum(info.file_size for info, _ in files), progress_callback)
+        threshold = parallel_min_bytes if workers > 1 else float('inf')
+        large = [member for member in files if member[0].file_size >= threshold]
+        small = [member for member in files if member[0].file_size < threshold]
+        try:
+            if large:
+                with ThreadPoolExecutor(max_workers=min(workers, len(large)), thread_name_prefix="extract") as pool:
+                    futures = [pool.submit(lambda member: _write(worker_archive(), *member, progress), member)
+                               for member in sorted(large, key=lambda member: -member[0].file_size)]
+                    for info, target in small:
+                        _write(archive, info, target, progress)
+                    for future in futures:
+                        future.result()
+            else:
+                for info, target in small:
+                    _write(archive, info, target, progress)
+        finally:
+            for handle in handles:
+                handle.close()
+
+    if replace:
+        _prune(dest_dir, folders, {target for _, target in files})
+
+    stats = {'files': len(files), 'bytes': progress.total, 'parallel_files': len(large),
+             'seconds': round(time.perf_counter() - start, 3)}
+    logger.info(f"Extracted {zip_path}: {stats}")
+    return stats
+
+
+def _path_key(path):
+    """Path as the filesystem compares it (case-insensitive on Windows)"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def _prune(dest_dir, folders, files):
+    """Remove what the archive did not bring from the top-level folders it did bring"""
+    dest_key = _path_key(dest_dir)
+    folders = {_path_key(folder) for folder in folders}
+    files = {_path_key(path) for path in files}
+    tops = {os.path.join(dest_dir, os.path.relpath(folder, dest_key).split(os.sep)[0])
+            for folder in folders if folder != dest_key}
+    for top in tops:
+        for root, dirs, names in os.walk(top, topdown=False):
+            for name in names:
+                path = os.path.join(root, name)
+                if _path_key(path) not in files:
+                    os.remove(path)
+            for name in dirs:
+                path = os.path.join(root, name)
+                if _path_key(path) not in folders:
+                    if os.path.islink(path):
+                        os.remove(path)
+                    else:
+                        os.rmdir(path)
+
+
+def _write(archive, info, target, progress):
+    """Stream one member to its path (the CRC is checked as the last block is read)"""
+    with archive.open(info) as source, open(target, 'wb') as f:
+        while True:
+            block = source.read(COPY_BUFFER_BYTES)
+            if not block:
+                break
+            f.write(block)
+            progress.advance(len(block))
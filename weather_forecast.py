@@ -0,0 +1,225 @@
+"""
+Weather Forecast Module
+Daily aggregation and rain detection over the hourly forecast of many locations at once
+"""
+
+import logging
+import math
+import warnings
+from array import array
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_DAY = 24
+RAIN_THRESHOLD_MM = 0.1  # Hourly precipitation that counts as rain
+SUMMARY_FIELDS = 4       # min, max, mean temperature and precipitation sum per day
+NO_CODE = 255            # Stands in for a missing daily weather code
+
+NAN = float('nan')
+
+# numpy is optional (the frozen build excludes it, so there is a pure-Python path) and slow
+# to import, so it is loaded on the first aggregation rather than at application start
+np = None
+_numpy_checked = False
+
+
+def load_numpy():
+    """Import numpy on first use; returns the module, or None if it is not installed"""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+        _numpy_checked = True
+    return np
+
+
+class HourlyBatch:
+    """Hourly series of many locations as (locations x hours) arrays
+
+    With numpy the series are float64 matrices with NaN for missing values;
+    without it they are lists of float lists with the same layout. Rows are
+    padded with NaN to the longest series.
+    """
+
+    def __init__(self, responses, use_numpy=None):
+        available = load_numpy() is not None
+        self.use_numpy = available if use_numpy is None else use_numpy
+        hourly = [data.get('hourly') or {} for data in responses]
+        self.start_times = [_start_time(series) for series in hourly]
+        self.hours = max((len(series.get('time', ())) for series in hourly), default=0)
+        self.temperature = self._matrix(hourly, 'temperature_2m')
+        self.precipitation = self._matrix(hourly, 'precipitation')
+        # Hour offset of "now" per location, so rain that already fell is not reported
+        self.now_index = [_hour_offset(start, (data.get('current') or {}).get('time'))
+                          for start, data in zip(self.start_times, responses)]
+        self.daily_codes = [(data.get('daily') or {}).get('weather_code') or [] for data in responses]
+
+    def _matrix(self, hourly, field):
+        if self.use_numpy:
+            matrix = np.full((len(hourly), self.hours), np.nan)
+            for row, series in enumerate(hourly):
+                values = series.get(field)
+                if values:
+                    # dtype=float turns None (missing hours) into NaN
+                    matrix[row, :len(values)] = np.asarray(values, dtype=float)
+            return matrix
+        rows = []
+        for series in hourly:
+            values = [NAN if v is None else float(v) for v in series.get(field) or ()]
+            values.extend([NAN] * (self.hours - len(values)))
+            rows.append(values)
+        return rows
+
+    def __len__(self):
+        return len(self.start_times)
+
+
+def aggregate(batch, threshold=RAIN_THRESHOLD_MM):
+    """Per-day min, max, mean temperature and precipitation sum, plus the next rainy hour
+
+    Returns a dict with 'min', 'max', 'mean' and 'precipitation' as
+    (locations x days) arrays and 'next_rain' as the hour offset of the
+    first hour from now with at least threshold mm (-1 if none).
+    """
+    if batch.use_numpy:
+        return _aggregate_numpy(batch, threshold)
+    return _aggregate_python(batch, threshold)
+
+
+def _aggregate_numpy(batch, threshold):
+    temperature = batch.temperature
+    precipitation = batch.precipitation
+    locations, hours = temperature.shape
+    days = hours // HOURS_PER_DAY
+    span = days * HOURS_PER_DAY
+
+    temp_days = temperature[:, :span].reshape(locations, days, HOURS_PER_DAY)
+    rain_days = precipitation[:, :span].reshape(locations, days, HOURS_PER_DAY)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Days with no data at all stay NaN
+        daily_min = np.nanmin(temp_days, axis=2)
+        daily_max = np.nanmax(temp_days, axis=2)
+        daily_mean = np.nanmean(temp_days, axis=2)
+    daily_rain = np.nansum(rain_days, axis=2)
+    daily_rain[np.isnan(rain_days).all(axis=2)] = np.nan
+
+    # NaN compares False, so missing hours never count as rain
+    now = np.asarray(batch.now_index)[:, None]
+    wet = (precipitation >= threshold) & (np.arange(hours)[None, :] >= now)
+    next_rain = np.where(wet.any(axis=1), wet.argmax(axis=1), -1)
+
+    return {'min': daily_min, 'max': daily_max, 'mean': daily_mean,
+            'precipitation': daily_rain, 'next_rain': next_rain}
+
+
+def _aggregate_python(batch, threshold):
+    days = batch.hours // HOURS_PER_DAY
+    result = {'min': [], 'max': [], 'mean': [], 'precipitation': [], 'next_rain': []}
+    for temperature, precipitation, now in zip(batch.temperature, batch.precipitation, batch.now_index):
+        daily_min, daily_max, daily_mean, daily_rain = [], [], [], []
+        for day in range(days):
+            start = day * HOURS_PER_DAY
+            temps = [t for t in temperature[start:start + HOURS_PER_DAY] if t == t]
+            rain = [p for p in precipitation[start:start + HOURS_PER_DAY] if p == p]
+            daily_min.append(min(temps) if temps else NAN)
+            daily_max.append(max(temps) if temps else NAN)
+            daily_mean.append(sum(temps) / len(temps) if temps else NAN)
+            daily_rain.append(sum(rain) if rain else NAN)
+        result['min'].append(daily_min)
+        result['max'].append(daily_max)
+        result['mean'].append(daily_mean)
+        result['precipitation'].append(daily_rain)
+
+        next_rain = -1
+        for hour in range(max(now, 0), len(precipitation)):
+            if precipitation[hour] >= threshold:
+                next_rain = hour
+                break
+        result['next_rain'].append(next_rain)
+    return result
+
+
+class ForecastSummary:
+    """Daily forecast of one location, array-backed to stay small in the cache"""
+
+    __slots__ = ('start_date', 'values', 'codes', 'next_rain')
+
+    def __init__(self, start_date, values, codes=(), next_rain=None):
+        self.start_date = start_date  # 'YYYY-MM-DD' of the first day
+        self.values = values if isinstance(values, array) else array('f', values)  # SUMMARY_FIELDS per day
+        self.codes = bytes(codes)  # Daily weather codes (all below 100), NO_CODE if missing
+        self.next_rain = next_rain  # 'YYYY-MM-DDTHH:MM' of the next rainy hour, or None
+
+    def days(self):
+        """Yield (date, min, max, mean, precipitation, weather_code) per day"""
+        first = datetime.strptime(self.start_date, "%Y-%m-%d")
+        values = self.values
+        for day in range(len(values) // SUMMARY_FIELDS):
+            low, high, mean, rain = values[day * SUMMARY_FIELDS:(day + 1) * SUMMARY_FIELDS]
+            code = self.codes[day] if day < len(self.codes) else NO_CODE
+            code = None if code == NO_CODE else code
+            yield first + timedelta(days=day), low, high, mean, rain, code
+
+    def to_list(self):
+        return [self.start_date, list(self.values), list(self.codes), self.next_rain]
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+
+def summarize(responses, threshold=RAIN_THRESHOLD_MM, use_numpy=None):
+    """ForecastSummary per response (None where it has no hourly data), aggregated in one pass"""
+    responses = list(responses)
+    batch = HourlyBatch(responses, use_numpy)
+    if not batch.hours:
+        return [None] * len(responses)
+    daily = aggregate(batch, threshold)
+    columns = (daily['min'], daily['max'], daily['mean'], daily['precipitation'])
+    if batch.use_numpy:
+        # (locations x days x SUMMARY_FIELDS) float32, one contiguous row per location
+        packed = np.ascontiguousarray(np.stack(columns, axis=2), dtype=np.float32)
+
+    summaries = []
+    for row, start in enumerate(batch.start_times):
+        if start is None:
+            summaries.append(None)
+            continue
+        values = array('f')
+        if batch.use_numpy:
+            values.frombytes(packed[row].tobytes())
+        else:
+            for day_values in zip(*(column[row] for column in columns)):
+                values.extend(day_values)
+        offset = int(daily['next_rain'][row])
+        next_rain = (start + timedelta(hours=offset)).strftime("%Y-%m-%dT%H:%M") if offset >= 0 else None
+        codes = [code if isinstance(code, int) and 0 <= code < NO_CODE else NO_CODE
+                 for code in batch.daily_codes[row]]
+        summaries.append(ForecastSummary(start.strftime("%Y-%m-%d"), values, codes, next_rain))
+    return summaries
+
+
+def _start_time(series):
+    times = series.get('time')
+    if not times:
+        return None
+    try:
+        return datetime.fromisoformat(times[0])
+    except ValueError:
+        logger.warning(f"Unexpected hourly time format: {times[0]}")
+        return None
+
+
+def _hour_offset(start, current_time):
+    """Whole hours from the first forecast hour to current_time (0 if unknown)"""
+    if start is None or not current_time:
+        return 0
+    try:
+        delta = datetime.fromisoformat(current_time) - start
+    except ValueError:
+        return 0
+    return max(0, math.floor(delta.total_seconds() / 3600))
@@ -0,0 +1,300 @@
+"""
+Gazetteer Module
+Offline forward and reverse geocoding from a GeoNames-style place file, through a memory-mapped index
+"""
+
+import heapq
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_SOURCE_FILE = "gazetteer.txt"  # GeoNames dump (e.g. cities500.txt) or name/alt names/country/lat/lon TSV
+GAZETTEER_COUNTRIES_FILE = "countryInfo.txt"  # Optional GeoNames country names, so "Paris, France" matches
+GAZETTEER_INDEX_FILE = "gazetteer.idx"
+REVERSE_MAX_KM = 25.0  # Farther than this from any place, a coordinate has no offline name
+EARTH_RADIUS_KM = 6371.0
+
+INDEX_MAGIC = b"WGAZ"
+INDEX_VERSION = 1
+# magic, version, place count, key count, then offsets of: places, strings, keys, key text, kd-tree
+HEADER = struct.Struct("<4sHIIIIIII")
+PLACE = struct.Struct("<ddIIH")  # lat, lon, population, offset and length of "name\tcc\tcountry"
+KEY = struct.Struct("<IHI")  # offset and length of the folded name in key text, place number
+KD_NODE = struct.Struct("<fffI")  # unit-sphere x, y, z and place number, in implicit kd-tree order
+
+
+_COMBINING_MARKS = dict.fromkeys(range(0x0300, 0x0370))  # Accents left separate by NFKD
+_COMBINING_MARKS[ord("-")] = " "
+
+
+def name_key(text):
+    """Folded form names are indexed and looked up by: no case, accents, hyphens or extra spaces"""
+    if text.isascii():
+        folded = text.lower().replace("-", " ")
+    else:
+        folded = unicodedata.normalize('NFKD', text).translate(_COMBINING_MARKS).casefold()
+    return " ".join(folded.split())
+
+
+def _unit(lat, lon):
+    """Point on the unit sphere; straight-line nearest there is great-circle nearest"""
+    phi, lam = math.radians(lat), math.radians(lon)
+    return math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)
+
+
+def _chord_to_km(chord_squared):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord_squared) / 2))
+
+
+def _read_countries(path):
+    """{country code: name} from a GeoNames countryInfo.txt"""
+    names = {}
+    if not path or not os.path.exists(path):
+        return names
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) > 4:
+                names[columns[0]] = columns[4]
+    return names
+
+
+def _read_places(path, countries):
+    """Yield (names, lat, lon, population, country code, country name) per row
+
+    GeoNames dumps have 19 tab-separated columns (name, ascii name and
+    comma-separated alternate names in columns 2-4, lat/lon in 5-6, country
+    code in 9, population in 15). Anything shorter is read as
+    name, alternate names, country, lat, lon[, population].
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip() or line.startswith('#'):
+                continue
+            columns = line.rstrip("\n").split("\t")
+            try:
+                if len(columns) >= 15:
+                    names = [columns[1], columns[2]] + columns[3].split(",")
+                    lat, lon = float(columns[4]), float(columns[5])
+                    code = columns[8]
+                    population = int(columns[14] or 0)
+                    country = countries.get(code, code)
+                else:
+                    names = [columns[0]] + columns[1].split(",")
+                    country = code = columns[2]
+                    lat, lon = float(columns[3]), float(columns[4])
+                    population = int(columns[5]) if len(columns) > 5 and columns[5] else 0
+            except (IndexError, ValueError) as e:
+                logger.warning(f"Skipping line {line_number} of {path}: {e}")
+                continue
+            yield names, lat, lon, population, code, country
+
+
+def build_index(source_path, index_path, countries_path=None):
+    """Write the index for a place file (atomically) and return the number of places"""
+    start = time.perf_counter()
+    countries = _read_countries(countries_path)
+    places = []  # (lat, lon, population, text)
+    keys = {}  # {folded name: [place numbers]}
+    for names, lat, lon, population, code, country in _read_places(source_path, countries):
+        number = len(places)
+        places.append((lat, lon, min(population, 0xFFFFFFFF), f"{names[0]}\t{code}\t{country}"))
+        for key in {name_key(name) for name in names if name.strip()}:
+            keys.setdefault(key, []).append(number)
+
+    strings = bytearray()
+    place_table = bytearray()
+    for lat, lon, population, text in places:
+        encoded = text.encode('utf-8')[:0xFFFF]
+        place_table += PLACE.pack(lat, lon, population, len(strings), len(encoded))
+        strings += encoded
+
+    # Keys sorted by their UTF-8 bytes (what the lookup compares), most populous place first
+    key_text = bytearray()
+    key_table = bytearray()
+    key_count = 0
+    for encoded, numbers in sorted((key.encode('utf-8')[:0xFFFF], numbers) for key, numbers in keys.items()):
+        offset = len(key_text)
+        key_text += encoded
+        for number in sorted(numbers, key=lambda n: -places[n][2]):
+            key_table += KEY.pack(offset, len(encoded), number)
+            key_count += 1
+
+    # Implicit kd-tree: the node of range [lo, hi) sits at its middle, split on axis depth % 3
+    points = [(*_unit(lat, lon), number) for number, (lat, lon, _, _) in enumerate(places)]
+    stack = [(0, len(points), 0)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        if hi - lo <= 1:
+            continue
+        axis = depth % 3
+        points[lo:hi] = sorted(points[lo:hi], key=lambda point: point[axis])
+        mid = (lo + hi) // 2
+        stack.append((lo, mid, depth + 1))
+        stack.append((mid + 1, hi, depth + 1))
+    kd_table = b"".join(KD_NODE.pack(*point) for point in points)
+
+    places_offset = HEADER.size
+    strings_offset = places_offset + len(place_table)
+    keys_offset = strings_offset + len(strings)
+    key_text_offset = keys_offset + len(key_table)
+    kd_offset = key_text_offset + len(key_text)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(places), key_count, places_offset,
+                            strings_offset, keys_offset, key_text_offset, kd_offset))
+        for block in (place_table, strings, key_table, key_text, kd_table):
+            f.write(block)
+    os.replace(tmp_path, index_path)
+    logger.info(f"Built gazetteer index of {len(places)} places and {key_count} names "
+                f"in {time.perf_counter() - start:.1f}s")
+    return len(places)
+
+
+class Gazetteer:
+    """Read-only view of a gazetteer index through mmap
+
+    Nothing is loaded up front: name lookups binary-search the sorted key
+    table and nearest-place lookups walk the kd-tree, both directly in the
+    mapped file, so opening is instant and memory is the pages touched.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        with open(index_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.place_count, self.key_count, self._places, self._strings,
+         self._keys, self._key_text, self._kd) = HEADER.unpack_from(self._map, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._map.close()
+            raise ValueError(f"{index_path} is not a version {INDEX_VERSION} gazetteer index")
+        self.lookups = 0
+        self.hits = 0
+
+    def __len__(self):
+        return self.place_count
+
+    def close(self):
+        self._map.close()
+
+    def place(self, number):
+        """Place as a dict: name, country_code, country, lat, lon, population"""
+        lat, lon, population, offset, length = PLACE.unpack_from(self._map, self._places + number * PLACE.size)
+        start = self._strings + offset
+        name, code, country = self._map[start:start + length].decode('utf-8').split("\t")
+        return {'name': name, 'country_code': code, 'country': country, 'lat': lat, 'lon': lon,
+                'population': population}
+
+    def _key(self, index):
+        offset, length, number = KEY.unpack_from(self._map, self._keys + index * KEY.size)
+        start = self._key_text + offset
+        return self._map[start:start + length], number
+
+    def search(self, name):
+        """Numbers of the places called name (any spelling the file lists), most populous first"""
+        target = name_key(name).encode('utf-8')
+        lo, hi = 0, self.key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        numbers = []
+        while lo < self.key_count:
+            key, number = self._key(lo)
+            if key != target:
+                break
+            numbers.append(number)
+            lo += 1
+        return numbers
+
+    def lookup(self, query):
+        """(lat, lon, address_en, address_local) like Geocoder.lookup, or None if not found offline
+
+        "Name, Country" only matches places in that country (by name or code);
+        without a country the most populous place of that name wins.
+        """
+        self.lookups += 1
+        name, _, qualifier = query.partition(",")
+        qualifier = name_key(qualifier)
+        for number in self.search(name):
+            place = self.place(number)
+            if qualifier and qualifier not in (name_key(place['country']), name_key(place['country_code'])):
+                continue
+            self.hits += 1
+            address = f"{place['name']}, {place['country']}"
+            return place['lat'], place['lon'], address, address
+        return None
+
+    def nearest(self, lat, lon, k=1, max_km=None):
+        """[(distance km, place dict)] of the k places closest to a coordinate, nearest first"""
+        if not self.place_count:
+            return []
+        target = _unit(lat, lon)
+        best = []  # Max-heap on distance: (-chord squared, place number)
+        stack = [(0, self.place_count, 0, 0.0)]  # (lo, hi, depth, squared distance to its splitting plane)
+        while stack:
+            lo, hi, depth, plane = stack.pop()
+            if lo >= hi or (len(best) == k and plane >= -best[0][0]):
+                continue
+            mid = (lo + hi) // 2
+            x, y, z, number = KD_NODE.unpack_from(self._map, self._kd + mid * KD_NODE.size)
+            squared = (target[0] - x) ** 2 + (target[1] - y) ** 2 + (target[2] - z) ** 2
+            if len(best) < k:
+                heapq.heappush(best, (-squared, number))
+            elif squared < -best[0][0]:
+                heapq.heapreplace(best, (-squared, number))
+            diff = target[depth % 3] - (x, y, z)[depth % 3]
+            below, above = (lo, mid), (mid + 1, hi)
+            near, far = (below, above) if diff < 0 else (above, below)
+            stack.append((*far, depth + 1, diff * diff))  # Popped after the near side has tightened best
+            stack.append((*near, depth + 1, 0.0))
+        results = []
+        for negative, number in sorted(best, reverse=True):
+            km = _chord_to_km(-negative)
+            if max_km is None or km <= max_km:
+                results.append((km, self.place(number)))
+        return results
+
+    def reverse(self, lat, lon, max_km=REVERSE_MAX_KM):
+        """"Name, Country" of the nearest place within max_km, or None"""
+        found = self.nearest(lat, lon, 1, max_km)
+        if not found:
+            return None
+        place = found[0][1]
+        return f"{place['name']}, {place['country']}"
+
+    def get_stats(self):
+        return {'places': self.place_count, 'names': self.key_count, 'index_bytes': len(self._map),
+                'lookups': self.lookups, 'hits': self.hits}
+
+
+def load_gazetteer(data_dir, build=True):
+    """Open the gazetteer in data_dir, (re)building its index from the place file first if needed
+
+    Returns None when there is no place file or index, or it cannot be read.
+    """
+    source = os.path.join(data_dir, GAZETTEER_SOURCE_FILE)
+    index = os.path.join(data_dir, GAZETTEER_INDEX_FILE)
+    try:
+        stale = os.path.exists(source) and (not os.path.exists(index)
+                                            or os.path.getmtime(index) < os.path.getmtime(source))
+        if stale and build:
+            build_index(source, index, os.path.join(data_dir, GAZETTEER_COUNTRIES_FILE))
+        if not os.path.exists(index):
+            return None
+        gazetteer = Gazetteer(index)
+        logger.info(f"Offline gazetteer: {len(gazetteer)} places")
+        return gazetteer
+    except (OSError, ValueError) as e:
+        logger.error(f"Gazetteer not available: {e}")
+        return None
@@ -0,0 +1,503 @@
+"""
+Geocoding Module
+Resolves city names to coordinates with a persistent lookup cache and a rate-limited request queue
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, as_completed
+
+import weather_metrics
+from weather_ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+NOMINATIM_HOST = "nominatim.openstreetmap.org"
+GEOCODE_CACHE_FILE = "geocode_cache.json"
+GEOCODE_CACHE_DAYS = 30  # Place coordinates practically never change
+GEOCODE_CACHE_MAX_ENTRIES = 2000
+GEOCODE_FLUSH_SECONDS = 5.0  # New entries are written to disk at most this long after they were added
+NOMINATIM_RATE = 1.0  # Requests per second allowed by the Nominatim usage policy
+RATE_LIMIT_RETRIES = 2  # Retries of a request answered with HTTP 429
+RATE_LIMIT_BACKOFF_SECONDS = 5.0  # Pause after a 429 without a Retry-After header
+PRIORITY_INTERACTIVE = 0  # A user waiting on the result
+PRIORITY_BULK = 10  # Imports and batch runs
+QUEUE_WAIT_BUCKETS = (0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Shared by every Geocoder talking to the real Nominatim, so the whole process stays under the limit
+NOMINATIM_LIMITER = TokenBucket(NOMINATIM_RATE)
+
+_lookups = weather_metrics.counter("weather_geocode_cache_lookups_total", "Geocode cache lookups by result",
+                                   ("result",))
+LOOKUP_HIT = _lookups.labels(result="hit")
+LOOKUP_MISS = _lookups.labels(result="miss")
+GEOCODE_SECONDS = weather_metrics.histogram("weather_geocode_seconds", "Time to resolve a name through Nominatim")
+QUEUE_WAIT_SECONDS = weather_metrics.histogram("weather_geocode_queue_wait_seconds",
+                                               "Time a lookup waited in the geocoding queue", ("priority",),
+                                               buckets=QUEUE_WAIT_BUCKETS)
+RATE_LIMITED = weather_metrics.counter("weather_geocode_rate_limited_total",
+                                       "Nominatim requests answered with HTTP 429")
+_offline = weather_metrics.counter("weather_geocode_offline_lookups_total",
+                                   "Lookups in the offline gazetteer by result", ("result",))
+OFFLINE_HIT = _offline.labels(result="hit")
+OFFLINE_MISS = _offline.labels(result="miss")
+
+
+def normalize_query(query):
+    """Normalize a location query so trivially different spellings share a key"""
+    parts = [" ".join(part.split()) for part in query.casefold().split(",")]
+    return ", ".join(part for part in parts if part)
+
+
+class GeocodeCache:
+    """LRU cache of query -> (lat, lon, address_en, address_local), persisted to JSON
+
+    set() only marks the cache dirty; the file is rewritten by a timer
+    flush_seconds later (one write for a whole burst of lookups) and by
+    flush()/close(), outside the lock so lookups never wait on the disk.
+    """
+
+    def __init__(self, ttl_days=GEOCODE_CACHE_DAYS, max_entries=GEOCODE_CACHE_MAX_ENTRIES,
+                 persist_path=None, flush_seconds=GEOCODE_FLUSH_SECONDS):
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.flush_seconds = flush_seconds
+        self.entries = OrderedDict()  # {query: {'result': [lat, lon, en, local], 'timestamp': float}}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saves = 0
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # One writer of the file at a time
+        self._load()
+
+    def _load(self):
+        """Load persisted entries, skipping anything past its TTL"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            cutoff = time.time() - self.ttl_seconds
+            for query, entry in data.get('entries', []):
+                if entry['timestamp'] >= cutoff:
+                    self.entries[query] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            logger.info(f"Loaded {len(self.entries)} geocode cache entries")
+        except Exception as e:
+            logger.error(f"Error loading geocode cache: {e}")
+
+    def _save(self, entries):
+        """Atomically write entries (in LRU order) to disk"""
+        try:
+            tmp_path = self.persist_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'entries': entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+            self.saves += 1
+        except Exception as e:
+            logger.error(f"Error saving geocode cache: {e}")
+
+    def _mark_dirty(self):
+        """Schedule a flush (call with the lock held)"""
+        if not self.persist_path:
+            return
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_seconds, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending changes to disk now"""
+        with self._save_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                entries = list(self.entries.items())
+            self._save(entries)
+
+    def close(self):
+        """Flush pending changes; the cache stays usable"""
+        self.flush()
+
+    def get(self, query):
+        """Return a cached (lat, lon, address_en, address_local) tuple or None"""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if time.time() - entry['timestamp'] < self.ttl_seconds:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    LOOKUP_HIT.inc()
+                    logger.info(f"Geocode cache HIT for '{key}'")
+                    return tuple(entry['result'])
+                del self.entries[key]
+            self.misses += 1
+        LOOKUP_MISS.inc()
+        logger.info(f"Geocode cache MISS for '{key}'")
+        return None
+
+    def set(self, query, result):
+        """Store a geocoding result; it reaches the disk with the next flush"""
+        key = normalize_query(query)
+        with self._lock:
+            self.entries[key] = {'result': list(result), 'timestamp': time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            self._mark_dirty()
+
+    def clear(self):
+        """Remove all cached lookups"""
+        with self._lock:
+            count = len(self.entries)
+            self.entries.clear()
+            self._mark_dirty()
+        self.flush()
+        return count
+
+    def get_stats(self):
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'saves': self.saves,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+class Geocoder:
+    """Nominatim lookups (English and local names) behind a GeocodeCache
+
+    Every request to the geolocator first takes a token from rate_limiter.
+    When the Geocoder builds the real Nominatim client itself and no limiter
+    was given, the process-wide NOMINATIM_LIMITER is used; an injected
+    geolocator (a stub or another service) is unlimited unless a limiter is
+    passed along with it.
+
+    With a gazetteer (weather_gazetteer.Gazetteer), names it knows are
+    answered offline and Nominatim is only asked for the rest.
+    """
+
+    def __init__(self, user_agent, cache=None, geolocator=None, rate_limiter=None, gazetteer=None):
+        self.user_agent = user_agent
+        self.cache = cache
+        self.geolocator = geolocator  # Lazy: Nominatim is only built when needed
+        self.rate_limiter = rate_limiter
+        self.gazetteer = gazetteer  # May be attached later, once loaded
+
+    def _get_geolocator(self):
+        """Lazy initialize the Nominatim client"""
+        if not self.geolocator:
+            try:
+                from geopy.geocoders import Nominatim  # geopy is slow to import; only load it for a real lookup
+                self.geolocator = Nominatim(user_agent=self.user_agent)
+                if self.rate_limiter is None:
+                    self.rate_limiter = NOMINATIM_LIMITER
+            except Exception as e:
+                raise RuntimeError(f"Geocoding service not available: {e}")
+        return self.geolocator
+
+    def cached(self, location_name):
+        """Cached or offline (lat, lon, address_en, address_local) for a name, or None without a network call"""
+        result = self.cache.get(location_name) if self.cache else None
+        return result or self.offline(location_name)
+
+    def offline(self, location_name):
+        """The gazetteer's answer for a name, or None"""
+        if self.gazetteer is None:
+            return None
+        result = self.gazetteer.lookup(location_name)
+        (OFFLINE_HIT if result else OFFLINE_MISS).inc()
+        return result
+
+    def reverse(self, lat, lon, max_km=None):
+        """"Name, Country" of the nearest gazetteer place, or None (no network call)"""
+        if self.gazetteer is None:
+            return None
+        if max_km is None:
+            return self.gazetteer.reverse(lat, lon)
+        return self.gazetteer.reverse(lat, lon, max_km)
+
+    def lookup(self, location_name, check_cache=True):
+        """Get coordinates and location names in multiple languages"""
+        if check_cache:
+            cached = self.cached(location_name)
+            if cached:
+                return cached
+
+        with GEOCODE_SECONDS.time():
+            result = self._geocode(location_name)
+        if self.cache:
+            self.cache.set(location_name, result)
+        return result
+
+    def _request(self, geolocator, location_name, **kwargs):
+        """One geolocator call, paced by the rate limiter and retried after a 429"""
+        from geopy.exc import GeocoderRateLimited
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            try:
+                return geolocator.geocode(location_name, timeout=10, **kwargs)
+            except GeocoderRateLimited as e:
+                RATE_LIMITED.inc()
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+                backoff = e.retry_after or RATE_LIMIT_BACKOFF_SECONDS
+                if self.rate_limiter:
+                    self.rate_limiter.penalize(backoff)
+                else:
+                    time.sleep(backoff)
+
+    def _geocode(self, location_name):
+        """Resolve a name through Nominatim"""
+        geolocator = self._get_geolocator()
+        from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+        try:
+            logger.info(f"Geocoding location: {location_name}")
+            location = self._request(geolocator, location_name, language='en')
+
+            if location:
+                # Try to get local name
+                try:
+                    local_location = self._request(geolocator, location_name,
+                                                   language='local', addressdetails=True)
+                    local_name = local_location.address if local_location else location.address
+                except Exception:
+                    local_name = location.address
+
+                logger.info(f"Found: {location.latitude}, {location.longitude}")
+                return location.latitude, location.longitude, location.address, local_name
+            else:
+                raise ValueError(f"Could not find location: {location_name}")
+
+        except ValueError:
+            raise  # Not found: the name is the problem, not the service
+        except GeocoderTimedOut:
+            raise RuntimeError("Geocoding service timed out. Please try again.")
+        except GeocoderServiceError as e:
+            raise RuntimeError(f"Geocoding service error: {e}")
+        except Exception as e:
+            raise RuntimeError(f"Failed to get coordinates: {e}")
+
+
+class _GeocodeJob:
+    """A queued name and everyone waiting for it"""
+
+    __slots__ = ('key', 'name', 'priority', 'queued', 'futures', 'running')
+
+    def __init__(self, key, name, priority):
+        self.key = key
+        self.name = name
+        self.priority = priority
+        self.queued = time.monotonic()
+        self.futures = []
+        self.running = False  # Being looked up; stays in _jobs so repeats join it
+
+
+def _priority_label(priority):
+    return "interactive" if priority <= PRIORITY_INTERACTIVE else "bulk"
+
+
+class GeocodePipeline:
+    """Queue of geocoding lookups served one at a time within the rate limit
+
+    submit() returns a Future. Cached names are answered at once; other names
+    wait in a priority queue, so an interactive lookup (PRIORITY_INTERACTIVE)
+    is served before any bulk job still waiting (PRIORITY_BULK), and a name
+    that is already queued is not queued twice. The worker waits for the
+    rate limiter before picking the next job, so the job it picks is the most
+    urgent one at the moment a request may actually be sent. submit_many()
+    queues a batch in one go and stream() yields results as they resolve.
+    """
+
+    def __init__(self, geocoder):
+        self.geocoder = geocoder
+        self._heap = []  # [(priority, seq, job)]; entries whose priority no longer matches the job are stale
+        self._jobs = {}  # {normalized name: queued job}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.stats = {'submitted': 0, 'cache_hits': 0, 'deduplicated': 0, 'completed': 0, 'failed': 0,
+                      'cancelled': 0}
+        self._waits = {}  # {priority label: [count, total seconds, max seconds]}
+
+    def start(self):
+        """Start the worker thread"""
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="geocode-pipeline", daemon=True)
+        self._thread.start()
+        weather_metrics.gauge("weather_geocode_queue_depth", "Geocoding lookups waiting for their turn",
+                              func=self.queue_depth)
+        return self
+
+    def stop(self, timeout=5):
+        """Stop the worker; lookups still queued are cancelled"""
+        self._stopping.set()
+        with self._cond:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+            self._heap.clear()
+            self._cond.notify_all()
+        for job in jobs:
+            for future in job.futures:
+                future.cancel()
+        if self._thread:
+            self._thread.join(timeout)
+        logger.info(f"Geocode pipeline stopped: {self.get_stats()}")
+
+    @property
+    def stopped(self):
+        """True once stop() was called; lookups submitted from then on are cancelled"""
+        return self._stopping.is_set()
+
+    def submit(self, name, priority=PRIORITY_INTERACTIVE):
+        """Future resolving to (lat, lon, address_en, address_local)"""
+        return self.submit_many([name], priority)[0]
+
+    def submit_many(self, names, priority=PRIORITY_BULK):
+        """Queue several names at once; returns their futures in the same order"""
+        futures = []
+        queued = False
+        with self._cond:
+            for name in names:
+                future = Future()
+                futures.append(future)
+                self.stats['submitted'] += 1
+                if self._stopping.is_set():
+                    future.cancel()  # No worker is left to answer it
+                    continue
+                cached = self.geocoder.cached(name)
+                if cached:
+                    self.stats['cache_hits'] += 1
+                    future.set_result(cached)
+                    continue
+                key = normalize_query(name)
+                job = self._jobs.get(key)
+                if job is None:
+                    job = self._jobs[key] = _GeocodeJob(key, name, priority)
+                    heapq.heappush(self._heap, (priority, next(self._seq), job))
+                else:
+                    self.stats['deduplicated'] += 1
+                    if priority < job.priority and not job.running:
+                        # Promote: the old heap entry goes stale and is skipped when popped
+                        job.priority = priority
+                        heapq.heappush(self._heap, (priority, next(self._seq), job))
+                job.futures.append(future)
+                queued = True
+            if queued:
+                self._cond.notify()
+        return futures
+
+    def lookup(self, name, timeout=None):
+        """Interactive lookup: the cached result, or wait for it at the front of the queue"""
+        return self.submit(name, PRIORITY_INTERACTIVE).result(timeout)
+
+    def stream(self, names, priority=PRIORITY_BULK):
+        """Yield (name, result, error) for each name as it resolves, in completion order"""
+        names = list(names)
+        futures = dict(zip(self.submit_many(names, priority), names))
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], (None if error else future.result()), error
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._jobs)
+
+    def _pop(self):
+        while self._heap:
+            priority, _, job = heapq.heappop(self._heap)
+            if priority != job.priority or job.running or self._jobs.get(job.key) is not job:
+                continue  # Stale entry of a promoted or finished job
+            job.futures = [future for future in job.futures if future.set_running_or_notify_cancel()]
+            if job.futures:
+                job.running = True
+                return job
+            del self._jobs[job.key]
+            self.stats['cancelled'] += 1
+        return None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            with self._cond:
+                while not self._heap and not self._stopping.is_set():
+                    self._cond.wait()
+            if self._stopping.is_set():
+                return
+            # Pick the job only once a request may be sent, so later urgent submissions can still win
+            limiter = self.geocoder.rate_limiter  # Set once the real Nominatim client is built
+            delay = limiter.delay() if limiter else 0.0
+            if delay and self._stopping.wait(delay):
+                return
+            with self._cond:
+                job = self._pop()
+            if job is None:
+                continue
+
+            waited = time.monotonic() - job.queued
+            label = _priority_label(job.priority)
+            QUEUE_WAIT_SECONDS.labels(priority=label).observe(waited)
+            try:
+                result = self.geocoder.lookup(job.name, check_cache=False)  # Checked on submit
+            except Exception as e:
+                outcome, value = 'failed', e
+            else:
+                outcome, value = 'completed', result
+            with self._cond:
+                # The result is cached by now; names submitted during the lookup joined this job
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+                futures = job.futures
+                self.stats[outcome] += 1
+                wait = self._waits.setdefault(label, [0, 0.0, 0.0])
+                wait[0] += 1
+                wait[1] += waited
+                wait[2] = max(wait[2], waited)
+            for future in futures:
+                if not future.running() and not future.set_running_or_notify_cancel():
+                    continue  # Joined during the lookup and cancelled since
+                if outcome == 'failed':
+                    future.set_exception(value)
+                else:
+                    future.set_result(value)
+
+    def get_stats(self):
+        """Counters plus queue depth per priority and wait times per priority"""
+        with self._cond:
+            depth = {}
+            for job in self._jobs.values():
+                label = _priority_label(job.priority)
+                depth[label] = depth.get(label, 0) + 1
+            stats = dict(self.stats)
+            stats['queue_depth'] = len(self._jobs)
+            stats['queue_depth_by_priority'] = depth
+            stats['wait'] = {label: {'count': count, 'avg_seconds': round(total / count, 3),
+                                     'max_seconds': round(largest, 3)}
+                             for label, (count, total, largest) in self._waits.items()}
+        if self.geocoder.rate_limiter:
+            stats['rate_limiter'] = self.geocoder.rate_limiter.get_stats()
+        return stats
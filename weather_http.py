@@ -0,0 +1,217 @@
+"""
+HTTP Client Module
+One shared, pooled requests session for every outbound call
+"""
+
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import weather_metrics
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Weather-App (+https://github.com/Rog294super/Weather-App)"
+DEFAULT_POOL_SIZE = 10
+# Per-host connection pool sizes; hosts not listed use DEFAULT_POOL_SIZE
+HOST_POOL_SIZES = {
+    "api.open-meteo.com": 10,
+    "api.github.com": 2,
+    "github.com": 4,
+    "objects.githubusercontent.com": 4,
+}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5   # seconds, doubled per attempt
+BACKOFF_MAX = 8.0    # seconds, upper bound for a single wait
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+HTTP_REQUESTS = weather_metrics.counter("weather_http_requests_total", "HTTP requests sent, by host and status",
+                                        ("host", "status"))
+HTTP_RECEIVED_BYTES = weather_metrics.counter("weather_http_received_bytes_total",
+                                              "Response body bytes received, by host", ("host",))
+HTTP_RETRIES = weather_metrics.counter("weather_http_retries_total", "Requests retried after an error")
+
+
+class CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report every new TCP/TLS connection"""
+
+    def __init__(self, on_new_connection, **kwargs):
+        self.on_new_connection = on_new_connection
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_new_connection = self.on_new_connection
+
+        class CountingHTTPPool(HTTPConnectionPool):
+            def _new_conn(self):
+                on_new_connection(self.host)
+                return super()._new_conn()
+
+        class CountingHTTPSPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                on_new_connection(self.host)
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPPool,
+            "https": CountingHTTPSPool,
+        }
+
+
+class HttpClient:
+    """Pooled keep-alive session with gzip and bounded, jittered retries"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, host_pool_sizes=None,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 user_agent=USER_AGENT):
+        self.pool_size = pool_size
+        self.host_pool_sizes = dict(HOST_POOL_SIZES if host_pool_sizes is None else host_pool_sizes)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'retries': 0, 'failures': 0, 'connections_opened': 0}
+        self._connections_by_host = {}
+        self._mounted_hosts = set()
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': user_agent,
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        })
+        for scheme in ("http://", "https://"):
+            self.session.mount(scheme, self._make_adapter(pool_size))
+
+    def _make_adapter(self, pool_size):
+        """Build an adapter for one pool size (retries are handled in request())"""
+        return CountingAdapter(self._count_connection, pool_connections=pool_size,
+                               pool_maxsize=pool_size, max_retries=0)
+
+    def _count_connection(self, host):
+        with self._lock:
+            self._stats['connections_opened'] += 1
+            self._connections_by_host[host] = self._connections_by_host.get(host, 0) + 1
+
+    def _mount_host(self, url):
+        """Give hosts with a configured pool size their own adapter on first use"""
+        parsed = urlparse(url)
+        host = parsed.hostname
+        if host in self._mounted_hosts:
+            return
+        with self._lock:
+            if host in self._mounted_hosts:
+                return
+            size = self.host_pool_sizes.get(host)
+            if size:
+                self.session.mount(f"{parsed.scheme}://{parsed.netloc}", self._make_adapter(size))
+            self._mounted_hosts.add(host)
+
+    def _backoff(self, attempt, response=None):
+        """Seconds to wait before the next attempt (full jitter, honours Retry-After)"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, url, **kwargs):
+        """Send a request, retrying idempotent calls on connection errors and 429/5xx"""
+        self._mount_host(url)
+        retries = self.max_retries if method.upper() in IDEMPOTENT_METHODS else 0
+
+        attempt = 0
+        while True:
+            with self._lock:
+                self._stats['requests'] += 1
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                HTTP_REQUESTS.inc(host=urlparse(url).hostname, status="error")
+                if attempt >= retries:
+                    with self._lock:
+                        self._stats['failures'] += 1
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{method} {url} failed ({e}), retrying in {delay:.2f}s")
+            else:
+                self._record_response(url, response, kwargs.get('stream', False))
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                delay = self._backoff(attempt, response)
+                logger.warning(f"{method} {url} returned HTTP {response.status_code}, "
+                               f"retrying in {delay:.2f}s")
+                response.close()
+
+            with self._lock:
+                self._stats['retries'] += 1
+            HTTP_RETRIES.inc()
+            attempt += 1
+            time.sleep(delay)
+
+    def _record_response(self, url, response, streamed):
+        """Count a response and its body size in the metrics registry"""
+        host = urlparse(url).hostname
+        HTTP_REQUESTS.inc(host=host, status=response.status_code)
+        # Content-Length is the size on the wire; streamed bodies without it are counted by their reader
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit():
+            HTTP_RECEIVED_BYTES.inc(int(length), host=host)
+        elif not streamed:
+            HTTP_RECEIVED_BYTES.inc(len(response.content), host=host)
+
+    def get(self, url, **kwargs):
+        """GET through the shared session"""
+        return self.request("GET", url, **kwargs)
+
+    def get_stats(self):
+        """Request and connection reuse statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['connections_by_host'] = dict(self._connections_by_host)
+        sent = stats['requests']
+        stats['connections_reused'] = max(0, sent - stats['connections_opened'])
+        stats['reuse_rate'] = stats['connections_reused'] / sent if sent else 0.0
+        return stats
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide HttpClient, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def configure(**kwargs):
+    """Replace the shared client, e.g. configure(pool_size=20, max_retries=5)"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(**kwargs)
+    return _client
+
+
+def get(url, **kwargs):
+    """GET through the shared client"""
+    return get_client().get(url, **kwargs)
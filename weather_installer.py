@@ -8,15 +8,21 @@ Kleine installer die de ONEDIR versie (instant startup) downloadt en installeert
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import requests
 import zipfile
 import subprocess
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import shutil
+
+import weather_download
+import weather_http
+from weather_download import parse_digest
+from weather_extract import extract_zip
+from weather_ui import UIDispatcher
 
 GITHUB_REPO = "Rog294super/Weather-App"
 VERSION = "1.2.0"
+PROGRESS_TICK_MS = 33  # Voortgang wordt hooguit ~30 keer per seconde getekend
 
 
 class InstallerGUI:
@@ -33,6 +39,9 @@ class InstallerGUI:
         self.progress_var = tk.DoubleVar(value=0)
         self.status_text = tk.StringVar(value="Klaar om te installeren")
         
+        # Worker threads melden voortgang hier; de main loop tekent alleen de laatste stand per frame
+        self.ui = UIDispatcher(self.root, tick_ms=PROGRESS_TICK_MS).start()
+        
         self.create_ui()
     
     def create_ui(self):
@@ -111,9 +120,12 @@ class InstallerGUI:
             self.install_path.set(path)
     
     def update_progress(self, value, text):
+        """Veilig vanuit elke thread; tussenstanden binnen één frame worden samengevoegd"""
+        self.ui.post("progress", self._show_progress, value, text)
+    
+    def _show_progress(self, value, text):
         self.progress_var.set(value)
         self.status_text.set(text)
-        self.root.update()
     
     def start_install(self):
         self.install_btn.config(state=tk.DISABLED)
@@ -130,7 +142,7 @@ class InstallerGUI:
             # Step 2: Get latest release info
             self.update_progress(10, "Laatste versie ophalen...")
             url = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
-            response = requests.get(url, timeout=10)
+            response = weather_http.get(url, timeout=10)
             
             if response.status_code != 200:
                 raise Exception("Kon geen release informatie ophalen")
@@ -153,40 +165,20 @@ class InstallerGUI:
                 # Download ONEDIR ZIP
                 self.update_progress(20, "Downloaden ONEDIR versie...")
                 zip_path = install_dir / "Weather_onedir.zip"
-                self.download_file(onedir_zip["browser_download_url"], zip_path, 20, 70)
+                self.download_files([(onedir_zip, zip_path)], 20, 70)
                 
-                # Extract
+                # Extract: elk bestand wordt direct op zijn eindplek geschreven
                 self.update_progress(70, "Uitpakken...")
                 with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                    # Extract en zoek de Weather folder binnen ZIP
-                    members = zip_ref.namelist()
-                    
-                    # Check of er een Weather/ folder in zit
-                    has_Weather_folder = any(m.startswith('Weather/') for m in members)
-                    
-                    if has_Weather_folder:
-                        # Extract alles, dan verplaats Weather folder inhoud naar root
-                        temp_extract = install_dir / "_temp_extract"
-                        temp_extract.mkdir(exist_ok=True)
-                        zip_ref.extractall(temp_extract)
-                        
-                        # Verplaats Weather folder inhoud
-                        Weather_folder = temp_extract / "Weather"
-                        if Weather_folder.exists():
-                            for item in Weather_folder.iterdir():
-                                dest = install_dir / item.name
-                                if dest.exists():
-                                    if dest.is_dir():
-                                        shutil.rmtree(dest)
-                                    else:
-                                        dest.unlink()
-                                shutil.move(str(item), str(dest))
-                        
-                        # Cleanup
-                        shutil.rmtree(temp_extract)
-                    else:
-                        # Direct extract
-                        zip_ref.extractall(install_dir)
+                    # Check of er een Weather/ folder in zit; zo ja, komt de inhoud daarvan in de root
+                    has_Weather_folder = any(m.startswith('Weather/') for m in zip_ref.namelist())
+                
+                def report(done, total):
+                    percent = done / total if total else 1
+                    self.update_progress(70 + 15 * percent, f"Uitpakken... {done / (1024 * 1024):.0f} MB")
+                
+                extract_zip(zip_path, install_dir, strip_prefix="Weather/" if has_Weather_folder else None,
+                            progress_callback=report, replace=has_Weather_folder)
                 
                 zip_path.unlink()
                 
@@ -198,16 +190,12 @@ class InstallerGUI:
                 if not exe_asset:
                     raise Exception("Geen installeerbaar bestand gevonden")
                 
-                # Download .exe
-                exe_path = install_dir / "Weather.exe"
-                self.download_file(exe_asset["browser_download_url"], exe_path, 20, 80)
-                
-                # Download updater als beschikbaar
+                # Download .exe en (als beschikbaar) de updater tegelijk
+                downloads = [(exe_asset, install_dir / "Weather.exe")]
                 updater_asset = next((a for a in data["assets"] if "updater" in a["name"].lower() and a["name"].endswith(".exe")), None)
                 if updater_asset:
-                    self.update_progress(80, "Updater downloaden...")
-                    updater_path = install_dir / "updater.exe"
-                    self.download_file(updater_asset["browser_download_url"], updater_path, 80, 85)
+                    downloads.append((updater_asset, install_dir / "updater.exe"))
+                self.download_files(downloads, 20, 85)
             
             # Step 4: Create default config
             self.update_progress(85, "Configuratie aanmaken...")
@@ -224,32 +212,38 @@ class InstallerGUI:
             # Done!
             self.update_progress(100, "Installatie voltooid! 🎉")
             
-            self.root.after(100, lambda: self.show_complete_dialog(install_dir))
+            self.ui.call(self.show_complete_dialog, install_dir)
             
         except Exception as e:
-            self.root.after(100, lambda: messagebox.showerror("Fout", f"Installatie mislukt:\n{e}"))
-            self.install_btn.config(state=tk.NORMAL)
             self.update_progress(0, "Installatie mislukt")
+            self.ui.post("install_btn", lambda: self.install_btn.config(state=tk.NORMAL))
+            self.ui.call(messagebox.showerror, "Fout", f"Installatie mislukt:\n{e}")
     
-    def download_file(self, url, dest_path, progress_start, progress_end):
-        """Download bestand met progress indicator"""
-        response = requests.get(url, stream=True, timeout=30)
-        response.raise_for_status()
+    def download_files(self, downloads, progress_start, progress_end):
+        """Download [(asset, pad)] tegelijk (parallel, hervatbaar, SHA-256 gecontroleerd) met één voortgang"""
+        done = [0] * len(downloads)
+        total_size = sum(asset.get("size") or 0 for asset, _ in downloads)
+        lock = threading.Lock()
         
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
+        def reporter(index):
+            def report(downloaded, size):
+                with lock:
+                    done[index] = downloaded
+                    downloaded_all = sum(done)
+                if total_size:
+                    percent = min(1.0, downloaded_all / total_size)
+                    progress = progress_start + (progress_end - progress_start) * percent
+                    size_mb = downloaded_all / (1024 * 1024)
+                    total_mb = total_size / (1024 * 1024)
+                    self.update_progress(progress, f"Downloaden... {size_mb:.1f} MB / {total_mb:.1f} MB")
+            return report
         
-        with open(dest_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    if total_size > 0:
-                        percent = (downloaded / total_size)
-                        progress = progress_start + (progress_end - progress_start) * percent
-                        size_mb = downloaded / (1024 * 1024)
-                        total_mb = total_size / (1024 * 1024)
-                        self.update_progress(progress, f"Downloaden... {size_mb:.1f} MB / {total_mb:.1f} MB")
+        with ThreadPoolExecutor(max_workers=len(downloads)) as pool:
+            futures = [pool.submit(weather_download.download, asset["browser_download_url"], path,
+                                   parse_digest(asset.get("digest")), reporter(index))
+                       for index, (asset, path) in enumerate(downloads)]
+            for future in futures:
+                future.result()
     
     def create_default_config(self, install_dir):
         """Maak standaard config.json"""
@@ -0,0 +1,344 @@
+"""
+List View Module
+Virtualized, diff-updated listbox for large location lists, with a prefix index for type-to-filter
+"""
+
+import logging
+import re
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from difflib import SequenceMatcher
+
+import weather_metrics
+
+logger = logging.getLogger(__name__)
+
+OVERSCAN_ROWS = 1  # Extra row rendered below the window for the partly visible last line
+WHEEL_ROWS = 3  # Rows scrolled per mouse wheel notch
+# Upper bounds in seconds; a render is expected to fit well inside one 16 ms frame
+FRAME_BUCKETS = (0.0005, 0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.05, 0.1, 0.25)
+
+LIST_RENDER_SECONDS = weather_metrics.histogram(
+    "weather_list_render_seconds", "Time to bring the locations list up to date after a change",
+    buckets=FRAME_BUCKETS
+)
+
+_WORD = re.compile(r"\w+")
+_COMBINING_MARKS = dict.fromkeys(range(0x0300, 0x0370))  # Accents left separate by NFKD
+
+
+def fold(text):
+    """Lower-case text without accents, so 'zur' finds 'Zürich'"""
+    if text.isascii():
+        return text.lower()
+    return unicodedata.normalize('NFKD', text).translate(_COMBINING_MARKS).casefold()
+
+
+def words(text):
+    return _WORD.findall(fold(text))
+
+
+class PrefixIndex:
+    """Sorted distinct words with the ids using each; prefix queries are a bisect plus a union"""
+
+    def __init__(self):
+        self._words = []  # Sorted distinct words
+        self._ids = {}  # {word: set of ids}
+
+    def __len__(self):
+        return len(self._words)
+
+    def build(self, items):
+        """Replace the index with [(id, text)] in one pass and one sort"""
+        ids = {}
+        for item_id, text in items:
+            for word in words(text):
+                found = ids.get(word)
+                if found is None:
+                    ids[word] = {item_id}
+                else:
+                    found.add(item_id)
+        self._ids = ids
+        self._words = sorted(ids)
+
+    def add(self, item_id, text):
+        for word in words(text):
+            found = self._ids.get(word)
+            if found is None:
+                self._ids[word] = {item_id}
+                insort(self._words, word)
+            else:
+                found.add(item_id)
+
+    def remove(self, item_id, text):
+        for word in set(words(text)):
+            found = self._ids.get(word)
+            if found is None:
+                continue
+            found.discard(item_id)
+            if not found:
+                del self._ids[word]
+                del self._words[bisect_left(self._words, word)]
+
+    def _prefix(self, prefix):
+        start = bisect_left(self._words, prefix)
+        end = bisect_left(self._words, prefix + "\U0010ffff")
+        if end - start == 1:
+            return set(self._ids[self._words[start]])
+        return set().union(*(self._ids[word] for word in self._words[start:end]))
+
+    def search(self, query):
+        """Set of ids matching every word of query, or None for an empty query (everything)"""
+        result = None
+        for prefix in words(query):
+            found = self._prefix(prefix)
+            result = found if result is None else result & found
+            if not result:
+                return set()
+        return result
+
+
+class VirtualListView:
+    """Shows a large list of (id, label) rows in a Listbox that only holds the visible ones
+
+    The Listbox never contains more than a window's worth of rows. Scrolling,
+    filtering and adding or removing rows recompute that window and apply
+    only the difference (SequenceMatcher opcodes) to the widget, so a change
+    costs a few Tcl calls whatever the list size. Rows are identified by a
+    stable id, and the selection follows the id rather than a position.
+
+    The scrollbar is driven by the view (yview), and the wheel and arrow keys
+    are handled here because the Listbox itself has nothing to scroll to.
+    """
+
+    def __init__(self, listbox, scrollbar=None, on_select=None, row_height=None):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.on_select = on_select
+        self.row_height = row_height
+        self.index = None  # PrefixIndex, built when filtering is first used
+        self._labels = {}  # {id: label}, insertion ordered
+        self._order = {}  # {id: sequence number}, keeps filtered rows in insertion order
+        self._next_seq = 0
+        self._ids = []  # Every id, insertion ordered
+        self._rows = None  # Ids passing the filter, or None when there is no filter
+        self._positions = {}  # {id: position in rows}, rebuilt on first use after it goes stale
+        self._filter = ""
+        self._top = 0
+        self._height = int(listbox.cget('height')) or 10
+        self._shown = []  # (id, label) rows currently in the Listbox
+        self.selected_id = None
+        self.stats = {'renders': 0, 'inserted': 0, 'deleted': 0, 'last_render_ms': 0.0, 'max_render_ms': 0.0}
+
+        if scrollbar is not None:
+            scrollbar.config(command=self.yview)
+        listbox.bind('<<ListboxSelect>>', self._on_listbox_select)
+        listbox.bind('<Configure>', self._on_configure)
+        listbox.bind('<MouseWheel>', self._on_wheel)
+        listbox.bind('<Button-4>', lambda event: self.scroll(-WHEEL_ROWS))
+        listbox.bind('<Button-5>', lambda event: self.scroll(WHEEL_ROWS))
+        listbox.bind('<Up>', lambda event: self.move_selection(-1))
+        listbox.bind('<Down>', lambda event: self.move_selection(1))
+        listbox.bind('<Prior>', lambda event: self.move_selection(-self._height))
+        listbox.bind('<Next>', lambda event: self.move_selection(self._height))
+
+    def __len__(self):
+        return len(self._labels)
+
+    @property
+    def rows(self):
+        """Ids in display order after filtering (the view's own list, not a copy)"""
+        return self._ids if self._rows is None else self._rows
+
+    def _position(self, item_id):
+        """Index of an id in rows, or None if it is not shown"""
+        if self._positions is None:
+            self._positions = {item_id: position for position, item_id in enumerate(self.rows)}
+        return self._positions.get(item_id)
+
+    def set_items(self, items):
+        """Replace every row with [(id, label)]"""
+        self._labels = dict(items)
+        self._order = {item_id: seq for seq, item_id in enumerate(self._labels)}
+        self._next_seq = len(self._order)
+        self._ids = list(self._labels)
+        self._positions = None
+        self.index = None
+        if self.selected_id not in self._labels:
+            self.selected_id = None
+        self._apply_filter()
+
+    def add(self, item_id, label):
+        """Append a row (or relabel an existing one)"""
+        if item_id not in self._labels:
+            self._order[item_id] = self._next_seq
+            self._next_seq += 1
+            self._ids.append(item_id)
+            if self._rows is None and self._positions is not None:
+                self._positions[item_id] = len(self._ids) - 1
+        elif self.index is not None:
+            self.index.remove(item_id, self._labels[item_id])
+        self._labels[item_id] = label
+        if self.index is not None:
+            self.index.add(item_id, label)
+        self._apply_filter()
+
+    def remove(self, item_id):
+        """Drop a row; the selection is cleared if it was on this row"""
+        label = self._labels.pop(item_id, None)
+        if label is None:
+            return
+        del self._order[item_id]
+        position = self._positions.get(item_id) if self._rows is None and self._positions else None
+        if position is None:
+            self._ids.remove(item_id)
+        else:
+            del self._ids[position]
+        self._positions = None
+        if self.index is not None:
+            self.index.remove(item_id, label)
+        if self.selected_id == item_id:
+            self.selected_id = None
+        self._apply_filter()
+
+    def set_filter(self, text):
+        """Show only rows with a word starting with each word of text, keeping the selection in view"""
+        self._filter = text
+        self._top = 0
+        self._apply_filter()
+        if self.selected_id is not None:
+            self.see(self.selected_id)
+
+    def prepare_filter(self):
+        """Build the prefix index now (e.g. when the filter box gets focus) rather than on the first keystroke"""
+        if self.index is None:
+            self.index = PrefixIndex()
+            self.index.build(self._labels.items())
+
+    def _apply_filter(self):
+        if not self._filter.strip():
+            if self._rows is not None:
+                self._rows = None
+                self._positions = None
+        else:
+            self.prepare_filter()
+            matches = self.index.search(self._filter)
+            self._rows = sorted(matches, key=self._order.__getitem__)
+            self._positions = None
+        self.render()
+
+    def select(self, item_id):
+        """Select a row by id and scroll it into view"""
+        if item_id not in self._labels:
+            return
+        self.selected_id = item_id
+        self.see(item_id)
+
+    def see(self, item_id):
+        """Scroll so the row with this id is visible"""
+        position = self._position(item_id)
+        if position is None:
+            return
+        if position < self._top:
+            self._top = position
+        elif position >= self._top + self._height:
+            self._top = position - self._height + 1
+        self.render()
+
+    def move_selection(self, step):
+        """Arrow and page keys: move the selection and tell on_select"""
+        rows = self.rows
+        if not rows:
+            return "break"
+        position = self._position(self.selected_id)
+        if position is None:
+            position = self._top if step > 0 else self._top + self._height - 1
+        else:
+            position += step
+        item_id = rows[max(0, min(len(rows) - 1, position))]
+        if item_id != self.selected_id:
+            self.select(item_id)
+            if self.on_select:
+                self.on_select(item_id)
+        return "break"
+
+    def scroll(self, rows):
+        self._top += rows
+        self.render()
+        return "break"
+
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units' | 'pages')"""
+        total = len(self.rows)
+        if args and args[0] == 'moveto':
+            self._top = int(float(args[1]) * total + 0.5)
+        elif args and args[0] == 'scroll':
+            amount = int(args[1])
+            self._top += amount * self._height if args[2] == 'pages' else amount
+        self.render()
+
+    def render(self):
+        """Bring the Listbox in line with the current window, touching only rows that changed"""
+        start = time.perf_counter()
+        rows = self.rows
+        total = len(rows)
+        self._top = max(0, min(self._top, total - self._height))
+        window = [(item_id, self._labels[item_id])
+                  for item_id in rows[self._top:self._top + self._height + OVERSCAN_ROWS]]
+
+        if window != self._shown:
+            opcodes = SequenceMatcher(None, self._shown, window, autojunk=False).get_opcodes()
+            # Back to front, so earlier indices stay valid while later ones change
+            for tag, i1, i2, j1, j2 in reversed(opcodes):
+                if tag in ('delete', 'replace'):
+                    self.listbox.delete(i1, i2 - 1)
+                    self.stats['deleted'] += i2 - i1
+                if tag in ('insert', 'replace'):
+                    self.listbox.insert(i1, *(label for _, label in window[j1:j2]))
+                    self.stats['inserted'] += j2 - j1
+            self._shown = window
+
+        self.listbox.selection_clear(0, 'end')
+        for position, (item_id, _) in enumerate(window):
+            if item_id == self.selected_id:
+                self.listbox.selection_set(position)
+                break
+        if self.scrollbar is not None:
+            if total:
+                self.scrollbar.set(self._top / total, min(1.0, (self._top + self._height) / total))
+            else:
+                self.scrollbar.set(0.0, 1.0)
+
+        elapsed = time.perf_counter() - start
+        LIST_RENDER_SECONDS.observe(elapsed)
+        self.stats['renders'] += 1
+        self.stats['last_render_ms'] = elapsed * 1000
+        self.stats['max_render_ms'] = max(self.stats['max_render_ms'], elapsed * 1000)
+
+    def _on_listbox_select(self, event):
+        selection = self.listbox.curselection()
+        if not selection or selection[0] >= len(self._shown):
+            return
+        item_id = self._shown[selection[0]][0]
+        self.selected_id = item_id
+        if self.on_select:
+            self.on_select(item_id)
+
+    def _on_configure(self, event):
+        """Fit the window to the Listbox's new pixel height"""
+        if self.row_height is None:
+            linespace = self.listbox.tk.call('font', 'metrics', self.listbox.cget('font'), '-linespace')
+            self.row_height = int(linespace) + 1  # Tk adds a pixel per line
+        border = 2 * (int(self.listbox.cget('borderwidth')) + int(self.listbox.cget('highlightthickness')))
+        height = max(1, (event.height - border) // self.row_height)
+        if height != self._height:
+            self._height = height
+            self.render()
+
+    def _on_wheel(self, event):
+        if not event.delta:
+            return "break"
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        notches = event.delta // 120 if abs(event.delta) >= 120 else (1 if event.delta > 0 else -1)
+        return self.scroll(-notches * WHEEL_ROWS)
@@ -0,0 +1,249 @@
+"""
+Locations Module
+Saved locations: an indexed in-memory store, a JSON snapshot and an append-only change log
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = "weather_locations.json"
+LOG_SUFFIX = ".log"  # Change log next to the snapshot: weather_locations.json.log
+COMPACT_MIN_OPS = 256  # Never compact a log shorter than this
+COORD_PRECISION = 4  # Decimal places for coordinate lookups (~11 m)
+
+
+def _coord_key(lat, lon):
+    return (round(float(lat), COORD_PRECISION), round(float(lon), COORD_PRECISION))
+
+
+class LocationManager:
+    """Manages saved locations
+
+    Locations are kept in insertion order in a dict keyed by name, with a
+    second index on rounded coordinates, so lookups, adds and removes are
+    O(1). The coordinate index is built on first use, which keeps loading
+    as cheap as reading the JSON. Each change is appended as one JSON line
+    to a log next to the snapshot instead of rewriting the whole file;
+    once the log holds more operations than there are locations (and at
+    least COMPACT_MIN_OPS) it is folded into a new snapshot, written to a
+    temp file, fsynced and renamed over the old one. Replaying the log is idempotent, so a crash
+    between the rename and truncating the log loses nothing, and a torn
+    last line from a crash mid-append is skipped.
+    """
+
+    def __init__(self, config_path, sync=True):
+        self.config_path = config_path
+        self.log_path = config_path + LOG_SUFFIX
+        self.sync = sync  # fsync every log append (off for throwaway stores)
+        self._by_name = {}
+        self._by_coords = None  # {(lat, lon) rounded: [names]}, built on first lookup
+        self._list = None  # Cached get_locations() result, rebuilt after a change
+        self._log = None
+        self._log_ops = 0
+        self._lock = threading.Lock()
+        self.load_locations()
+
+    @property
+    def locations(self):
+        return self.get_locations()
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def load_locations(self):
+        """Load the snapshot, then replay the change log on top of it"""
+        with self._lock:
+            self._by_name.clear()
+            self._by_coords = None
+            self._list = None
+            try:
+                if os.path.exists(self.config_path):
+                    with open(self.config_path, 'r', encoding='utf-8') as f:
+                        for loc in json.load(f).get('locations', []):
+                            self._by_name.setdefault(loc['name'], loc)
+            except Exception as e:
+                logger.error(f"Error loading locations: {e}")
+            self._log_ops, torn = self._replay_log()
+            logger.info(f"Loaded {len(self._by_name)} locations ({self._log_ops} logged changes)")
+            # A bad line would corrupt the next append too, so start a clean log right away
+            if torn or self._should_compact():
+                self._compact()
+        return self.get_locations()
+
+    def _replay_log(self):
+        """Apply logged changes to the loaded snapshot, returning (applied, any bad lines)"""
+        if not os.path.exists(self.log_path):
+            return 0, False
+        count = 0
+        bad = False
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError, TypeError) as e:
+                        # Only the last line can be torn; anything else is logged and skipped too
+                        logger.warning(f"Skipping bad line {line_number} of {self.log_path}: {e}")
+                        bad = True
+                        continue
+                    count += 1
+        except OSError as e:
+            logger.error(f"Error reading location log: {e}")
+        return count, bad
+
+    def _apply(self, entry):
+        op = entry['op']
+        if op == 'add':
+            if entry['location']['name'] not in self._by_name:
+                self._insert(dict(entry['location']))
+        elif op == 'remove':
+            self._delete(entry['name'])
+        elif op == 'priority':
+            loc = self._by_name.get(entry['name'])
+            if loc is not None:
+                loc['priority'] = entry['priority']
+        else:
+            raise ValueError(f"unknown op {op!r}")
+
+    def _insert(self, loc):
+        self._by_name[loc['name']] = loc
+        if self._by_coords is not None:
+            self._by_coords.setdefault(_coord_key(loc['lat'], loc['lon']), []).append(loc['name'])
+        self._list = None
+
+    def _delete(self, name):
+        loc = self._by_name.pop(name, None)
+        if loc is None:
+            return None
+        if self._by_coords is not None:
+            key = _coord_key(loc['lat'], loc['lon'])
+            names = self._by_coords.get(key, [])
+            if name in names:
+                names.remove(name)
+            if not names:
+                self._by_coords.pop(key, None)
+        self._list = None
+        return loc
+
+    def _append(self, entry):
+        """Write one change to the log, compacting when it has grown long"""
+        try:
+            if self._log is None:
+                self._log = open(self.log_path, 'a', encoding='utf-8')
+            self._log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._log.flush()
+            if self.sync:
+                os.fsync(self._log.fileno())
+            self._log_ops += 1
+        except Exception as e:
+            logger.error(f"Error saving locations: {e}")
+            return
+        if self._should_compact():
+            self._compact()
+
+    def _should_compact(self):
+        return self._log_ops >= max(COMPACT_MIN_OPS, len(self._by_name))
+
+    def _compact(self):
+        """Write the current locations as a new snapshot and empty the log"""
+        tmp_path = self.config_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                # One location per line: still a readable file, without indent=2's size
+                f.write('{"locations": [')
+                f.write(",".join("\n" + json.dumps(loc, ensure_ascii=False) for loc in self._by_name.values()))
+                f.write("\n]}\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_path)
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            # Truncate only after the snapshot is in place; replaying this log again is harmless
+            open(self.log_path, 'w').close()
+            logger.debug(f"Compacted {self._log_ops} logged changes into {self.config_path}")
+            self._log_ops = 0
+        except Exception as e:
+            logger.error(f"Error saving locations: {e}")
+
+    def save_locations(self):
+        """Write a full snapshot now (normally done by compaction)"""
+        with self._lock:
+            self._compact()
+
+    def close(self):
+        """Fold any logged changes into the snapshot and close the log"""
+        with self._lock:
+            if self._log_ops:
+                self._compact()
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def add_location(self, name, lat, lon, address, local_name=None):
+        """Add a new location"""
+        location = {
+            'name': name,
+            'local_name': local_name or name,
+            'lat': lat,
+            'lon': lon,
+            'address': address,
+            'added': datetime.now().isoformat()
+        }
+        with self._lock:
+            # Check if location already exists
+            if name in self._by_name:
+                return False
+            self._insert(location)
+            self._append({'op': 'add', 'location': location})
+        return True
+
+    def remove_location(self, name):
+        """Remove a location"""
+        with self._lock:
+            if self._delete(name) is not None:
+                self._append({'op': 'remove', 'name': name})
+
+    def set_priority(self, name, priority):
+        """Set the background refresh priority of a location (0 = never prefetch)"""
+        with self._lock:
+            loc = self._by_name.get(name)
+            if loc is None:
+                return False
+            loc['priority'] = priority
+            self._append({'op': 'priority', 'name': name, 'priority': priority})
+        return True
+
+    def get_location(self, name):
+        """Saved location by name, or None"""
+        return self._by_name.get(name)
+
+    def find_by_coordinates(self, lat, lon):
+        """First saved location at these coordinates (to COORD_PRECISION places), or None"""
+        if self._by_coords is None:
+            with self._lock:
+                if self._by_coords is None:
+                    index = {}
+                    for loc in self._by_name.values():
+                        index.setdefault(_coord_key(loc['lat'], loc['lon']), []).append(loc['name'])
+                    self._by_coords = index
+        names = self._by_coords.get(_coord_key(lat, lon))
+        return self._by_name.get(names[0]) if names else None
+
+    def get_locations(self):
+        """Get all locations (a list that is replaced, not changed, when locations change)"""
+        result = self._list
+        if result is None:
+            with self._lock:
+                result = self._list = list(self._by_name.values())
+        return result
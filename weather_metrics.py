@@ -0,0 +1,329 @@
+"""
+Metrics Module
+Process-wide counters, gauges and latency histograms with JSON and Prometheus text output
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; slow enough at the top for a timed-out request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metric:
+    """A named metric with optional labels; one value per combination of label values"""
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}  # {label values: value}
+        self._lock = threading.Lock()
+
+    def labels(self, **values):
+        """Child bound to one set of label values, for use on hot paths"""
+        if set(values) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(values)}")
+        return _Child(self, tuple(str(values[name]) for name in self.label_names))
+
+    def _key(self, values):
+        if not values and not self.label_names:
+            return ()
+        return self.labels(**values).key
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+class _Child:
+    """A metric with its label values filled in"""
+
+    __slots__ = ('metric', 'key')
+
+    def __init__(self, metric, key):
+        self.metric = metric
+        self.key = key
+
+    def inc(self, amount=1):
+        self.metric._add(self.key, amount)
+
+    def dec(self, amount=1):
+        self.metric._add(self.key, -amount)
+
+    def set(self, value):
+        self.metric._set(self.key, value)
+
+    def observe(self, value):
+        self.metric._observe(self.key, value)
+
+    def time(self):
+        return _Timer(self.metric, self.key)
+
+
+class Counter(Metric):
+    """Monotonic count, e.g. cache hits or bytes received"""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        self._add(self._key(labels), amount)
+
+    def _add(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Value that goes up and down; with func it is read from a callback at collection time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), func=None):
+        super().__init__(name, help_text, labels)
+        self.func = func
+
+    def set(self, value, **labels):
+        self._set(self._key(labels), value)
+
+    def inc(self, amount=1, **labels):
+        self._add(self._key(labels), amount)
+
+    def dec(self, amount=1, **labels):
+        self._add(self._key(labels), -amount)
+
+    def _set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+    def _add(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def items(self):
+        if self.func is not None:
+            try:
+                return [((), self.func())]
+            except Exception as e:
+                logger.debug(f"Gauge {self.name} callback failed: {e}")
+                return []
+        return super().items()
+
+
+class Histogram(Metric):
+    """Distribution of observed values (seconds) over fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        self._observe(self._key(labels), value)
+
+    def time(self, **labels):
+        """Context manager observing how long its block took"""
+        return _Timer(self, self._key(labels))
+
+    def _observe(self, key, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (last one is +Inf), sum, count, max]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+            state[3] = max(state[3], value)
+
+    def items(self):
+        with self._lock:
+            return [(key, [list(state[0]), state[1], state[2], state[3]]) for key, state in self._values.items()]
+
+    def quantile(self, state, fraction):
+        """Estimate a quantile from bucket counts (upper bound of the bucket it falls in)"""
+        counts, _, count, largest = state
+        target = fraction * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets + (largest,), counts):
+            seen += bucket_count
+            if seen >= target and bucket_count:
+                return min(bound, largest)
+        return largest
+
+
+class _Timer:
+    __slots__ = ('metric', 'key', 'start')
+
+    def __init__(self, metric, key):
+        self.metric = metric
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        # Failed calls are timed too; a slow failure is still a slow call
+        self.metric._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """All metrics of the process, by name"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            elif kwargs.get('func') is not None:
+                metric.func = kwargs['func']  # Latest owner wins, e.g. after a restart of a component
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=(), func=None):
+        return self._get_or_create(Gauge, name, help_text, labels, func=func)
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def _samples(self, metric):
+        items = metric.items()
+        if not items and not metric.label_names and metric.kind != "histogram":
+            return [((), 0)]  # Report untouched counters as 0 rather than leaving them out
+        return items
+
+    def snapshot(self):
+        """Every metric as plain data: {name: {'type', 'help', 'values': [{'labels', 'value'}]}}"""
+        result = {}
+        for metric in self.metrics():
+            values = []
+            for key, value in self._samples(metric):
+                if metric.kind == "histogram":
+                    counts, total, count, largest = value
+                    value = {'count': count, 'sum': round(total, 6),
+                             'mean': round(total / count, 6) if count else 0.0,
+                             'p50': metric.quantile(value, 0.5), 'p95': metric.quantile(value, 0.95),
+                             'max': round(largest, 6)}
+                values.append({'labels': dict(zip(metric.label_names, key)), 'value': value})
+            result[metric.name] = {'type': metric.kind, 'help': metric.help, 'values': values}
+        return result
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for key, value in sorted(self._samples(metric)):
+                if metric.kind != "histogram":
+                    lines.append(f"{metric.name}{_format_labels(metric.label_names, key)} {_format_value(value)}")
+                    continue
+                counts, total, count, _ = value
+                cumulative = 0
+                for bound, bucket_count in zip(metric.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(metric.label_names, key, [('le', _format_value(float(bound)))])
+                    lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(metric.label_names, key)
+                lines.append(f"{metric.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{metric.name}_count{labels} {count}")
+        return "\n".join(lines) + "\n"
+
+    def format_text(self):
+        """Readable summary for the diagnostics panel"""
+        lines = []
+        for name, data in self.snapshot().items():
+            empty = "n=0" if data['type'] == "histogram" else 0
+            for entry in data['values'] or [{'labels': {}, 'value': empty}]:
+                labels = ", ".join(f"{k}={v}" for k, v in entry['labels'].items())
+                title = f"{name}{{{labels}}}" if labels else name
+                value = entry['value']
+                if isinstance(value, dict):
+                    value = (f"n={value['count']}  mean={value['mean'] * 1000:.1f} ms  "
+                             f"p95<={value['p95'] * 1000:.0f} ms  max={value['max'] * 1000:.1f} ms")
+                elif isinstance(value, float):
+                    value = f"{value:.2f}"
+                lines.append(f"{title:<56} {value}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Write a snapshot to path: Prometheus text for .prom/.txt, JSON otherwise"""
+        if path.endswith((".prom", ".txt")):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps({'timestamp': time.time(), 'metrics': self.snapshot()}, indent=2)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+        logger.info(f"Metrics written to {path}")
+
+
+REGISTRY = MetricsRegistry()
+_STARTED = time.time()
+
+
+def counter(name, help_text, labels=()):
+    """Counter in the process registry (returns the existing one for a known name)"""
+    return REGISTRY.counter(name, help_text, labels)
+
+
+def gauge(name, help_text, labels=(), func=None):
+    """Gauge in the process registry"""
+    return REGISTRY.gauge(name, help_text, labels, func)
+
+
+def histogram(name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+    """Histogram in the process registry"""
+    return REGISTRY.histogram(name, help_text, labels, buckets)
+
+
+gauge("weather_threads_active", "Threads alive in the process", func=threading.active_count)
+gauge("weather_uptime_seconds", "Seconds since the process started", func=lambda: round(time.time() - _STARTED, 1))
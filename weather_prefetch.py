@@ -0,0 +1,168 @@
+"""
+Prefetch Scheduler Module
+Refreshes saved locations in the background before their cache entry expires
+"""
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL_SECONDS = 15
+JITTER_SECONDS = 60          # Spread of refresh times so locations don't all refresh together
+MAX_PER_TICK = 20            # Upper bound on locations refreshed per pass
+DEFAULT_PRIORITY = 0         # Saved locations are not prefetched unless opted in or recently viewed
+VIEWED_PRIORITY = 1          # Priority of a location without one of its own while it counts as recently viewed
+RECENT_VIEW_SECONDS = 3600   # How long a viewed location keeps being prefetched
+# Seconds before expiry at which a location is refreshed, by priority (None = never prefetch)
+PRIORITY_LEAD_TIMES = {
+    0: None,
+    1: 120,
+    2: 300,
+}
+OUTCOME_COUNTERS = {'fresh': 'served_fresh', 'stale': 'served_stale', 'waited': 'waited'}
+
+
+class PrefetchScheduler:
+    """Stale-while-revalidate prefetching for saved locations
+
+    Prefetching is opt-in: a location takes part if it has a priority of
+    its own above 0 (LocationManager.set_priority) or was viewed within
+    RECENT_VIEW_SECONDS (mark_viewed). Every CHECK_INTERVAL_SECONDS the
+    scheduler refreshes those whose in-memory cache entry is within their
+    lead time of expiring (or missing). Each location gets a fixed random
+    offset of up to JITTER_SECONDS so refreshes are spread out instead of
+    landing at the same moment. Higher priority locations get a longer lead
+    time and are refreshed first.
+    """
+
+    def __init__(self, cache, refresh, get_locations, check_interval=CHECK_INTERVAL_SECONDS,
+                 jitter=JITTER_SECONDS, max_per_tick=MAX_PER_TICK, lead_times=None):
+        self.cache = cache
+        self.refresh = refresh  # refresh(list_of_locations) fetches and caches them
+        self.get_locations = get_locations
+        self.check_interval = check_interval
+        self.jitter = jitter
+        self.max_per_tick = max_per_tick
+        self.lead_times = dict(PRIORITY_LEAD_TIMES if lead_times is None else lead_times)
+
+        self._offsets = {}  # {cache_key: seconds}, stable per location
+        self._viewed = {}  # {cache_key: time.monotonic() of the last view}
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {
+            'user_requests': 0,   # lookups made on behalf of the user
+            'served_fresh': 0,    # ... answered from a fresh entry
+            'served_stale': 0,    # ... answered from a stale entry, revalidated behind it
+            'waited': 0,          # ... that had to wait on the network
+            'prefetched': 0,      # locations refreshed in the background
+            'batches': 0,
+            'errors': 0,
+        }
+
+    def start(self):
+        """Start the background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="prefetch")
+            self._thread.start()
+            logger.info("PrefetchScheduler started")
+        return self
+
+    def stop(self, timeout=5):
+        """Stop the background thread and wait for a pass in progress to finish"""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        logger.info("PrefetchScheduler stopped")
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Prefetch pass failed: {e}")
+
+    def mark_viewed(self, lat, lon):
+        """Record that the user looked at a location, so it is kept fresh for a while"""
+        key = self.cache.get_cache_key(lat, lon)
+        with self._lock:
+            self._viewed[key] = time.monotonic()
+
+    def _offset(self, key):
+        offset = self._offsets.get(key)
+        if offset is None:
+            offset = self._offsets[key] = random.uniform(0, self.jitter)
+        return offset
+
+    def due_locations(self, now=None):
+        """Saved locations that should be refreshed now, most urgent first"""
+        now = now or datetime.now()
+        with self._lock:
+            cutoff = time.monotonic() - RECENT_VIEW_SECONDS
+            self._viewed = {key: seen for key, seen in self._viewed.items() if seen >= cutoff}
+            viewed = set(self._viewed)
+
+        due = []
+        keys = set()
+        for location in self.get_locations():
+            key = self.cache.get_cache_key(location['lat'], location['lon'])
+            keys.add(key)
+            priority = location.get('priority')
+            if priority is None:
+                priority = VIEWED_PRIORITY if key in viewed else DEFAULT_PRIORITY
+            lead = self.lead_times.get(priority, self.lead_times.get(VIEWED_PRIORITY))
+            if not priority or lead is None:
+                continue
+
+            entry = self.cache.peek(location['lat'], location['lon'])
+            if entry is None:
+                remaining = 0.0
+            else:
+                age = (now - entry.timestamp).total_seconds()
+                remaining = self.cache.cache_duration.total_seconds() - age
+
+            if remaining <= lead + self._offset(key):
+                due.append((-priority, remaining, location))
+
+        # Forget the offsets of locations that were removed
+        if len(self._offsets) > len(keys):
+            self._offsets = {key: offset for key, offset in self._offsets.items() if key in keys}
+
+        due.sort(key=lambda item: (item[0], item[1]))
+        return [location for _, _, location in due[:self.max_per_tick]]
+
+    def tick(self):
+        """Run one scheduling pass; returns the number of locations refreshed"""
+        due = self.due_locations()
+        if not due:
+            return 0
+        try:
+            self.refresh(due)
+        except Exception as e:
+            with self._lock:
+                self.stats['errors'] += 1
+            logger.warning(f"Background refresh of {len(due)} locations failed: {e}")
+            return 0
+        with self._lock:
+            self.stats['prefetched'] += len(due)
+            self.stats['batches'] += 1
+        logger.info(f"Prefetched {len(due)} locations")
+        return len(due)
+
+    def record_request(self, outcome):
+        """Record how a user-facing lookup was served: 'fresh', 'stale' or 'waited'"""
+        with self._lock:
+            self.stats['user_requests'] += 1
+            self.stats[OUTCOME_COUNTERS[outcome]] += 1
+
+    def get_stats(self):
+        """Scheduler counters plus the share of user requests that waited on the network"""
+        with self._lock:
+            stats = dict(self.stats)
+        total = stats['user_requests']
+        stats['wait_rate'] = stats['waited'] / total if total else 0.0
+        return stats
@@ -0,0 +1,86 @@
+"""
+Rate Limit Module
+Thread-safe token bucket for pacing requests (or bytes) to an upstream service
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Allows `rate` tokens per second with bursts of up to `capacity`
+
+    acquire() takes tokens and sleeps until they are covered. Callers queue
+    up in the order they asked: a taker may drive the balance below zero,
+    and whoever comes next waits for that debt to be paid off too. This also
+    lets a single acquire ask for more than the capacity (e.g. a large chunk
+    of bytes). penalize() pushes everything back, for when the upstream says
+    we are going too fast anyway (HTTP 429 with Retry-After).
+    """
+
+    def __init__(self, rate, capacity=1.0):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self.penalties = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens=1.0):
+        """Take tokens now and return how many seconds the caller must wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            self.acquired += tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited_seconds += wait
+        return wait
+
+    def acquire(self, tokens=1.0):
+        """Take tokens, sleeping as long as needed; returns the seconds slept"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def try_acquire(self, tokens=1.0):
+        """Take tokens only if they are available right now"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            self.acquired += tokens
+            return True
+
+    def delay(self, tokens=1.0):
+        """Seconds until tokens would be available, without taking them"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def penalize(self, seconds):
+        """Hold every caller back for at least `seconds` from now"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, -seconds * self.rate)
+            self.penalties += 1
+        logger.warning(f"Rate limited by upstream; pausing requests for {seconds:.1f}s")
+
+    def get_stats(self):
+        with self._lock:
+            return {'rate': self.rate, 'capacity': self.capacity, 'acquired': self.acquired,
+                    'waited_seconds': round(self.waited_seconds, 3), 'penalties': self.penalties}
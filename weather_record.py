@@ -0,0 +1,119 @@
+"""
+Weather Record Module
+Compact parsed form of an Open-Meteo response that renders the report on demand
+"""
+
+import json
+import sys
+import time
+from datetime import datetime
+
+from weather_forecast import ForecastSummary, summarize
+from weather_report import render_report
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class WeatherRecord:
+    """Current conditions for one location, holding only the fields the report shows
+
+    Replaces the raw response dict plus its preformatted report in the cache.
+    Strings that repeat across records (names, addresses, observation times)
+    are interned so every record shares one copy, and the report text is
+    built by render() from a precompiled template when it is displayed
+    instead of being stored.
+    """
+
+    __slots__ = ('observation_time', 'temperature', 'feels_like', 'humidity', 'weather_code',
+                 'wind_speed', 'wind_direction', 'precipitation', 'cloud_cover',
+                 'location_name', 'address_en', 'address_local', 'fetched_at', 'forecast')
+    # Interned, so not counted against a single record's memory
+    SHARED_SLOTS = ('observation_time', 'location_name', 'address_en', 'address_local')
+
+    def __init__(self, observation_time, temperature, feels_like, humidity, weather_code, wind_speed,
+                 wind_direction, precipitation, cloud_cover, location_name, address_en,
+                 address_local=None, fetched_at=None, forecast=None):
+        self.observation_time = _intern(observation_time)
+        self.temperature = temperature
+        self.feels_like = feels_like
+        self.humidity = humidity
+        self.weather_code = weather_code
+        self.wind_speed = wind_speed
+        self.wind_direction = wind_direction
+        self.precipitation = precipitation
+        self.cloud_cover = cloud_cover
+        self.location_name = _intern(location_name)
+        self.address_en = _intern(address_en)
+        self.address_local = _intern(address_local)
+        self.fetched_at = time.time() if fetched_at is None else fetched_at  # Epoch seconds
+        self.forecast = forecast  # ForecastSummary, or None without forecast data
+
+    @classmethod
+    def from_api(cls, weather_data, location_name, address_en, address_local=None, fetched_at=None,
+                 forecast=None):
+        """Parse the fields the report uses out of an Open-Meteo response"""
+        current = weather_data.get('current', {})
+        if forecast is None and 'hourly' in weather_data:
+            forecast = summarize([weather_data])[0]
+        return cls(
+            current.get('time'),
+            current.get('temperature_2m'),
+            current.get('apparent_temperature'),
+            current.get('relative_humidity_2m'),
+            current.get('weather_code', 0),
+            current.get('wind_speed_10m'),
+            current.get('wind_direction_10m'),
+            current.get('precipitation', 0),
+            current.get('cloud_cover'),
+            location_name, address_en, address_local, fetched_at, forecast
+        )
+
+    @property
+    def timestamp(self):
+        """When the data was fetched, as a datetime"""
+        return datetime.fromtimestamp(self.fetched_at)
+
+    def relabel(self, location_name, address_en, address_local=None):
+        """Same observation under other names (e.g. a nearby cache hit for a new query)"""
+        values = [getattr(self, slot) for slot in self.__slots__]
+        record = WeatherRecord(*values)
+        record.location_name = _intern(location_name)
+        record.address_en = _intern(address_en)
+        record.address_local = _intern(address_local)
+        return record
+
+    def to_json(self):
+        """Serialize as a JSON array of the slot values"""
+        values = [getattr(self, slot) for slot in self.__slots__]
+        if self.forecast is not None:
+            values[-1] = self.forecast.to_list()
+        return json.dumps(values, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        values = json.loads(text)
+        if len(values) == len(cls.__slots__) and values[-1] is not None:
+            values[-1] = ForecastSummary.from_list(values[-1])
+        return cls(*values)
+
+    def render(self, mode='plain'):
+        """Format the weather report for display ('plain', 'compact' or 'json')
+
+        A field the API sent as null reads "N/A" in the text modes, like one
+        it left out; the old format_weather_data printed "None" for nulls.
+        """
+        return render_report(self, mode)
+
+
+def records_from_api(responses, labels):
+    """WeatherRecords for many responses, with their forecasts aggregated in one pass
+
+    labels holds a (location_name, address_en, address_local) tuple per response.
+    """
+    responses = list(responses)
+    fetched_at = time.time()
+    forecasts = summarize(responses)
+    return [WeatherRecord.from_api(data, *label, fetched_at=fetched_at, forecast=forecast)
+            for data, label, forecast in zip(responses, labels, forecasts)]
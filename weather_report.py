@@ -0,0 +1,221 @@
+"""
+Weather Report Module
+Report layouts compiled once and filled from a WeatherRecord on demand
+"""
+
+import json
+from string import Formatter
+
+# Weather code descriptions
+WEATHER_CODES = {
+    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
+    45: "Foggy", 48: "Depositing rime fog",
+    51: "Light drizzle", 53: "Moderate drizzle", 55: "Dense drizzle",
+    61: "Slight rain", 63: "Moderate rain", 65: "Heavy rain",
+    71: "Slight snow", 73: "Moderate snow", 75: "Heavy snow", 77: "Snow grains",
+    80: "Slight rain showers", 81: "Moderate rain showers", 82: "Violent rain showers",
+    85: "Slight snow showers", 86: "Heavy snow showers",
+    95: "Thunderstorm", 96: "Thunderstorm with slight hail", 99: "Thunderstorm with heavy hail"
+}
+
+WEATHER_ICONS = {
+    0: "☀️", 1: "🌤️", 2: "🌤️", 3: "☁️",
+    45: "🌫️", 48: "🌫️",
+    51: "🌧️", 53: "🌧️", 55: "🌧️",
+    61: "🌧️", 63: "🌧️", 65: "⛈️",
+    71: "🌨️", 73: "🌨️", 75: "🌨️", 77: "🌨️",
+    80: "🌧️", 81: "🌧️", 82: "⛈️",
+    85: "🌨️", 86: "🌨️",
+    95: "⚡", 96: "⚡", 99: "⚡"
+}
+
+REPORT_WIDTH = 64
+REPORT_MODES = ('plain', 'compact', 'json')
+
+# Aligned data - no emojis on data lines for perfect alignment
+PLAIN_LAYOUT = (
+    "=" * REPORT_WIDTH + "\n"
+    "  WEATHER REPORT: {title}\n"
+    + "=" * REPORT_WIDTH + "\n\n"
+    "{location_lines}"
+    "🕐 Time:     {time}\n\n"
+    + "─" * REPORT_WIDTH + "\n"
+    "  CURRENT CONDITIONS\n"
+    + "─" * REPORT_WIDTH + "\n\n"
+    "{icon}  {description}\n\n"
+    "Temperature:        {temperature:>6}°C\n"
+    "Feels Like:         {feels_like:>6}°C\n"
+    "Humidity:           {humidity:>6}%\n"
+    "Wind Speed:         {wind_speed:>6} km/h\n"
+    "Wind Direction:     {wind_direction:>6}°\n"
+    "Precipitation:      {precipitation:>6} mm\n"
+    "Cloud Cover:        {cloud_cover:>6}%\n"
+    "{forecast_lines}"
+    "\n" + "=" * REPORT_WIDTH + "\n"
+)
+
+COMPACT_LAYOUT = (
+    "{location_name}: {icon} {description}, {temperature}°C (feels {feels_like}°C), "
+    "humidity {humidity}%, wind {wind_speed} km/h {wind_direction}°, "
+    "precip. {precipitation} mm, clouds {cloud_cover}% @ {time}"
+)
+
+
+def get_weather_icon(code):
+    """Get emoji icon for weather code"""
+    return WEATHER_ICONS.get(code, "🌈")
+
+
+def _na(value):
+    return "N/A" if value is None else value  # Missing and null fields alike (the old formatter printed "None")
+
+
+def _description(code):
+    return WEATHER_CODES.get(code, "Unknown")
+
+
+def _location_lines(record):
+    address_en = record.address_en
+    address_local = record.address_local
+    # Show both language versions if different
+    if address_local and address_local != address_en:
+        return f"📍 Location (Local): {address_local}\n📍 Location (EN):    {address_en}\n"
+    return f"📍 Location: {address_en}\n"
+
+
+def _one_decimal(value):
+    return "N/A" if value != value else f"{value:.1f}"  # NaN marks a day without data
+
+
+def _forecast_lines(record):
+    forecast = record.forecast
+    if forecast is None:
+        return ""
+    lines = ["\n", "─" * REPORT_WIDTH, "\n  FORECAST\n", "─" * REPORT_WIDTH, "\n\n"]
+    for date, low, high, _, rain, code in forecast.days():
+        description = _description(code) if code is not None else ""
+        lines.append(f"{date:%a %d %b}   {_one_decimal(low):>5}° / {_one_decimal(high):>5}°C"
+                     f"   {_one_decimal(rain):>5} mm   {description}\n")
+    if forecast.next_rain:
+        lines.append(f"\nNext rain:          {forecast.next_rain.replace('T', ' ')}\n")
+    else:
+        lines.append("\nNext rain:          none expected\n")
+    return "".join(lines)
+
+
+# Expression that fills each slot, evaluated against the record `r`
+SLOT_EXPRESSIONS = {
+    'title': "r.location_name.upper()",
+    'location_name': "r.location_name",
+    'location_lines': "_location_lines(r)",
+    'time': "_na(r.observation_time)",
+    'icon': "get_weather_icon(r.weather_code)",
+    'description': "_description(r.weather_code)",
+    'temperature': "_na(r.temperature)",
+    'feels_like': "_na(r.feels_like)",
+    'humidity': "_na(r.humidity)",
+    'wind_speed': "_na(r.wind_speed)",
+    'wind_direction': "_na(r.wind_direction)",
+    'precipitation': "_na(r.precipitation)",
+    'cloud_cover': "_na(r.cloud_cover)",
+    'forecast_lines': "_forecast_lines(r)",
+}
+
+
+class ReportTemplate:
+    """A fixed layout with named slots, compiled once into a single f-string function
+
+    The layout uses str.format syntax ("{temperature:>6}"). Instead of
+    re-parsing it for every report, the constructor turns it into the
+    source of a function that returns one f-string reading the slots
+    straight off the record, so rendering is a single string build.
+    """
+
+    def __init__(self, layout):
+        pieces = []
+        slots = []
+        for literal, field, spec, conversion in Formatter().parse(layout):
+            pieces.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            if field not in SLOT_EXPRESSIONS:
+                raise ValueError(f"Unknown report slot: {field}")
+            slots.append(field)
+            pieces.append("{" + SLOT_EXPRESSIONS[field]
+                          + (f"!{conversion}" if conversion else "")
+                          + (f":{spec}" if spec else "") + "}")
+
+        self.layout = layout
+        self.slots = tuple(slots)
+        source = f"def render(r):\n    return f{''.join(pieces)!r}\n"
+        namespace = {
+            '_na': _na,
+            '_description': _description,
+            '_location_lines': _location_lines,
+            '_forecast_lines': _forecast_lines,
+            'get_weather_icon': get_weather_icon,
+        }
+        exec(compile(source, "<report template>", "exec"), namespace)
+        self.render = namespace['render']  # render(record) -> str
+
+
+TEMPLATES = {
+    'plain': ReportTemplate(PLAIN_LAYOUT),
+    'compact': ReportTemplate(COMPACT_LAYOUT),
+}
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)  # Built once; json.dumps(**kw) makes one per call
+
+
+def _forecast_json(forecast):
+    if forecast is None:
+        return None
+    days = [{'date': f"{date:%Y-%m-%d}", 'min': _finite(low), 'max': _finite(high),
+             'mean': _finite(mean), 'precipitation': _finite(rain), 'weather_code': code}
+            for date, low, high, mean, rain, code in forecast.days()]
+    return {'days': days, 'next_rain': forecast.next_rain}
+
+
+def _finite(value):
+    return None if value != value else round(value, 2)
+
+
+def report_dict(record):
+    """Machine-readable report: raw values, names, description and forecast"""
+    code = record.weather_code
+    return {
+        'location': record.location_name,
+        'address': record.address_en,
+        'address_local': record.address_local,
+        'time': record.observation_time,
+        'weather_code': code,
+        'description': _description(code),
+        'temperature': record.temperature,
+        'feels_like': record.feels_like,
+        'humidity': record.humidity,
+        'wind_speed': record.wind_speed,
+        'wind_direction': record.wind_direction,
+        'precipitation': record.precipitation,
+        'cloud_cover': record.cloud_cover,
+        'fetched_at': record.fetched_at,
+        'forecast': _forecast_json(record.forecast),
+    }
+
+
+def report_json(record):
+    """report_dict() encoded as JSON"""
+    return _JSON_ENCODER.encode(report_dict(record))
+
+
+def render_report(record, mode='plain'):
+    """Render one record as 'plain' (the full report), 'compact' (one line) or 'json'"""
+    if mode == 'json':
+        return report_json(record)
+    template = TEMPLATES.get(mode)
+    if template is None:
+        raise ValueError(f"Unknown report mode: {mode}")
+    return template.render(record)
+
+
+def render_reports(records, mode='plain'):
+    """Lazily render many records; nothing is formatted until the result is consumed"""
+    return (render_report(record, mode) for record in records)
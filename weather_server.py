@@ -0,0 +1,376 @@
+"""
+Weather Server Module
+Local HTTP JSON API answering /weather from the shared weather and geocode caches
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+
+import weather_api
+import weather_metrics
+from weather_cache import WeatherCache, CACHE_DB_FILE, CACHE_STALE_MINUTES, NEARBY_RADIUS_KM
+from weather_engine import FetchEngine
+from weather_gazetteer import load_gazetteer
+from weather_geocode import Geocoder, GeocodeCache, GeocodePipeline, GEOCODE_CACHE_FILE
+from weather_record import WeatherRecord
+from weather_report import report_dict, REPORT_MODES
+
+logger = logging.getLogger(__name__)
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+MAX_HEADER_BYTES = 16 * 1024
+KEEP_ALIVE_SECONDS = 15
+REPORT_CACHE_ENTRIES = 1024  # Encoded reports kept for repeat requests
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               431: "Request Header Fields Too Large", 500: "Internal Server Error",
+               502: "Bad Gateway", 503: "Service Unavailable"}
+SERVER_REQUESTS = weather_metrics.counter("weather_server_requests_total", "API requests answered, by status",
+                                          ("status",))
+
+
+class HttpError(Exception):
+    """Ends a request with an HTTP error status and a JSON error body"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class WeatherServer:
+    """Non-blocking HTTP/1.1 server in front of one WeatherCache and Geocoder
+
+    Connections are handled on the FetchEngine's asyncio loop, so thousands
+    of idle or cache-hit clients cost no threads. The loop only reads the
+    in-memory cache tier; disk reads and writes run on the engine's
+    executor, and upstream calls go through engine.run_blocking() with its
+    per-host limits. Concurrent misses for
+    the same key or query share one upstream call, and a stale entry is
+    served at once while it is refreshed in the background.
+
+    Routes:
+      GET /weather?lat=..&lon=..[&mode=json|compact|plain]
+      GET /weather?q=City[&mode=..]   (names the offline gazetteer knows skip Nominatim)
+      GET /stats
+      GET /metrics   (Prometheus text format)
+    """
+
+    def __init__(self, cache, geocoder, engine, host=SERVER_HOST, port=SERVER_PORT,
+                 forecast_days=weather_api.FORECAST_DAYS):
+        self.cache = cache
+        self.geocoder = geocoder
+        # Names are resolved through the rate-limited queue, which also merges duplicate lookups
+        self.geocode_pipeline = GeocodePipeline(geocoder) if geocoder else None
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.forecast_days = forecast_days
+        self.server = None
+        self._inflight = {}  # {key: asyncio.Task}, one per upstream call in progress
+        # {(cache key, labels, mode): (record, encoded report)}, reused while the record is unchanged
+        self._reports = OrderedDict()
+        self.stats = {
+            'connections': 0,
+            'requests': 0,
+            'errors': 0,
+            'fresh': 0,        # answered from a fresh cache entry
+            'stale': 0,        # answered from a stale entry, refreshed behind it
+            'fetched': 0,      # waited on an upstream weather fetch
+            'coalesced': 0,    # joined an upstream call another request started
+            'geocoded': 0,     # names resolved through Nominatim
+            'started': time.time(),
+        }
+
+    async def start(self):
+        """Bind and start accepting connections (call on the engine loop)"""
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                 limit=MAX_HEADER_BYTES)
+        self.port = self.server.sockets[0].getsockname()[1]
+        if self.geocode_pipeline:
+            self.geocode_pipeline.start()
+        logger.info(f"Weather server listening on http://{self.host}:{self.port}")
+        return self
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.geocode_pipeline:
+            # Joins the worker, which may be inside a request; keep that off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.geocode_pipeline.stop)
+
+    async def _handle_connection(self, reader, writer):
+        self.stats['connections'] += 1
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEP_ALIVE_SECONDS)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                if request is None:
+                    return
+                method, target, headers, version = request
+
+                self.stats['requests'] += 1
+                try:
+                    if method not in ("GET", "HEAD"):
+                        raise HttpError(405, f"Method {method} not allowed")
+                    status, payload = 200, await self._route(target)
+                except HttpError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    logger.error(f"Request {target} failed: {e}")
+                    status, payload = 500, {'error': str(e)}
+                if status >= 400:
+                    self.stats['errors'] += 1
+                SERVER_REQUESTS.inc(status=status)
+
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == "HTTP/1.1")
+                self._write_response(writer, status, payload, keep_alive, head=(method == "HEAD"))
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except HttpError as e:
+            self.stats['errors'] += 1
+            self._write_response(writer, e.status, {'error': str(e)}, keep_alive=False)
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _read_request(self, reader):
+        """(method, target, headers, version), or None at a clean end of stream"""
+        try:
+            line = await reader.readline()
+        except asyncio.LimitOverrunError:
+            raise HttpError(431, "Request line too long")
+        if not line:
+            return None
+        parts = line.decode('latin-1').split()
+        if len(parts) != 3:
+            raise HttpError(400, "Malformed request line")
+        method, target, version = parts
+
+        headers = {}
+        total = len(line)
+        while True:
+            line = await reader.readline()
+            total += len(line)
+            if total > MAX_HEADER_BYTES:
+                raise HttpError(431, "Request headers too large")
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return method, target, headers, version
+
+    def _write_response(self, writer, status, payload, keep_alive, head=False):
+        content_type = "application/json; charset=utf-8"
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), weather_metrics.PROMETHEUS_CONTENT_TYPE
+        elif isinstance(payload, bytes):
+            body = payload
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head_lines = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head_lines.encode('latin-1') + (b"" if head else body))
+
+    async def _route(self, target):
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == "/weather":
+            return await self._weather(query)
+        if url.path == "/stats":
+            # Counts the rows on disk; keep that off the loop
+            return await asyncio.get_running_loop().run_in_executor(self.engine.executor, self.get_stats)
+        if url.path == "/metrics":
+            return weather_metrics.REGISTRY.to_prometheus()
+        raise HttpError(404, f"No route for {url.path}")
+
+    async def _weather(self, query):
+        mode = query.get('mode', 'json')
+        if mode not in REPORT_MODES:
+            raise HttpError(400, f"mode must be one of {', '.join(REPORT_MODES)}")
+
+        if 'q' in query:
+            name = query['q'].strip()
+            if not name:
+                raise HttpError(400, "q must not be empty")
+            lat, lon, address_en, address_local = await self._geocode(name)
+            labels = (name, address_en, address_local)
+            radius = NEARBY_RADIUS_KM
+        elif 'lat' in query and 'lon' in query:
+            try:
+                lat, lon = float(query['lat']), float(query['lon'])
+            except ValueError:
+                raise HttpError(400, "lat and lon must be numbers")
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise HttpError(400, "lat/lon out of range")
+            place = self.geocoder.reverse(lat, lon) if self.geocoder else None
+            label = place or f"{lat}, {lon}"
+            labels = (label, label, None)
+            radius = 0
+        else:
+            raise HttpError(400, "Pass lat and lon, or q")
+
+        record, source = await self._record(lat, lon, labels, radius)
+        envelope = json.dumps({'lat': lat, 'lon': lon, 'source': source,
+                               'age_seconds': round(time.time() - record.fetched_at)})
+        # Splice the report in as already-encoded JSON so hot keys skip rebuilding it
+        report = self._encoded_report(self.cache.get_cache_key(lat, lon), record, labels, mode)
+        return b"".join((envelope[:-1].encode('utf-8'), b', "report": ', report, b"}"))
+
+    def _encoded_report(self, key, record, labels, mode):
+        slot = (key, labels, mode)
+        entry = self._reports.get(slot)
+        if entry is not None and entry[0] is record:
+            self._reports.move_to_end(slot)
+            return entry[1]
+        relabeled = record.relabel(*labels)
+        report = report_dict(relabeled) if mode == 'json' else relabeled.render(mode)
+        encoded = json.dumps(report, ensure_ascii=False).encode('utf-8')
+        self._reports[slot] = (record, encoded)
+        self._reports.move_to_end(slot)
+        if len(self._reports) > REPORT_CACHE_ENTRIES:
+            self._reports.popitem(last=False)
+        return encoded
+
+    async def _geocode(self, name):
+        if self.geocoder is None:
+            raise HttpError(400, "Name lookup is not available; pass lat and lon")
+        result = self.geocoder.cached(name)
+        if result is not None:
+            return result
+        self.stats['geocoded'] += 1
+        try:
+            # A client that disconnects only withdraws its own wait, not the lookup for others
+            return await asyncio.wrap_future(self.geocode_pipeline.submit(name))
+        except (ValueError, RuntimeError) as e:
+            raise HttpError(404 if isinstance(e, ValueError) else 502, str(e))
+        except asyncio.CancelledError:
+            if not self.geocode_pipeline.stopped:
+                raise  # The client went away
+            raise HttpError(503, "Name lookup is shutting down")
+
+    async def _record(self, lat, lon, labels, radius):
+        """(WeatherRecord, source) for a coordinate, fetching only on a miss"""
+        cached = self.cache.get(lat, lon, allow_stale=True, radius_km=radius, memory_only=True)
+        if cached is None and self.cache.store:
+            cached = await asyncio.get_running_loop().run_in_executor(
+                self.engine.executor, self._load_persisted, lat, lon, radius)
+        if cached is not None:
+            if self.cache.is_fresh(cached):
+                self.stats['fresh'] += 1
+                return cached, 'fresh'
+            self.stats['stale'] += 1
+            self._refresh_in_background(lat, lon, labels)
+            return cached, 'stale'
+
+        self.stats['fetched'] += 1
+        try:
+            return await self._shared(self.cache.get_cache_key(lat, lon), self._fetch, lat, lon, labels), 'fetched'
+        except RuntimeError as e:
+            raise HttpError(502, str(e))
+
+    def _load_persisted(self, lat, lon, radius):
+        """Full cache lookup including the disk tier (blocking; runs on the engine's executor)"""
+        return self.cache.get(lat, lon, allow_stale=True, radius_km=radius)
+
+    async def _fetch(self, lat, lon, labels):
+        return await self.engine.run_blocking(weather_api.OPEN_METEO_HOST, self._fetch_record, lat, lon, labels)
+
+    def _fetch_record(self, lat, lon, labels):
+        """Fetch and cache one record (blocking, so the disk write stays off the loop too)"""
+        data = weather_api.fetch_weather_data(lat, lon, 10, self.forecast_days)
+        record = WeatherRecord.from_api(data, *labels)
+        self.cache.set(lat, lon, record)
+        return record
+
+    def _refresh_in_background(self, lat, lon, labels):
+        key = self.cache.get_cache_key(lat, lon)
+        if key not in self._inflight:
+            task = asyncio.ensure_future(self._shared(key, self._fetch, lat, lon, labels))
+            task.add_done_callback(self._log_refresh_error)
+
+    def _log_refresh_error(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background refresh failed: {task.exception()}")
+
+    async def _shared(self, key, func, *args):
+        """Await func(*args), or join the call already running under key"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(func(*args))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats['coalesced'] += 1
+        # Shield so one client disconnecting does not cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def get_stats(self):
+        """Server, cache and engine counters"""
+        stats = dict(self.stats)
+        stats['uptime_seconds'] = round(time.time() - stats.pop('started'), 1)
+        stats['in_flight'] = len(self._inflight)
+        cache_stats = self.cache.get_stats()
+        cache_stats.pop('keys', None)
+        geocode_stats = self.geocoder.cache.get_stats() if self.geocoder and self.geocoder.cache else None
+        return {'server': stats, 'weather_cache': cache_stats, 'geocode_cache': geocode_stats,
+                'geocode_queue': self.geocode_pipeline.get_stats() if self.geocode_pipeline else None,
+                'gazetteer': self.geocoder.gazetteer.get_stats() if self.geocoder and self.geocoder.gazetteer else None,
+                'engine': self.engine.get_stats()}
+
+
+def main(argv, data_dir, user_agent="weather_app"):
+    """Entry point for `Weather.py --serve`; runs until interrupted"""
+    parser = argparse.ArgumentParser(prog="Weather.py", description="Serve weather as a local JSON API")
+    parser.add_argument('--serve', action='store_true')
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--forecast-days', type=int, default=weather_api.FORECAST_DAYS)
+    parser.add_argument('--verbose', '-v', action='store_true', help="log every request at INFO level")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr,
+                        format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+
+    cache = WeatherCache(persist_path=os.path.join(data_dir, CACHE_DB_FILE), stale_minutes=CACHE_STALE_MINUTES)
+    geocoder = Geocoder(user_agent, cache=GeocodeCache(persist_path=os.path.join(data_dir, GEOCODE_CACHE_FILE)),
+                        gazetteer=load_gazetteer(data_dir))
+    engine = FetchEngine().start()
+    server = WeatherServer(cache, geocoder, engine, args.host, args.port, args.forecast_days)
+    weather_metrics.gauge("weather_cache_entries", "Entries in the in-memory weather cache", func=lambda: len(cache))
+    weather_metrics.gauge("weather_cache_memory_bytes", "Approximate size of the in-memory weather cache",
+                          func=lambda: cache.memory_bytes)
+    try:
+        asyncio.run_coroutine_threadsafe(server.start(), engine.loop).result()
+    except OSError as e:
+        logger.error(f"Cannot listen on {args.host}:{args.port}: {e}")
+        return 1
+
+    print(f"Serving weather on http://{args.host}:{server.port}/weather (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        asyncio.run_coroutine_threadsafe(server.stop(), engine.loop).result(timeout=5)
+        engine.stop()
+        cache.close()
+        geocoder.cache.close()
+    return 0
@@ -0,0 +1,119 @@
+"""
+Startup Module
+Lazy module loading, background warm-up imports and the per-phase startup timer
+"""
+
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FIRST_PAINT_TARGET_MS = 400  # Time-to-first-paint budget, tracked by the benchmark suite
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access
+
+    Safe to touch from several threads: the import system holds a
+    per-module lock, so a second thread waits for the first import to
+    finish instead of seeing a half-initialized module.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+
+def preload(names, on_done=None):
+    """Import modules on a daemon thread so they are warm before first use
+
+    on_done(seconds_by_module) is called on that thread when all are imported.
+    A module that fails to import is skipped; whoever uses it sees the error.
+    """
+    def run():
+        seconds = {}
+        for name in names:
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                logger.debug(f"Preload of {name} skipped: {e}")
+                continue
+            seconds[name] = time.perf_counter() - start
+        if on_done:
+            on_done(seconds)
+
+    thread = threading.Thread(target=run, name="preload", daemon=True)
+    thread.start()
+    return thread
+
+
+class StartupTimer:
+    """Records when each startup phase ended, relative to a start mark"""
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks = []  # [(phase, perf_counter when it ended)]
+        self.details = {}  # {phase: {detail: ms}}, e.g. per-module preload times
+        self._lock = threading.Lock()
+
+    def mark(self, phase, details=None):
+        """End a phase now"""
+        with self._lock:
+            self.marks.append((phase, time.perf_counter()))
+            if details:
+                self.details[phase] = details
+
+    def elapsed_ms(self, phase):
+        """Milliseconds from the start mark to the end of phase, or None"""
+        for name, stamp in self.marks:
+            if name == phase:
+                return (stamp - self.start) * 1000
+        return None
+
+    def phases(self):
+        """[(phase, ms spent in it, ms since start)] in the order they ended"""
+        with self._lock:
+            marks = sorted(self.marks, key=lambda mark: mark[1])
+        result = []
+        previous = self.start
+        for name, stamp in marks:
+            result.append((name, (stamp - previous) * 1000, (stamp - self.start) * 1000))
+            previous = stamp
+        return result
+
+    def to_dict(self):
+        first_paint = self.elapsed_ms("first paint")
+        phases = self.phases()
+        return {
+            'phases': {name: round(spent, 2) for name, spent, _ in phases},
+            'details': {phase: {k: round(v, 2) for k, v in d.items()} for phase, d in self.details.items()},
+            'first_paint_ms': round(first_paint, 2) if first_paint is not None else None,
+            'total_ms': round(phases[-1][2], 2) if phases else 0.0,
+            'target_ms': FIRST_PAINT_TARGET_MS,
+        }
+
+    def report(self):
+        """Phase table for --timing"""
+        lines = [f"{'phase':<24}{'ms':>10}{'at ms':>10}", "-" * 44]
+        for name, spent, at in self.phases():
+            lines.append(f"{name:<24}{spent:>10.1f}{at:>10.1f}")
+            for detail, ms in sorted(self.details.get(name, {}).items(), key=lambda item: -item[1]):
+                lines.append(f"  {detail:<22}{ms:>10.1f}")
+        first_paint = self.elapsed_ms("first paint")
+        if first_paint is not None:
+            verdict = "within" if first_paint <= FIRST_PAINT_TARGET_MS else "OVER"
+            lines.append(f"\nFirst paint after {first_paint:.0f} ms ({verdict} the {FIRST_PAINT_TARGET_MS} ms target)")
+        return "\n".join(lines)
@@ -0,0 +1,120 @@
+"""
+UI Dispatch Module
+Lets worker threads request widget updates that the Tk main loop applies in batches
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TICK_MS = 16  # ~60 drains per second
+
+
+class UIDispatcher:
+    """Queue of render intents drained on the Tk main loop
+
+    Workers call post(key, func, *args); nothing touches a widget until the
+    main loop's next tick runs func(*args). Intents posted under the same key
+    before a tick are coalesced, so only the latest one is applied and the
+    widget repaints once. call() queues a one-off action (e.g. a dialog) that
+    is never coalesced.
+    """
+
+    def __init__(self, root, tick_ms=TICK_MS):
+        self.root = root
+        self.tick_ms = tick_ms
+        self.main_thread = threading.current_thread()
+        self._lock = threading.Lock()
+        self._pending = {}  # {key: (func, args, posted_at)}, insertion ordered
+        self._seq = 0
+        self._running = False
+        self._last_tick = None
+        self.stats = {
+            'posted': 0,            # intents handed in
+            'coalesced': 0,         # intents replaced by a newer one for the same key
+            'applied': 0,           # intents actually run (widget updates)
+            'ticks': 0,             # drains that applied at least one intent
+            'errors': 0,
+            'max_latency_ms': 0.0,  # longest post -> apply delay
+            'total_latency_ms': 0.0,
+            'max_drain_ms': 0.0,    # longest time spent applying one batch
+            'max_tick_lag_ms': 0.0, # how late the main loop ran a tick (main-loop stall)
+        }
+
+    def start(self):
+        """Begin draining on the main loop"""
+        if not self._running:
+            self._running = True
+            self._last_tick = time.perf_counter()
+            self.root.after(self.tick_ms, self._tick)
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def in_main_thread(self):
+        return threading.current_thread() is self.main_thread
+
+    def post(self, key, func, *args):
+        """Queue func(*args) for the main loop, replacing any pending intent with the same key"""
+        with self._lock:
+            self.stats['posted'] += 1
+            if key in self._pending:
+                self.stats['coalesced'] += 1
+                del self._pending[key]  # Re-insert so it keeps its newest position
+            self._pending[key] = (func, args, time.perf_counter())
+
+    def call(self, func, *args):
+        """Queue a one-off func(*args) for the main loop"""
+        with self._lock:
+            self._seq += 1
+            key = ('call', self._seq)
+        self.post(key, func, *args)
+
+    def _tick(self):
+        """Apply everything queued since the last tick, then reschedule"""
+        now = time.perf_counter()
+        lag_ms = max(0.0, (now - self._last_tick) * 1000 - self.tick_ms)
+        self._last_tick = now
+
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        # Reschedule first so a modal dialog in this batch doesn't stall later updates
+        if self._running:
+            self.root.after(self.tick_ms, self._tick)
+
+        total_latency_ms = 0.0
+        max_latency_ms = 0.0
+        errors = 0
+        for func, args, posted_at in batch.values():
+            try:
+                func(*args)
+            except Exception as e:
+                errors += 1
+                logger.error(f"UI update failed: {e}")
+            latency_ms = (time.perf_counter() - posted_at) * 1000
+            total_latency_ms += latency_ms
+            max_latency_ms = max(max_latency_ms, latency_ms)
+        drain_ms = (time.perf_counter() - now) * 1000
+
+        with self._lock:
+            stats = self.stats
+            stats['max_tick_lag_ms'] = max(stats['max_tick_lag_ms'], lag_ms)
+            if batch:
+                stats['applied'] += len(batch)
+                stats['ticks'] += 1
+                stats['errors'] += errors
+                stats['total_latency_ms'] += total_latency_ms
+                stats['max_latency_ms'] = max(stats['max_latency_ms'], max_latency_ms)
+                stats['max_drain_ms'] = max(stats['max_drain_ms'], drain_ms)
+
+    def get_stats(self):
+        """Dispatch counters and main-loop latency"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._pending)
+        applied = stats['applied']
+        stats['avg_latency_ms'] = stats['total_latency_ms'] / applied if applied else 0.0
+        return stats
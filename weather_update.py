@@ -0,0 +1,264 @@
+"""
+Update Module
+Checks GitHub releases for a newer version and hands the download to updater.exe
+"""
+
+import json
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import weather_download
+import weather_http
+import weather_metrics
+from weather_download import parse_digest
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_URL = "https://api.github.com"
+UPDATE_STATE_FILE = "update_state.json"
+UPDATE_DOWNLOAD_FILE = "Weather.update.exe"  # Verified download handed to updater.exe
+UPDATE_CHECK_INTERVAL_SECONDS = 6 * 3600  # Startup checks within this of the last answer reuse it
+UPDATE_BACKOFF_BASE_SECONDS = 300  # After a failed check, doubled per consecutive failure
+UPDATE_BACKOFF_MAX_SECONDS = 24 * 3600
+RELEASE_FIELDS = ("tag_name", "html_url", "body", "published_at")  # What is kept of a release on disk
+ASSET_FIELDS = ("name", "size", "browser_download_url", "digest")
+
+UPDATE_CHECK_SECONDS = weather_metrics.histogram("weather_update_check_seconds", "Time to query the latest release")
+UPDATE_CHECKS = weather_metrics.counter("weather_update_checks_total",
+                                        "Update checks by outcome (fetched, not_modified, skipped, failed)",
+                                        ("result",))
+
+_LEADING_NUMBER = re.compile(r"\d+")
+
+
+def parse_version(text):
+    """Comparable form of a version tag: 'v1.10.0' -> ((1, 10), 1), or None if it has no number
+
+    Trailing zeros are dropped so 1.2 == 1.2.0, and a pre-release
+    ('1.3.0-rc1') sorts before its release.
+    """
+    core, _, pre_release = text.strip().lstrip("vV").partition("-")
+    numbers = []
+    for part in core.split("+")[0].split("."):
+        match = _LEADING_NUMBER.match(part)
+        if not match:
+            break
+        numbers.append(int(match.group()))
+    if not numbers:
+        return None
+    while len(numbers) > 1 and numbers[-1] == 0:
+        numbers.pop()
+    return tuple(numbers), 0 if pre_release else 1
+
+
+def _trim_release(data):
+    release = {field: data.get(field) for field in RELEASE_FIELDS}
+    release['assets'] = [{field: asset.get(field) for field in ASSET_FIELDS if field in asset}
+                         for asset in data.get("assets", [])]
+    return release
+
+
+class UpdateManager:
+    """Manages application updates from GitHub releases
+    
+    The last release answer is kept in update_state.json with its ETag and
+    Last-Modified. A check within check_interval of that answer reuses it
+    without a request (unless forced, as the manual button does); otherwise
+    a conditional request is sent and a 304 costs no body. Failed checks
+    back off exponentially before the next automatic attempt.
+    """
+    
+    def __init__(self, current_version, github_repo, script_dir, check_interval=UPDATE_CHECK_INTERVAL_SECONDS):
+        self.current_version = current_version
+        self.github_repo = github_repo
+        self.script_dir = script_dir
+        self.check_interval = check_interval
+        self.state_path = os.path.join(script_dir, UPDATE_STATE_FILE)
+        self.state = self._load_state()
+        self.stats = {'requests': 0, 'fetched': 0, 'not_modified': 0, 'skipped': 0, 'failed': 0}
+        self._lock = threading.Lock()  # Startup and manual checks may overlap
+        self._remove_installed_download()
+    
+    def _remove_installed_download(self):
+        """Delete the executable a finished update left behind (a .part download is kept to resume)"""
+        try:
+            os.remove(os.path.join(self.script_dir, UPDATE_DOWNLOAD_FILE))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove the previous update download: {e}")
+    
+    def _load_state(self):
+        """Persisted validators and release, or an empty state"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('repo') == self.github_repo:
+                return state
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable update state: {e}")
+        return {'repo': self.github_repo}
+    
+    def _save_state(self):
+        """Atomically write the update state"""
+        try:
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.error(f"Error saving update state: {e}")
+    
+    def check_for_updates(self, force=False):
+        """Check if a new version is available
+        
+        force skips the re-check interval and failure backoff (a manual
+        check) but still sends a conditional request.
+        """
+        with self._lock:
+            release = self._latest_release(force)
+        if not release:
+            return None
+        
+        latest_version = (release.get("tag_name") or "").lstrip("v")
+        latest, current = parse_version(latest_version), parse_version(self.current_version)
+        if latest is None or current is None:
+            return None
+        
+        if latest > current:
+            return {
+                "version": latest_version,
+                "url": release.get("html_url"),
+                "notes": release.get("body") or "No release notes available",
+                "assets": release.get("assets", [])
+            }
+        return None
+    
+    def _latest_release(self, force):
+        """The latest release, from the network only when the stored answer may be out of date"""
+        now = time.time()
+        release = self.state.get('release')
+        if not force:
+            if now < self.state.get('retry_at', 0):
+                return self._skip(release, f"backing off until {time.ctime(self.state['retry_at'])}")
+            if release and now - self.state.get('checked_at', 0) < self.check_interval:
+                return self._skip(release, "checked recently")
+        
+        headers = {}
+        if release:
+            if self.state.get('etag'):
+                headers['If-None-Match'] = self.state['etag']
+            if self.state.get('last_modified'):
+                headers['If-Modified-Since'] = self.state['last_modified']
+        
+        url = f"{GITHUB_API_URL}/repos/{self.github_repo}/releases/latest"
+        self.stats['requests'] += 1
+        try:
+            with UPDATE_CHECK_SECONDS.time():
+                response = weather_http.get(url, timeout=10, headers=headers)
+            if response.status_code == 304 and release:
+                outcome = 'not_modified'
+            elif response.status_code == 200:
+                release = _trim_release(response.json())
+                self.state.update(release=release, etag=response.headers.get('ETag'),
+                                  last_modified=response.headers.get('Last-Modified'))
+                outcome = 'fetched'
+            else:
+                return self._fail(now, f"HTTP {response.status_code}", response)
+        except Exception as e:
+            return self._fail(now, e)
+        
+        self.stats[outcome] += 1
+        UPDATE_CHECKS.inc(result=outcome)
+        self.state.update(checked_at=now, failures=0, retry_at=0)
+        self._save_state()
+        logger.info(f"Update check: {outcome.replace('_', ' ')} ({release.get('tag_name')})")
+        return release
+    
+    def _skip(self, release, reason):
+        self.stats['skipped'] += 1
+        UPDATE_CHECKS.inc(result="skipped")
+        logger.info(f"Update check skipped: {reason}")
+        return release
+    
+    def _fail(self, now, error, response=None):
+        """Schedule the next attempt with exponential backoff; the stored release (if any) still stands"""
+        failures = self.state.get('failures', 0) + 1
+        delay = min(UPDATE_BACKOFF_MAX_SECONDS, UPDATE_BACKOFF_BASE_SECONDS * 2 ** (failures - 1))
+        if response is not None:
+            # GitHub's rate limit says when it resets; honour that if it is later
+            retry_after = response.headers.get('Retry-After', "")
+            reset = response.headers.get('X-RateLimit-Reset', "")
+            if retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            elif response.headers.get('X-RateLimit-Remaining') == "0" and reset.isdigit():
+                delay = max(delay, int(reset) - now)
+        self.stats['failed'] += 1
+        UPDATE_CHECKS.inc(result="failed")
+        self.state.update(failures=failures, retry_at=now + delay)
+        self._save_state()
+        logger.warning(f"Failed to check for updates: {error}; next automatic check in {delay:.0f}s")
+        return self.state.get('release')
+    
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['checked_at'] = self.state.get('checked_at')
+        stats['failures'] = self.state.get('failures', 0)
+        return stats
+    
+    def download_and_install_update(self, update_info, progress_callback=None):
+        """Download and verify the new executable, then let updater.exe swap it in"""
+        try:
+            exe_asset = None
+            for asset in update_info["assets"]:
+                if asset["name"].lower() == "weather.exe":
+                    exe_asset = asset
+                    break
+            
+            if not exe_asset:
+                raise Exception("No executable found in release assets")
+            
+            download_url = exe_asset["browser_download_url"]
+            exe_path = Path(self.script_dir) / "Weather.exe"
+            updater_path = Path(self.script_dir) / "updater.exe"
+            download_path = Path(self.script_dir) / UPDATE_DOWNLOAD_FILE
+            
+            if not updater_path.exists():
+                raise Exception("Updater not found. Please reinstall the application.")
+            
+            if progress_callback:
+                progress_callback("Starting update process...")
+            
+            digest = parse_digest(exe_asset.get("digest"))
+            if not digest:
+                logger.warning("Release has no SHA-256 digest for Weather.exe; checking its size only")
+            
+            def report(done, total):
+                if progress_callback and total:
+                    progress_callback(f"Downloading update... {done / 1048576:.1f} MB / {total / 1048576:.1f} MB")
+            
+            # An interrupted download resumes from its .part file next time
+            stats = weather_download.download(download_url, download_path, digest, report)
+            if exe_asset.get("size") and stats["bytes"] != exe_asset["size"]:
+                download_path.unlink()
+                raise Exception(f"Downloaded {stats['bytes']} bytes, release lists {exe_asset['size']}")
+            
+            # Only a complete, verified download reaches the updater
+            if progress_callback:
+                progress_callback("Update downloaded and verified, starting updater...")
+            # The updater copies from a file:// URL as it would download any other
+            subprocess.Popen([str(updater_path), download_path.resolve().as_uri(), str(exe_path)],
+                             cwd=self.script_dir)
+            time.sleep(1)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error installing update: {e}")
+            raise